@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:14:52 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import struct
+import select
+import ctypes
+import ctypes.util
+
+from time import sleep, perf_counter
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Inotify event flags (see 'man inotify')
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF)
+EVENT_HEADER_FORMAT = "iIII"
+EVENT_HEADER_SIZE = struct.calcsize(EVENT_HEADER_FORMAT)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Inotify_Watcher:
+
+    '''
+    Class used to watch folders for new/changed files, using the (linux) inotify system.
+    Sub-folders are watched as well, including any that are created after watching starts.
+
+    Example:
+        watcher = Inotify_Watcher(["/path/to/folder"])
+        while True:
+            changed_path_list, needs_rescan = watcher.get_changes(timeout_sec = 1.0)
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, folder_path_list, recursive = True, folder_filter_func = None):
+
+        '''
+        Inputs:
+            folder_path_list -> List of strings. Folders to watch
+
+            recursive -> Boolean. If true, sub-folders are also watched
+
+            folder_filter_func -> Function or None. If provided, called as folder_filter_func(folder_name) and
+                                  must return True for sub-folders that should be watched
+        '''
+
+        # Store inputs
+        self.recursive = recursive
+        self.folder_filter_func = folder_filter_func if folder_filter_func is not None else (lambda name: True)
+
+        # Set up inotify
+        self._libc = _load_libc_inotify()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "Couldn't initialize inotify")
+
+        # Watch every folder
+        self._wd_to_folder_lut = {}
+        for each_folder in folder_path_list:
+            self._add_watch_tree(os.path.realpath(os.path.expanduser(each_folder)))
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Inotify watcher ({} folders)".format(len(self._wd_to_folder_lut))
+
+    # .................................................................................................................
+
+    def get_changes(self, timeout_sec = 1.0):
+
+        '''
+        Function which waits (up to the given timeout) for file changes
+        Returns:
+            changed_path_list, needs_rescan (True if events were lost, so folders should be re-scanned)
+        '''
+
+        # Wait for events to arrive
+        readable_list, _, _ = select.select([self._fd], [], [], timeout_sec)
+        if len(readable_list) == 0:
+            return [], False
+
+        # Read all available events
+        event_bytes = b""
+        while True:
+            try:
+                new_bytes = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if len(new_bytes) == 0:
+                break
+            event_bytes += new_bytes
+
+        # Interpret each event
+        changed_path_list = []
+        needs_rescan = False
+        byte_idx = 0
+        while byte_idx + EVENT_HEADER_SIZE <= len(event_bytes):
+            wd, mask, _, name_len = struct.unpack_from(EVENT_HEADER_FORMAT, event_bytes, byte_idx)
+            name_start_idx = byte_idx + EVENT_HEADER_SIZE
+            name = event_bytes[name_start_idx:(name_start_idx + name_len)].rstrip(b"\0").decode("utf-8", "replace")
+            byte_idx = name_start_idx + name_len
+
+            # Events were dropped by the kernel, so we can't trust that we've seen everything
+            if mask & IN_Q_OVERFLOW:
+                needs_rescan = True
+                continue
+
+            # Forget about folders that are no longer being watched
+            if mask & IN_IGNORED:
+                self._wd_to_folder_lut.pop(wd, None)
+                continue
+
+            parent_folder = self._wd_to_folder_lut.get(wd)
+            if parent_folder is None or name == "":
+                continue
+            event_path = os.path.join(parent_folder, name)
+
+            # Start watching new sub-folders. Files may have landed in them before the watch was added,
+            # so report everything already inside
+            if mask & IN_ISDIR:
+                if self.recursive and (mask & (IN_CREATE | IN_MOVED_TO)) and self.folder_filter_func(name):
+                    changed_path_list += self._add_watch_tree(event_path)
+                continue
+
+            changed_path_list.append(event_path)
+
+        return changed_path_list, needs_rescan
+
+    # .................................................................................................................
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    # .................................................................................................................
+
+    def _add_watch_tree(self, folder_path):
+
+        ''' Adds watches for a folder (and sub-folders if recursive). Returns list of files already present '''
+
+        existing_file_list = []
+        for each_parent, each_folder_list, each_file_list in os.walk(folder_path):
+            wd = self._libc.inotify_add_watch(self._fd, each_parent.encode("utf-8"), WATCH_MASK)
+            if wd >= 0:
+                self._wd_to_folder_lut[wd] = each_parent
+            existing_file_list += [os.path.join(each_parent, each_file) for each_file in each_file_list]
+
+            # Only descend into sub-folders we're supposed to watch
+            each_folder_list[:] = [each_folder for each_folder in each_folder_list
+                                   if self.recursive and self.folder_filter_func(each_folder)]
+
+        return existing_file_list
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+class Polling_Watcher:
+
+    '''
+    Class used to watch folders for new/changed files, by periodically listing folder contents.
+    Slower than inotify, but works everywhere (including network shares, which don't report inotify events
+    for changes made by other machines). Has the same interface as the Inotify_Watcher
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, folder_path_list, recursive = True, folder_filter_func = None, poll_interval_sec = 5.0):
+
+        # Store inputs
+        self.folder_path_list = [os.path.realpath(os.path.expanduser(each_folder)) for each_folder in folder_path_list]
+        self.recursive = recursive
+        self.folder_filter_func = folder_filter_func if folder_filter_func is not None else (lambda name: True)
+        self.poll_interval_sec = poll_interval_sec
+
+        # Record what's already in the folders, so we only report changes from here on
+        self._last_poll_time = perf_counter()
+        self._file_stats_lut = self._scan_files()
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Polling watcher ({} folders, every {} sec)".format(len(self.folder_path_list), self.poll_interval_sec)
+
+    # .................................................................................................................
+
+    def get_changes(self, timeout_sec = 1.0):
+
+        ''' Returns: changed_path_list, needs_rescan (always False, since polling never misses changes) '''
+
+        # Wait until it's time for the next poll (but no longer than the timeout)
+        time_until_poll = self.poll_interval_sec - (perf_counter() - self._last_poll_time)
+        if time_until_poll > timeout_sec:
+            sleep(timeout_sec)
+            return [], False
+        sleep(max(0, time_until_poll))
+        self._last_poll_time = perf_counter()
+
+        # Report any files that are new or have changed since the last poll
+        new_file_stats_lut = self._scan_files()
+        changed_path_list = [each_path for each_path, each_stats in new_file_stats_lut.items()
+                             if self._file_stats_lut.get(each_path) != each_stats]
+        self._file_stats_lut = new_file_stats_lut
+
+        return changed_path_list, False
+
+    # .................................................................................................................
+
+    def close(self):
+        self._file_stats_lut = {}
+
+    # .................................................................................................................
+
+    def _scan_files(self):
+
+        ''' Returns dictionary of file path -> (size, modification time) for every file in the watched folders '''
+
+        file_stats_lut = {}
+        for each_folder in self.folder_path_list:
+            for each_parent, each_folder_list, each_file_list in os.walk(each_folder):
+                each_folder_list[:] = [each_folder for each_folder in each_folder_list
+                                       if self.recursive and self.folder_filter_func(each_folder)]
+                for each_file in each_file_list:
+                    each_path = os.path.join(each_parent, each_file)
+                    try:
+                        file_stats = os.stat(each_path)
+                    except FileNotFoundError:
+                        continue
+                    file_stats_lut[each_path] = (file_stats.st_size, file_stats.st_mtime_ns)
+
+        return file_stats_lut
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def _load_libc_inotify():
+
+    # Load the C library & make sure it has inotify support (i.e. we're on linux)
+    libc_path = ctypes.util.find_library("c")
+    libc = ctypes.CDLL(libc_path, use_errno = True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError("Inotify is not available on this system")
+
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+    return libc
+
+# .....................................................................................................................
+
+def make_folder_watcher(folder_path_list, recursive = True, folder_filter_func = None,
+                        use_polling = False, poll_interval_sec = 5.0):
+
+    '''
+    Function which sets up a folder watcher, using inotify when available and falling back to polling
+    Returns:
+        watcher (Inotify_Watcher or Polling_Watcher)
+    '''
+
+    if not use_polling:
+        try:
+            return Inotify_Watcher(folder_path_list, recursive, folder_filter_func)
+        except (OSError, AttributeError, TypeError):
+            pass
+
+    return Polling_Watcher(folder_path_list, recursive, folder_filter_func, poll_interval_sec)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,1035 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:52:31 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import re
+import json
+import hashlib
+
+from fnmatch import fnmatch
+from time import perf_counter, strftime, sleep
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from local.eolib.video.read_write import check_codec_capability, find_fastest_valid_codec
+from local.eolib.video.frame_cache import Frame_Cache
+from local.eolib.video.prefetch import Input_Prefetcher
+from local.eolib.video.sharding import get_shard_number
+from local.eolib.video.catalog import probe_videos
+from local.eolib.video.scheduler import Task_Scheduler, Deadline_Tracker, DEADLINE_STEPS_LIST, parse_deadline
+from local.eolib.video.tuning import set_opencv_threads, get_tuned_config
+from local.eolib.video.throttling import Resource_Governor, LOW_IMPACT_NICENESS
+from local.eolib.video.throttling import set_low_impact_priority, combine_usage_stats
+from local.eolib.video.processing import Processing_Job, find_video_files, get_input_root, parse_output_spec
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Settings that can be given for the whole job, or overridden by rules, along with their allowed types
+SETTING_TYPES_DICT = {"rotation_n90": (int,),
+                      "target_fps": (int, float),
+                      "codec": (str,),
+                      "recording_ext": (str,),
+                      "use_intermediate": (bool,),
+                      "enable_derive": (bool,),
+                      "outputs": (list,)}
+
+DEFAULT_SETTINGS_DICT = {"rotation_n90": 0,
+                         "target_fps": 30.0,
+                         "codec": "avc1",
+                         "recording_ext": ".mp4",
+                         "use_intermediate": False,
+                         "enable_derive": True}
+
+# Top-level job spec keys, along with their allowed types
+JOB_SPEC_TYPES_DICT = {"inputs": (list,),
+                       "recursive": (bool,),
+                       "outputs": (list,),
+                       "settings": (dict,),
+                       "rules": (list,),
+                       "output_root": (str, type(None)),
+                       "staging_dir": (str, type(None)),
+                       "cache_dir": (str, type(None)),
+                       "cache_gb": (int, float),
+                       "prefetch_mb": (int, float, type(None)),
+                       "concurrency": (dict,),
+                       "state_file": (str, type(None)),
+                       "checkpoint_sec": (int, float, type(None)),
+                       "frame_index": (bool,),
+                       "low_impact": (dict,),
+                       "deadline": (dict,),
+                       "use_sidecars": (bool,)}
+
+CONCURRENCY_KEYS_LIST = ["workers", "opencv_threads", "probe_workers", "compress_workers"]
+
+# Low-impact mode settings: CPU budget (% of the machine), disk I/O budget (MB/s) & process priority
+LOW_IMPACT_KEYS_LIST = ["cpu_pct", "io_mbps", "niceness"]
+
+# Deadline mode settings: time to finish by & which cheaper settings are allowed (see DEADLINE_STEPS_LIST)
+DEADLINE_KEYS_LIST = ["finish_by", "allow"]
+
+# Ways a rule can pick out videos (a rule needs at least one, and all given entries must match)
+RULE_MATCH_KEYS_LIST = ["pattern", "camera"]
+
+# Per-video settings files are named after the video (e.g. "video.mp4" -> "video.rottler.json")
+SIDECAR_EXT_LIST = [".rottler.json", ".rottler.yaml", ".rottler.yml"]
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Batch_Job:
+
+    '''
+    Class used to run a (large) batch of videos described by a job spec file, using a pool of worker processes.
+    Every input is probed up front and it's settings resolved (from job-wide settings, rules & sidecar files),
+    so videos needing different settings can all share the same worker pool.
+    Finished videos are recorded in a state file, so interrupted jobs can be restarted without redoing work.
+
+    Example job spec (json):
+        {"inputs": ["~/videos/camera_1", "~/videos/**/*.mp4"],
+         "outputs": ["12:1.0", "60:0.25"],
+         "settings": {"rotation_n90": 1},
+         "rules": [{"pattern": "*/camera_2/*", "settings": {"rotation_n90": 3}},
+                   {"camera": "frontdoor", "settings": {"outputs": ["60:0.5"]}}],
+         "concurrency": {"workers": 4, "opencv_threads": 2},
+         "deadline": {"finish_by": "07:00", "allow": ["fast_resize", "keyframes"]}}
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, job_spec_dict, state_path = None, capability_dict = None, catalog = None,
+                 tuning_dict = None, shard = None, work_queue = None, executor = None, progress_bar_func = None,
+                 verbose = False):
+
+        '''
+        Inputs:
+            job_spec_dict -> Dictionary. Describes the job (see load_job_spec(...) & validate_job_spec(...))
+
+            state_path -> String or None. Path to a json file used to track finished videos.
+                          If None, the "state_file" entry of the job spec is used (if any)
+
+            capability_dict -> Dictionary or None. Codec probe results, used to check sidecar file settings
+
+            catalog -> Video_Catalog object or None. If provided, probe results are stored in (and re-used from)
+                       the catalog, so unchanged videos don't need to be opened when planning
+
+            tuning_dict -> Dictionary or None. Saved tuning results (see load_machine_results(...)). If provided,
+                           the tuned worker/thread counts are used, unless set by the job spec concurrency entry
+
+            shard -> Tuple or None. Given as (shard_number, num_shards), see parse_shard(...). If provided, only
+                     the videos assigned to this shard (by a stable hash of their path) are part of the job
+
+            work_queue -> Lease_Queue object or None. If provided, tasks are only run after claiming them from the
+                          (shared) queue, so several machines/processes can work through the same job together
+
+            executor -> ProcessPoolExecutor or None. If provided, this (already running) pool is used for probing &
+                        processing instead of starting new pools (e.g. to keep a warm pool between jobs). The pool
+                        should be set up with init_worker(...) & is left running once the job is done
+
+            progress_bar_func -> Function or None. If provided, called as progress_bar_func(total = N) and must
+                                 return an object with update() & close() methods (e.g. tqdm)
+
+            verbose -> Boolean. If true, progress messages are printed to the terminal
+        '''
+
+        # Store inputs
+        self.job_spec = job_spec_dict
+        self.state_path = state_path if state_path is not None else job_spec_dict.get("state_file")
+        self.capability_dict = capability_dict
+        self.catalog = catalog
+        self.tuning_dict = tuning_dict
+        self.shard = shard
+        self.work_queue = work_queue
+        self.executor = executor
+        self.progress_bar_func = progress_bar_func
+        self.verbose = verbose
+
+        # Pull out job-wide settings
+        concurrency_dict = job_spec_dict.get("concurrency", {})
+        self.num_workers = concurrency_dict.get("workers", 1)
+        self.num_opencv_threads = concurrency_dict.get("opencv_threads")
+        self.num_probe_workers = concurrency_dict.get("probe_workers", os.cpu_count())
+        self.output_root = job_spec_dict.get("output_root")
+        self.run_options = get_run_options(job_spec_dict)
+        self.input_root = self.run_options["input_root"]
+
+        # Allocate storage for planning results
+        self.task_list = []
+        self.plan_failures_dict = {}
+        self.tuned_class = None
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Batch job ({} tasks, {} workers)".format(len(self.task_list), self.num_workers)
+
+    # .................................................................................................................
+
+    def plan(self):
+
+        '''
+        Function which finds all input videos, probes them (in parallel) and resolves the settings for each one.
+        Unreadable videos (or videos with bad sidecar files) are left out of the plan and listed in the
+        plan_failures_dict attribute.
+        Returns:
+            task_list (list of task dictionaries, with keys: "task_key", "source_path", "probe", "settings")
+        '''
+
+        # Find & probe every input video (only new/changed videos need probing when using a catalog)
+        source_path_list = find_video_files(self.job_spec["inputs"], self.job_spec.get("recursive", True))
+        if self.shard is not None:
+            shard_number, num_shards = self.shard
+            source_path_list = [each_path for each_path in source_path_list
+                                if get_shard_number(each_path, num_shards) == shard_number]
+        self._print("", "Probing {} video(s)...".format(len(source_path_list)))
+        if self.catalog is None:
+            probe_results_list = probe_videos(source_path_list, self.num_probe_workers, self.executor)
+        else:
+            probe_results_list, num_probed = self.catalog.refresh(source_path_list, self.num_probe_workers)
+            self._print("  {} new/changed, {} from catalog".format(num_probed, len(source_path_list) - num_probed))
+
+        # Resolve settings for every readable video
+        task_list = []
+        plan_failures_dict = {}
+        for each_path, each_probe in zip(source_path_list, probe_results_list):
+            if not each_probe["ok"]:
+                plan_failures_dict[each_path] = each_probe["error"]
+                continue
+            try:
+                task_settings = resolve_task_settings(self.job_spec, each_path, self.capability_dict)
+            except ValueError as err:
+                plan_failures_dict[each_path] = str(err)
+                continue
+            task_list.append({"task_key": get_task_key(each_path, task_settings, self.output_root, self.input_root),
+                              "source_path": each_path,
+                              "probe": each_probe,
+                              "settings": task_settings})
+
+        # Leave out videos that would be saved to the same output path as another video (they'd overwrite each other)
+        collision_lut = find_task_collisions(task_list, self.run_options)
+        for each_path, each_other_list in collision_lut.items():
+            plan_failures_dict[each_path] = "Same output path as: {}".format(", ".join(each_other_list))
+        task_list = [each_task for each_task in task_list if each_task["source_path"] not in collision_lut]
+
+        self.task_list = task_list
+        self.plan_failures_dict = plan_failures_dict
+
+        # Use tuned worker/thread counts for the main class of videos in the batch, unless given explicitly
+        concurrency_dict = self.job_spec.get("concurrency", {})
+        if self.tuning_dict is not None and "workers" not in concurrency_dict:
+            self.tuned_class, tuned_config = get_tuned_config(self.tuning_dict, task_list)
+            if tuned_config is not None:
+                self.num_workers = tuned_config["workers"]
+                self.num_opencv_threads = concurrency_dict.get("opencv_threads", tuned_config["opencv_threads"])
+
+        return task_list
+
+    # .................................................................................................................
+
+    def run(self, fresh_start = False):
+
+        '''
+        Function which processes every planned task that hasn't already been finished (see plan(...)).
+        Tasks are handed out longest-first (based on probed duration, resolution & settings), so workers
+        finish at about the same time, with estimates adjusted as tasks finish.
+        If the job has a deadline, cheaper settings are used for tasks handed out while behind schedule.
+        When using a work queue, tasks claimed by other nodes are skipped, but are re-checked once there's nothing
+        else to do, so tasks abandoned by crashed nodes still get run
+        Inputs:
+            fresh_start -> Boolean. If true, previous progress (from the state file) is ignored
+        Returns:
+            run_stats_dict (keys: "finished", "skipped", "failed", "degraded", "other_nodes", "interrupted",
+                            "resource_usage", "total_time_sec")
+        '''
+
+        # Plan the job, if this hasn't been done already
+        if len(self.task_list) == 0:
+            self.plan()
+
+        # Figure out which tasks still need to run (fresh starts also ignore existing outputs)
+        # -> Low-impact budgets are for the whole job, so each worker gets an equal share
+        run_options = {**self.run_options, "reuse_outputs": not fresh_start, "resource_share": 1.0 / self.num_workers,
+                       "fast_codec_lut": get_fast_codec_lut(self.capability_dict)}
+        state_dict = {"tasks": {}} if fresh_start else load_job_state(self.state_path)
+        pending_task_list = self.get_pending_tasks(fresh_start)
+        num_skipped = len(self.task_list) - len(pending_task_list)
+        state_dict["job_spec"] = self.job_spec
+        if num_skipped > 0:
+            self._print("", "Skipping {} video(s) finished by previous runs".format(num_skipped))
+
+        # Set up progress feedback
+        prog_bar = None
+        if self.progress_bar_func is not None:
+            prog_bar = self.progress_bar_func(total = len(pending_task_list))
+
+        # Hand out tasks to the worker pool, recording results as they come back
+        # -> Only as many tasks as there are workers are submitted at a time, so the scheduler can re-order
+        #    the remaining tasks as actual processing times come in
+        t_start = perf_counter()
+        finished_list, failed_dict, degraded_dict, usage_list = [], {}, {}, []
+        deferred_list, num_other_nodes = [], 0
+        interrupted = False
+        scheduler = Task_Scheduler(pending_task_list)
+        deadline_tracker = make_deadline_tracker(self.job_spec.get("deadline"))
+        prefetch_mb = self.job_spec.get("prefetch_mb")
+        prefetcher = Input_Prefetcher(prefetch_mb) if prefetch_mb is not None else None
+        executor = self.executor
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers = self.num_workers, initializer = init_worker,
+                                           initargs = (self.num_opencv_threads, run_options["low_impact"]))
+        future_lut = {}
+        try:
+            while (scheduler.num_remaining + len(deferred_list) > 0 and not interrupted) or len(future_lut) > 0:
+
+                # Stop handing out work once interrupted, but still record results from tasks already running
+                while scheduler.num_remaining > 0 and len(future_lut) < self.num_workers and not interrupted:
+                    task_options = run_options
+                    if deadline_tracker is not None:
+                        self._update_deadline(deadline_tracker, scheduler)
+                        task_options = {**run_options, "degrade_list": deadline_tracker.degrade_list}
+                    next_task = scheduler.next_task()
+                    claim_status = self._claim_task(next_task)
+                    if claim_status == "leased":
+                        deferred_list.append(next_task)
+                    elif claim_status in {"done", "failed"}:
+                        num_other_nodes += 1
+                        if prog_bar is not None:
+                            prog_bar.update()
+                    else:
+                        future_lut[executor.submit(run_task, next_task, task_options)] = next_task
+
+                # Read ahead the videos that will be handed out next, while the workers are busy
+                if prefetcher is not None:
+                    prefetcher.set_upcoming([each_task["source_path"]
+                                             for each_task in scheduler.peek_tasks(self.num_workers)])
+
+                # Only tasks being run by other nodes are left, so check back on them later
+                if len(future_lut) == 0:
+                    sleep(self.work_queue.lease_sec / 4)
+                    scheduler.add_tasks(deferred_list)
+                    deferred_list = []
+                    continue
+
+                done_future_set, _ = wait(future_lut, return_when = FIRST_COMPLETED)
+                for each_future in done_future_set:
+                    task_dict = future_lut.pop(each_future)
+                    task_result = get_task_result(each_future)
+                    interrupted = interrupted or task_result["interrupted"]
+                    if self.work_queue is not None:
+                        self.work_queue.finish(task_dict["task_key"], task_result["status"],
+                                               {"source_path": task_dict["source_path"]})
+                    state_dict["tasks"][task_dict["task_key"]] = make_state_entry(task_dict, task_result)
+                    save_job_state(self.state_path, state_dict)
+                    if task_result["status"] == "done":
+                        finished_list.append(task_dict["source_path"])
+                    elif task_result["status"] == "failed":
+                        failed_dict[task_dict["source_path"]] = task_result["issues"]
+                    if len(task_result["degraded"]) > 0:
+                        degraded_dict[task_dict["source_path"]] = task_result["degraded"]
+                    if task_result["resource_usage"] is not None:
+                        usage_list.append(task_result["resource_usage"])
+                    if prog_bar is not None:
+                        prog_bar.update()
+
+                    # Only full decodes are representative of processing speed (re-used outputs take no time)
+                    if task_result["frame_source"] == "decode":
+                        scheduler.record_result(task_dict, task_result["process_time_sec"])
+
+        except KeyboardInterrupt:
+            interrupted = True
+
+        # Clean up (a shared pool is left running, but anything we didn't get to is cancelled)
+        if self.executor is None:
+            executor.shutdown(wait = True, cancel_futures = True)
+        for each_future in future_lut:
+            each_future.cancel()
+        if prefetcher is not None:
+            prefetcher.close()
+        if self.work_queue is not None:
+            self.work_queue.close()
+        if prog_bar is not None:
+            prog_bar.close()
+
+        # Report actual resource usage of the whole job vs. the budget, when running in low-impact mode
+        total_time_sec = perf_counter() - t_start
+        low_impact_dict = run_options["low_impact"]
+        usage_dict = None
+        if low_impact_dict is not None:
+            usage_dict = combine_usage_stats(usage_list, total_time_sec,
+                                             low_impact_dict.get("cpu_pct"), low_impact_dict.get("io_mbps"))
+
+        run_stats_dict = {"finished": finished_list,
+                          "skipped": num_skipped,
+                          "failed": failed_dict,
+                          "degraded": degraded_dict,
+                          "other_nodes": num_other_nodes,
+                          "interrupted": interrupted,
+                          "resource_usage": usage_dict,
+                          "total_time_sec": total_time_sec}
+
+        return run_stats_dict
+
+    # .................................................................................................................
+
+    def get_pending_tasks(self, fresh_start = False):
+
+        '''
+        Returns the planned tasks that weren't finished by previous runs of the job (all tasks if fresh).
+        Videos finished with cheaper (deadline) settings are included again once the job has no deadline,
+        so they get re-processed at full quality
+        '''
+
+        if fresh_start:
+            return list(self.task_list)
+
+        state_dict = load_job_state(self.state_path)
+        redo_degraded = ("deadline" not in self.job_spec)
+        finished_key_set = {each_key for each_key, each_entry in state_dict["tasks"].items()
+                            if each_entry["status"] == "done"
+                            and not (redo_degraded and len(each_entry.get("degraded", [])) > 0)}
+
+        return [each_task for each_task in self.task_list if each_task["task_key"] not in finished_key_set]
+
+    # .................................................................................................................
+
+    def _claim_task(self, task_dict):
+        # Every task is ours to run, unless we're sharing a work queue with other nodes
+        if self.work_queue is None:
+            return "claimed"
+        return self.work_queue.claim(task_dict["task_key"], task_dict["source_path"])
+
+    # .................................................................................................................
+
+    def _update_deadline(self, deadline_tracker, scheduler):
+
+        # Only queued work is counted (tasks already running are mostly done by the time others are handed out)
+        level_changed = deadline_tracker.update(scheduler.estimate_remaining_sec(self.num_workers))
+        if not level_changed:
+            return
+
+        degrade_list = deadline_tracker.degrade_list
+        time_left_mins = max(0.0, deadline_tracker.time_left_sec) / 60.0
+        if len(degrade_list) > 0:
+            self._print("", "Behind schedule ({:.0f} mins left), now using: {}".format(time_left_mins,
+                                                                                       ", ".join(degrade_list)))
+        else:
+            self._print("", "Back on schedule ({:.0f} mins left), using full quality settings".format(time_left_mins))
+
+    # .................................................................................................................
+
+    def _print(self, *print_strs):
+        if self.verbose:
+            print(*print_strs, sep = "\n")
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def load_job_spec(spec_path):
+
+    '''
+    Function which loads a job spec from a .json or .yaml/.yml file (YAML support requires PyYAML).
+    Relative paths in the spec are treated as relative to the folder containing the job file
+    '''
+
+    job_spec_dict = _load_json_or_yaml(spec_path)
+    if not isinstance(job_spec_dict, dict):
+        raise ValueError("Job spec must be a dictionary/mapping! ({})".format(spec_path))
+
+    # Interpret relative paths as relative to the job file, so jobs run the same way from any working directory
+    spec_folder = os.path.dirname(os.path.realpath(os.path.expanduser(spec_path)))
+
+    return resolve_job_paths(job_spec_dict, spec_folder)
+
+# .....................................................................................................................
+
+def resolve_job_paths(job_spec_dict, base_folder):
+
+    ''' Function which makes every (relative) path in a job spec relative to the given folder. Modifies the input! '''
+
+    def make_abs(path): return os.path.join(base_folder, os.path.expanduser(path)) if isinstance(path, str) else path
+    if isinstance(job_spec_dict.get("inputs"), list):
+        job_spec_dict["inputs"] = [make_abs(each_input) for each_input in job_spec_dict["inputs"]]
+    for each_key in ["output_root", "staging_dir", "cache_dir", "state_file"]:
+        if each_key in job_spec_dict:
+            job_spec_dict[each_key] = make_abs(job_spec_dict[each_key])
+
+    return job_spec_dict
+
+# .....................................................................................................................
+
+def _load_json_or_yaml(file_path):
+
+    _, file_ext = os.path.splitext(file_path)
+    with open(os.path.expanduser(file_path), "r") as in_file:
+
+        if file_ext.lower() in {".yaml", ".yml"}:
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Need to install PyYAML to load .yaml files. Use:  pip3 install pyyaml")
+            return yaml.safe_load(in_file)
+
+        return json.load(in_file)
+
+# .....................................................................................................................
+
+def validate_job_spec(job_spec_dict, capability_dict = None, watch_folders = False):
+
+    '''
+    Function which checks an entire job spec for problems, before any processing is done
+    Inputs:
+        job_spec_dict -> Dictionary. The job spec to check
+
+        capability_dict -> Dictionary or None. Codec probe results (see load_codec_capabilities(...)).
+                           If provided, every extension/codec pair used by the job must be known to work
+
+        watch_folders -> Boolean. If true, inputs must be (existing) folders, which may not contain videos yet
+    Returns:
+        error_list (list of strings, empty if the spec is valid)
+    '''
+
+    # Check top-level entries
+    error_list = []
+    for each_key, each_value in job_spec_dict.items():
+        if each_key not in JOB_SPEC_TYPES_DICT:
+            error_list.append("Unknown entry: {}".format(each_key))
+        elif not _is_type(each_value, JOB_SPEC_TYPES_DICT[each_key]):
+            error_list.append("Bad type for entry: {} ({})".format(each_key, type(each_value).__name__))
+    if len(error_list) > 0:
+        return error_list
+
+    # Check that the inputs exist
+    input_list = job_spec_dict.get("inputs", [])
+    if len(input_list) == 0:
+        error_list.append("No inputs given")
+    for each_input in input_list:
+        if watch_folders:
+            if not os.path.isdir(os.path.expanduser(str(each_input))):
+                error_list.append("Watch inputs must be folders: {}".format(each_input))
+            continue
+        try:
+            if len(find_video_files([each_input], job_spec_dict.get("recursive", True))) == 0:
+                error_list.append("No videos found for input: {}".format(each_input))
+        except (FileNotFoundError, TypeError) as err:
+            error_list.append("Bad input: {}".format(err))
+
+    # Check read-ahead budget (None disables prefetching)
+    prefetch_mb = job_spec_dict.get("prefetch_mb")
+    if prefetch_mb is not None and prefetch_mb <= 0:
+        error_list.append("Entry prefetch_mb must be positive (or null to disable prefetching)")
+
+    # Check checkpoint timing (None disables checkpoints)
+    checkpoint_sec = job_spec_dict.get("checkpoint_sec")
+    if checkpoint_sec is not None and checkpoint_sec <= 0:
+        error_list.append("Entry checkpoint_sec must be positive (or null to disable checkpoints)")
+
+    # Check concurrency settings
+    for each_key, each_value in job_spec_dict.get("concurrency", {}).items():
+        if each_key not in CONCURRENCY_KEYS_LIST:
+            error_list.append("Unknown concurrency entry: {}".format(each_key))
+        elif not (_is_type(each_value, (int,)) and each_value >= 1):
+            error_list.append("Concurrency entry {} must be a positive integer".format(each_key))
+
+    # Check low-impact settings (budgets must be positive, CPU usage can't be more than the whole machine)
+    for each_key, each_value in job_spec_dict.get("low_impact", {}).items():
+        if each_key not in LOW_IMPACT_KEYS_LIST:
+            error_list.append("Unknown low_impact entry: {}".format(each_key))
+        elif each_key == "niceness":
+            if not (_is_type(each_value, (int,)) and 0 <= each_value <= 19):
+                error_list.append("Entry low_impact niceness must be an integer from 0 to 19")
+        elif not (_is_type(each_value, (int, float)) and each_value > 0):
+            error_list.append("Entry low_impact {} must be a positive number".format(each_key))
+        elif each_key == "cpu_pct" and each_value > 100:
+            error_list.append("Entry low_impact cpu_pct can't be more than 100")
+
+    # Check deadline settings (only makes sense for jobs that have an end)
+    deadline_dict = job_spec_dict.get("deadline")
+    if deadline_dict is not None:
+        if watch_folders:
+            error_list.append("Entry deadline can't be used with watch folders")
+        unknown_deadline_keys = set(deadline_dict.keys()) - set(DEADLINE_KEYS_LIST)
+        if len(unknown_deadline_keys) > 0:
+            error_list.append("Unknown deadline entries: {}".format(", ".join(sorted(unknown_deadline_keys))))
+        try:
+            parse_deadline(deadline_dict.get("finish_by"))
+        except ValueError as err:
+            error_list.append("Entry deadline finish_by: {}".format(err))
+        allowed_steps_list = deadline_dict.get("allow", DEADLINE_STEPS_LIST)
+        if not (isinstance(allowed_steps_list, list) and set(allowed_steps_list).issubset(DEADLINE_STEPS_LIST)):
+            error_list.append("Entry deadline allow must be a list using: {}".format(", ".join(DEADLINE_STEPS_LIST)))
+
+    # Check job-wide settings & outputs
+    if "outputs" not in job_spec_dict:
+        error_list.append("No outputs given")
+    base_settings_dict = {"outputs": job_spec_dict.get("outputs", []), **job_spec_dict.get("settings", {})}
+    base_error_list = _validate_settings(base_settings_dict, "settings", capability_dict)
+    error_list += base_error_list
+
+    # Check rules
+    for each_idx, each_rule in enumerate(job_spec_dict.get("rules", [])):
+        rule_name = "rule {}".format(1 + each_idx)
+        if not (isinstance(each_rule, dict) and isinstance(each_rule.get("settings"), dict)):
+            error_list.append("Rules must be dictionaries with a 'settings' entry ({})".format(rule_name))
+            continue
+        rule_match_list = [each_rule[each_key] for each_key in RULE_MATCH_KEYS_LIST if each_key in each_rule]
+        if len(rule_match_list) == 0 or not all(isinstance(each_value, str) for each_value in rule_match_list):
+            error_list.append("Rules need a 'pattern' (path glob) and/or 'camera' entry ({})".format(rule_name))
+        unknown_rule_keys = set(each_rule.keys()) - {"settings", *RULE_MATCH_KEYS_LIST}
+        if len(unknown_rule_keys) > 0:
+            error_list.append("Unknown rule entries: {} ({})".format(", ".join(sorted(unknown_rule_keys)), rule_name))
+
+        # Check rule settings as they would actually be used (i.e. combined with the job-wide settings)
+        error_list += _validate_settings(each_rule["settings"], rule_name, capability_dict, base_settings_dict,
+                                         check_outputs = (len(base_error_list) == 0))
+
+    return error_list
+
+# .....................................................................................................................
+
+def _validate_settings(settings_dict, settings_name, capability_dict = None, base_settings_dict = None,
+                       check_outputs = True):
+
+    # Check setting names & types
+    error_list = []
+    for each_key, each_value in settings_dict.items():
+        if each_key not in SETTING_TYPES_DICT:
+            error_list.append("Unknown setting: {} ({})".format(each_key, settings_name))
+        elif not _is_type(each_value, SETTING_TYPES_DICT[each_key]):
+            error_list.append("Bad type for setting: {} ({})".format(each_key, settings_name))
+    if len(error_list) > 0:
+        return error_list
+
+    # Skip output checks when the settings they build on are already known to be bad (avoids repeated errors)
+    if not check_outputs:
+        return error_list
+    base_settings_dict = {} if base_settings_dict is None else base_settings_dict
+
+    # Check that every output can be interpreted
+    full_settings_dict = {**DEFAULT_SETTINGS_DICT, **base_settings_dict, **settings_dict}
+    try:
+        output_spec_list = resolve_output_specs(full_settings_dict)
+    except (ValueError, KeyError, TypeError, IndexError) as err:
+        return ["Bad output: {} ({})".format(err, settings_name)]
+
+    # Check output values & recording settings
+    for each_spec in output_spec_list:
+        if each_spec["timelapse_factor"] <= 0 or each_spec["scale_factor"] <= 0:
+            error_list.append("Bad timelapse/scale values: {} / {} ({})".format(each_spec["timelapse_factor"],
+                                                                             each_spec["scale_factor"],
+                                                                             settings_name))
+        if capability_dict is not None:
+            codec_works = check_codec_capability(capability_dict, each_spec["recording_ext"], each_spec["codec"])
+            if not codec_works:
+                error_list.append("Recording with {} / {} doesn't work on this system ({})".format(
+                                  each_spec["recording_ext"], each_spec["codec"], settings_name))
+
+    return error_list
+
+# .....................................................................................................................
+
+def _is_type(value, allowed_types):
+    # Helper used to check types, without allowing booleans to pass as numbers
+    if isinstance(value, bool) and bool not in allowed_types:
+        return False
+    return isinstance(value, allowed_types)
+
+# .....................................................................................................................
+
+def get_job_codec_list(job_spec_dict):
+
+    ''' Function which returns every (recording_ext, codec) pair that a job spec would record with '''
+
+    base_settings_dict = {"outputs": job_spec_dict.get("outputs", []), **job_spec_dict.get("settings", {})}
+    settings_list = [base_settings_dict]
+    settings_list += [{**base_settings_dict, **each_rule.get("settings", {})}
+                      for each_rule in job_spec_dict.get("rules", [])]
+
+    codec_list = []
+    for each_settings in settings_list:
+        for each_spec in resolve_output_specs({**DEFAULT_SETTINGS_DICT, **each_settings}):
+            each_pair = (each_spec["recording_ext"], each_spec["codec"])
+            if each_pair not in codec_list:
+                codec_list.append(each_pair)
+
+    return codec_list
+
+# .....................................................................................................................
+
+def resolve_output_specs(settings_dict):
+
+    '''
+    Function which converts the "outputs" entry of a (full) settings dictionary into output spec dictionaries.
+    Outputs can be given as "timelapse:scale[:codec[:ext]]" strings or as dictionaries with keys:
+    "timelapse_factor", "scale_factor" (optional, default 1.0), "codec" & "recording_ext" (both optional)
+    '''
+
+    default_codec = settings_dict["codec"]
+    default_ext = settings_dict["recording_ext"]
+
+    output_spec_list = []
+    for each_output in settings_dict["outputs"]:
+        if isinstance(each_output, str):
+            output_spec_list.append(parse_output_spec(each_output, default_codec, default_ext))
+            continue
+
+        # Re-use the string parsing, so dictionary outputs get the same clean up of codec/extension values
+        spec_str = ":".join(str(each_part) for each_part in [each_output["timelapse_factor"],
+                                                             each_output.get("scale_factor", 1.0),
+                                                             each_output.get("codec", default_codec),
+                                                             each_output.get("recording_ext", default_ext)])
+        output_spec_list.append(parse_output_spec(spec_str, default_codec, default_ext))
+
+    return output_spec_list
+
+# .....................................................................................................................
+
+def resolve_task_settings(job_spec_dict, source_path, capability_dict = None):
+
+    '''
+    Function which works out the settings used for a single video. Job-wide settings are applied first,
+    followed by every rule that matches the video (in order, so later rules take priority)
+    and finally the video's sidecar file, if there is one (see find_sidecar_path(...)).
+    Raises a ValueError if the sidecar file can't be used
+    Returns:
+        task_settings_dict (keys: "rotation_n90", "target_fps", "use_intermediate", "enable_derive",
+                            "output_spec_list")
+    '''
+
+    # Combine defaults, job-wide settings & matching rules
+    settings_dict = {**DEFAULT_SETTINGS_DICT, "outputs": job_spec_dict.get("outputs", [])}
+    settings_dict.update(job_spec_dict.get("settings", {}))
+    for each_rule in job_spec_dict.get("rules", []):
+        if rule_matches(each_rule, source_path):
+            settings_dict.update(each_rule["settings"])
+
+    # Sidecar files get the final say, since they're specific to a single video
+    sidecar_path = find_sidecar_path(source_path) if job_spec_dict.get("use_sidecars", True) else None
+    if sidecar_path is not None:
+        try:
+            sidecar_dict = _load_json_or_yaml(sidecar_path)
+        except (ValueError, OSError, ImportError) as err:
+            raise ValueError("Couldn't load sidecar file: {} ({})".format(os.path.basename(sidecar_path), err))
+        sidecar_dict = {} if sidecar_dict is None else sidecar_dict
+        if not isinstance(sidecar_dict, dict):
+            raise ValueError("Sidecar file must be a dictionary/mapping: {}".format(os.path.basename(sidecar_path)))
+        sidecar_error_list = _validate_settings(sidecar_dict, "sidecar", capability_dict, settings_dict)
+        if len(sidecar_error_list) > 0:
+            raise ValueError("; ".join(sidecar_error_list))
+        settings_dict.update(sidecar_dict)
+
+    task_settings_dict = {"rotation_n90": int(settings_dict["rotation_n90"]),
+                          "target_fps": float(settings_dict["target_fps"]),
+                          "use_intermediate": settings_dict["use_intermediate"],
+                          "enable_derive": settings_dict["enable_derive"],
+                          "output_spec_list": resolve_output_specs(settings_dict)}
+
+    return task_settings_dict
+
+# .....................................................................................................................
+
+def rule_matches(rule_dict, source_path):
+
+    '''
+    Function which checks if a rule applies to a given video. Rules can match using:
+        "pattern" -> A glob matched against the full path or the file name (e.g. "*/camera_2/*" or "*.mov")
+        "camera"  -> A camera name appearing in the file name, as a separate word (case-insensitive).
+                     For example "frontdoor" matches "frontdoor_2026-01-01.mp4" or "Cam-FrontDoor-003.mp4",
+                     but not "backfrontdoors.mp4"
+    If both are given, both must match
+    '''
+
+    full_path = os.path.realpath(source_path)
+    file_name = os.path.basename(full_path)
+
+    pattern = rule_dict.get("pattern")
+    if pattern is not None and not (fnmatch(full_path, pattern) or fnmatch(file_name, pattern)):
+        return False
+
+    camera_name = rule_dict.get("camera")
+    if camera_name is not None and camera_name.lower() not in get_file_name_words(file_name):
+        return False
+
+    return True
+
+# .....................................................................................................................
+
+def get_file_name_words(file_name):
+
+    # Split a file name (without extension) into lowercase 'words', using any non-alphanumeric characters
+    name_only, _ = os.path.splitext(file_name)
+    return [each_word for each_word in re.split("[^a-z0-9]+", name_only.lower()) if each_word != ""]
+
+# .....................................................................................................................
+
+def find_sidecar_path(source_path):
+
+    ''' Function which returns the path to the settings (sidecar) file of a video, or None if there isn't one '''
+
+    source_path_only, _ = os.path.splitext(source_path)
+    for each_ext in SIDECAR_EXT_LIST:
+        sidecar_path = "{}{}".format(source_path_only, each_ext)
+        if os.path.exists(sidecar_path):
+            return sidecar_path
+
+    return None
+
+# .....................................................................................................................
+
+def get_task_key(source_path, task_settings_dict, output_root = None, input_root = None):
+
+    # Key on the file identity as well as everything that affects the outputs, so changes lead to re-processing
+    real_path = os.path.realpath(source_path)
+    file_stats = os.stat(real_path)
+    key_dict = {"source_path": real_path,
+                "mtime_ns": file_stats.st_mtime_ns,
+                "size": file_stats.st_size,
+                "settings": task_settings_dict,
+                "output_root": output_root,
+                "input_root": input_root if output_root is not None else None}
+    key_str = json.dumps(key_dict, sort_keys = True)
+
+    return hashlib.sha1(key_str.encode("utf-8")).hexdigest()
+
+# .....................................................................................................................
+
+def get_run_options(job_spec_dict):
+
+    ''' Function which pulls out the job-wide settings needed to process each video (see run_task(...)) '''
+
+    input_list = job_spec_dict.get("inputs", [])
+    run_options_dict = {"output_root": job_spec_dict.get("output_root"),
+                        "input_root": get_input_root(input_list) if len(input_list) > 0 else None,
+                        "staging_dir": job_spec_dict.get("staging_dir"),
+                        "cache_dir": job_spec_dict.get("cache_dir"),
+                        "cache_gb": job_spec_dict.get("cache_gb", 50.0),
+                        "num_compress_workers": job_spec_dict.get("concurrency", {}).get("compress_workers", 2),
+                        "checkpoint_sec": job_spec_dict.get("checkpoint_sec", 300.0),
+                        "reuse_outputs": True,
+                        "use_frame_index": job_spec_dict.get("frame_index", False),
+                        "low_impact": job_spec_dict.get("low_impact"),
+                        "resource_share": 1.0 / job_spec_dict.get("concurrency", {}).get("workers", 1),
+                        "degrade_list": [],
+                        "fast_codec_lut": {}}
+
+    return run_options_dict
+
+# .....................................................................................................................
+
+def find_task_collisions(task_list, run_options_dict):
+
+    '''
+    Function which checks for tasks whose outputs would be saved to the same path (e.g. videos with the same name
+    but different file extensions in one folder), which would otherwise overwrite each other.
+    Returns:
+        collision_lut (keys: source paths, values: list of other source paths sharing an output path)
+    '''
+
+    source_path_lut = {}
+    for each_task in task_list:
+        task_settings = each_task["settings"]
+        processing_job = Processing_Job(rotation_n90 = task_settings["rotation_n90"],
+                                        output_root = run_options_dict["output_root"],
+                                        input_root = run_options_dict["input_root"],
+                                        output_spec_list = task_settings["output_spec_list"])
+        for each_save_path in processing_job.get_save_paths(each_task["source_path"]):
+            source_path_lut.setdefault(each_save_path, set()).add(each_task["source_path"])
+
+    collision_lut = {}
+    for each_path_set in source_path_lut.values():
+        if len(each_path_set) < 2:
+            continue
+        for each_path in each_path_set:
+            other_path_list = collision_lut.setdefault(each_path, [])
+            other_path_list += sorted(each_path_set - {each_path} - set(other_path_list))
+
+    return collision_lut
+
+# .....................................................................................................................
+
+def make_deadline_tracker(deadline_dict):
+
+    ''' Helper used to set up deadline tracking from the job spec entry (returns None if there's no deadline) '''
+
+    if deadline_dict is None:
+        return None
+
+    return Deadline_Tracker(parse_deadline(deadline_dict["finish_by"]), deadline_dict.get("allow", DEADLINE_STEPS_LIST))
+
+# .....................................................................................................................
+
+def get_fast_codec_lut(capability_dict):
+
+    ''' Function which finds the fastest working codec for each (working) file type, used to meet deadlines '''
+
+    if capability_dict is None:
+        return {}
+
+    fast_codec_lut = {}
+    ext_set = {each_key.split("/")[0] for each_key, each_result in capability_dict.items()
+               if each_result.get("valid", False)}
+    for each_ext in ext_set:
+        _, fast_codec_lut[each_ext] = find_fastest_valid_codec(capability_dict, each_ext)
+
+    return fast_codec_lut
+
+# .....................................................................................................................
+
+def run_task(task_dict, run_options_dict):
+
+    '''
+    Function which processes a single video (meant to be called from a worker process)
+    Inputs:
+        task_dict -> Dictionary. Describes the video & it's settings (see Batch_Job.plan(...))
+
+        run_options_dict -> Dictionary. Job-wide settings (see get_run_options(...))
+
+    Returns:
+        task_result_dict (keys: "status", "outputs", "issues", "frame_source", "degraded", "resource_usage",
+                          "interrupted", "process_time_sec")
+    '''
+
+    # Swap in the fastest codec for each output file type, if we need to cut costs to meet a deadline
+    task_settings = task_dict["settings"]
+    degrade_list = run_options_dict["degrade_list"]
+    output_spec_list = task_settings["output_spec_list"]
+    if "fast_codec" in degrade_list:
+        fast_codec_lut = run_options_dict["fast_codec_lut"]
+        output_spec_list = [{**each_spec, "codec": fast_codec_lut.get(each_spec["recording_ext"], each_spec["codec"])}
+                            for each_spec in output_spec_list]
+
+    # Each task gets it's own processing job, since settings may differ from video to video
+    cache_dir = run_options_dict["cache_dir"]
+    frame_cache = Frame_Cache(cache_dir, run_options_dict["cache_gb"]) if cache_dir is not None else None
+    low_impact_dict = run_options_dict["low_impact"]
+    governor = None
+    if low_impact_dict is not None:
+        governor = Resource_Governor(low_impact_dict.get("cpu_pct"), low_impact_dict.get("io_mbps"),
+                                     share = run_options_dict["resource_share"])
+    processing_job = Processing_Job(rotation_n90 = task_settings["rotation_n90"],
+                                    target_fps = task_settings["target_fps"],
+                                    output_root = run_options_dict["output_root"],
+                                    input_root = run_options_dict["input_root"],
+                                    staging_dir = run_options_dict["staging_dir"],
+                                    output_spec_list = output_spec_list,
+                                    use_intermediate = task_settings["use_intermediate"],
+                                    num_compress_workers = run_options_dict["num_compress_workers"],
+                                    frame_cache = frame_cache,
+                                    enable_derive = task_settings["enable_derive"],
+                                    checkpoint_sec = run_options_dict["checkpoint_sec"],
+                                    reuse_outputs = run_options_dict["reuse_outputs"],
+                                    use_frame_index = run_options_dict["use_frame_index"],
+                                    governor = governor,
+                                    fast_resize = ("fast_resize" in degrade_list),
+                                    keyframe_sampling = ("keyframes" in degrade_list))
+    run_stats = processing_job.run([task_dict["source_path"]])
+    file_stats = run_stats["files"][0]
+
+    # Summarize results
+    issues_list = ["{}: {}".format(os.path.basename(each_path), each_issue)
+                   for each_path, each_issues_list in run_stats["failed_verification"].items()
+                   for each_issue in each_issues_list]
+    status = "interrupted" if run_stats["interrupted"] else ("failed" if len(issues_list) > 0 else "done")
+    degraded_set = set(file_stats["degraded"])
+    if output_spec_list != task_settings["output_spec_list"] and file_stats["frame_source"] != "reused":
+        degraded_set.add("fast_codec")
+    task_result_dict = {"status": status,
+                        "outputs": [each_output["save_path"] for each_output in file_stats["outputs"]],
+                        "issues": issues_list,
+                        "frame_source": file_stats["frame_source"],
+                        "degraded": [each_step for each_step in DEADLINE_STEPS_LIST if each_step in degraded_set],
+                        "resource_usage": run_stats["resource_usage"],
+                        "interrupted": run_stats["interrupted"],
+                        "process_time_sec": file_stats["process_time_sec"]}
+
+    return task_result_dict
+
+# .....................................................................................................................
+
+def get_task_result(task_future):
+
+    # Turn errors from worker processes into (failed) task results, so one bad video doesn't stop the whole job
+    try:
+        return task_future.result()
+    except KeyboardInterrupt:
+        raise
+    except Exception as err:
+        return {"status": "failed", "outputs": [], "issues": ["Processing error: {}".format(err)],
+                "frame_source": None, "degraded": [], "resource_usage": None, "interrupted": False,
+                "process_time_sec": 0.0}
+
+# .....................................................................................................................
+
+def init_worker(num_opencv_threads = None, low_impact_dict = None):
+
+    # Set up each worker process of a pool (OpenCV threading & lowered priority, if running in low-impact mode)
+    set_opencv_threads(num_opencv_threads)
+    if low_impact_dict is not None:
+        set_low_impact_priority(low_impact_dict.get("niceness", LOW_IMPACT_NICENESS), low_impact_dict.get("cpu_pct"))
+
+# .....................................................................................................................
+
+def make_state_entry(task_dict, task_result_dict):
+    return {"source_path": task_dict["source_path"],
+            "settings": task_dict["settings"],
+            "status": task_result_dict["status"],
+            "outputs": task_result_dict["outputs"],
+            "issues": task_result_dict["issues"],
+            "degraded": task_result_dict["degraded"],
+            "process_time_sec": task_result_dict["process_time_sec"],
+            "timestamp": strftime("%Y-%m-%d %H:%M:%S")}
+
+# .....................................................................................................................
+
+def load_job_state(state_path):
+
+    ''' Function which loads job progress from a state file. Returns empty progress if there is no (valid) file '''
+
+    state_dict = {"tasks": {}}
+    if state_path is not None and os.path.exists(state_path):
+        try:
+            with open(state_path, "r") as in_file:
+                state_dict.update(json.load(in_file))
+        except (ValueError, OSError):
+            pass
+
+    return state_dict
+
+# .....................................................................................................................
+
+def save_job_state(state_path, state_dict):
+
+    # Write to a temporary file first, so a crash mid-write can't corrupt the existing progress
+    if state_path is None:
+        return
+    temp_path = "{}.tmp".format(state_path)
+    with open(temp_path, "w") as out_file:
+        json.dump(state_dict, out_file, indent = 2)
+    os.replace(temp_path, state_path)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
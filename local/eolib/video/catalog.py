@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 16:05:38 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import cv2
+import sqlite3
+
+from time import strftime
+from concurrent.futures import ProcessPoolExecutor
+
+from local.eolib.video.read_write import get_video_object_info
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Should be bumped whenever the table layout changes (older catalogs are then rebuilt from scratch)
+CATALOG_SCHEMA_VERSION = 1
+
+CATALOG_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS videos (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ok INTEGER NOT NULL,
+    error TEXT,
+    total_frames INTEGER,
+    fps REAL,
+    width INTEGER,
+    height INTEGER,
+    codec TEXT,
+    duration_sec REAL,
+    probed_time TEXT
+);
+CREATE INDEX IF NOT EXISTS videos_folder_idx ON videos (folder);
+CREATE INDEX IF NOT EXISTS videos_name_idx ON videos (name);
+CREATE INDEX IF NOT EXISTS videos_codec_idx ON videos (codec);
+CREATE INDEX IF NOT EXISTS videos_duration_idx ON videos (duration_sec);
+CREATE INDEX IF NOT EXISTS videos_height_idx ON videos (height);
+"""
+
+# Columns that query results can be sorted by
+CATALOG_SORT_COLUMNS_LIST = ["path", "name", "size", "total_frames", "fps", "height", "codec", "duration_sec"]
+
+# Maximum number of paths looked up per query (sqlite limits the number of parameters in a single query)
+LOOKUP_CHUNK_SIZE = 500
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Video_Catalog:
+
+    '''
+    Class used to store probed video info (framerate, frame count, size, codec, duration) in a local sqlite
+    database, so videos only need to be opened once. Entries are keyed by path and are only trusted while the
+    file size & modification time are unchanged.
+
+    Example:
+        catalog = Video_Catalog("/path/to/catalog.sqlite")
+        probe_results_list, num_probed = catalog.refresh(video_path_list)
+        long_videos_list = catalog.query(min_duration_sec = 3600)
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, db_path):
+
+        # Store inputs
+        self.db_path = os.path.expanduser(db_path)
+
+        # Connect to the database, making sure it has the expected layout
+        db_folder = os.path.dirname(self.db_path)
+        if db_folder != "":
+            os.makedirs(db_folder, exist_ok = True)
+        self._connection = sqlite3.connect(self.db_path, timeout = 30)
+        self._connection.row_factory = sqlite3.Row
+        self._setup_schema()
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Video catalog @ {} ({} videos)".format(self.db_path, len(self))
+
+    # .................................................................................................................
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    # .................................................................................................................
+
+    def lookup(self, video_path):
+
+        ''' Returns the probe results for a single video, or None if it isn't in the catalog (or has changed) '''
+
+        return self.lookup_many([video_path]).get(os.path.realpath(video_path))
+
+    # .................................................................................................................
+
+    def lookup_many(self, video_path_list):
+
+        '''
+        Function which gets probe results for a list of videos from the catalog.
+        Videos that aren't in the catalog (or have changed since they were probed) are left out
+        Returns:
+            probe_results_dict (keys: real paths, values: probe dictionaries, see probe_video(...))
+        '''
+
+        # Get current file info, so we can tell if catalog entries are out-of-date
+        file_stats_lut = {}
+        for each_path in video_path_list:
+            stats = _get_file_stats(each_path)
+            if stats is not None:
+                file_stats_lut[os.path.realpath(each_path)] = stats
+
+        # Look up entries in chunks, keeping only those that match the files as they are now
+        probe_results_dict = {}
+        real_path_list = list(file_stats_lut.keys())
+        for chunk_idx in range(0, len(real_path_list), LOOKUP_CHUNK_SIZE):
+            chunk_path_list = real_path_list[chunk_idx:(chunk_idx + LOOKUP_CHUNK_SIZE)]
+            placeholders_str = ",".join("?" * len(chunk_path_list))
+            row_list = self._connection.execute("SELECT * FROM videos WHERE path IN ({})".format(placeholders_str),
+                                                chunk_path_list).fetchall()
+            for each_row in row_list:
+                if (each_row["size"], each_row["mtime_ns"]) == file_stats_lut[each_row["path"]]:
+                    probe_results_dict[each_row["path"]] = _row_to_probe_dict(each_row)
+
+        return probe_results_dict
+
+    # .................................................................................................................
+
+    def refresh(self, video_path_list, num_workers = None, force_reprobe = False):
+
+        '''
+        Function which makes sure every video in the given list has an up-to-date catalog entry.
+        Only new or changed videos are probed (in parallel), everything else comes straight from the catalog
+        Returns:
+            probe_results_list (same order as the inputs, see probe_video(...)), num_probed
+        '''
+
+        # Figure out which videos actually need to be probed
+        real_path_list = [os.path.realpath(each_path) for each_path in video_path_list]
+        cached_results_dict = {} if force_reprobe else self.lookup_many(real_path_list)
+        probe_path_list = sorted({each_path for each_path in real_path_list if each_path not in cached_results_dict})
+
+        # Probe & record new results all at once, so the database is only written once
+        new_probe_list = probe_videos(probe_path_list, num_workers)
+        self.store(probe_path_list, new_probe_list)
+        cached_results_dict.update(zip(probe_path_list, new_probe_list))
+
+        probe_results_list = [cached_results_dict[each_path] for each_path in real_path_list]
+
+        return probe_results_list, len(probe_path_list)
+
+    # .................................................................................................................
+
+    def store(self, video_path_list, probe_results_list):
+
+        ''' Function which records probe results (see probe_video(...)) for a list of videos '''
+
+        probed_time_str = strftime("%Y-%m-%d %H:%M:%S")
+        row_list = []
+        for each_path, each_probe in zip(video_path_list, probe_results_list):
+            real_path = os.path.realpath(each_path)
+            file_stats = _get_file_stats(real_path)
+            if file_stats is None:
+                continue
+            file_size, file_mtime_ns = file_stats
+            row_list.append((real_path, os.path.dirname(real_path), os.path.basename(real_path),
+                             file_size, file_mtime_ns, int(each_probe["ok"]), each_probe["error"],
+                             each_probe["total_frames"], each_probe["fps"], *each_probe["WH"],
+                             each_probe["codec"], each_probe["duration_sec"], probed_time_str))
+
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO videos VALUES ({})".format(",".join("?" * 14)),
+                                         row_list)
+
+    # .................................................................................................................
+
+    def query(self, folder_path = None, name_pattern = None, codec = None, min_duration_sec = None,
+              max_duration_sec = None, min_height = None, max_height = None, readable = None,
+              sort_by = "path", descending = False, limit = None):
+
+        '''
+        Function which lists catalog entries matching the given filters (all filters are optional)
+        Inputs:
+            folder_path -> String. Only list videos inside this folder (including sub-folders)
+
+            name_pattern -> String. Glob-style pattern the file name must match (e.g. "FrontDoor*")
+
+            codec -> String. Only list videos using this (FourCC) codec
+
+            min/max_duration_sec, min/max_height -> Floats. Limits on video duration & frame height
+
+            readable -> Boolean or None. If given, only list videos that could (or could not) be read
+
+            sort_by -> String. One of CATALOG_SORT_COLUMNS_LIST
+
+            descending -> Boolean. If true, results are sorted from largest to smallest
+
+            limit -> Integer or None. Maximum number of results
+
+        Returns:
+            entry_list (list of dictionaries, with keys: "path", "size", "mtime_ns" & probe dictionary keys)
+        '''
+
+        if sort_by not in CATALOG_SORT_COLUMNS_LIST:
+            raise ValueError("Can't sort by {} (must be one of: {})".format(sort_by,
+                                                                           ", ".join(CATALOG_SORT_COLUMNS_LIST)))
+
+        # Build up filtering, using indexed columns wherever possible
+        where_list, value_list = [], []
+        if folder_path is not None:
+            # Path prefix as a range, so the primary key index is used
+            path_prefix = os.path.join(os.path.realpath(os.path.expanduser(folder_path)), "")
+            where_list.append("path >= ? AND path < ?")
+            value_list += [path_prefix, path_prefix[:-1] + chr(ord(path_prefix[-1]) + 1)]
+        if name_pattern is not None:
+            where_list.append("name GLOB ?")
+            value_list.append(name_pattern)
+        if codec is not None:
+            where_list.append("codec = ?")
+            value_list.append(codec)
+        if min_duration_sec is not None:
+            where_list.append("duration_sec >= ?")
+            value_list.append(min_duration_sec)
+        if max_duration_sec is not None:
+            where_list.append("duration_sec <= ?")
+            value_list.append(max_duration_sec)
+        if min_height is not None:
+            where_list.append("height >= ?")
+            value_list.append(min_height)
+        if max_height is not None:
+            where_list.append("height <= ?")
+            value_list.append(max_height)
+        if readable is not None:
+            where_list.append("ok = ?")
+            value_list.append(int(readable))
+
+        query_str = "SELECT * FROM videos"
+        if len(where_list) > 0:
+            query_str += " WHERE {}".format(" AND ".join(where_list))
+        query_str += " ORDER BY {} {}".format(sort_by, "DESC" if descending else "ASC")
+        if limit is not None:
+            query_str += " LIMIT ?"
+            value_list.append(int(limit))
+
+        entry_list = [{"path": each_row["path"], "size": each_row["size"], "mtime_ns": each_row["mtime_ns"],
+                       **_row_to_probe_dict(each_row)}
+                      for each_row in self._connection.execute(query_str, value_list)]
+
+        return entry_list
+
+    # .................................................................................................................
+
+    def prune(self, folder_path = None):
+
+        ''' Function which removes entries for videos that no longer exist. Returns the number of entries removed '''
+
+        entry_list = self.query(folder_path = folder_path)
+        missing_path_list = [(each_entry["path"],) for each_entry in entry_list
+                             if not os.path.exists(each_entry["path"])]
+        with self._connection:
+            self._connection.executemany("DELETE FROM videos WHERE path = ?", missing_path_list)
+
+        return len(missing_path_list)
+
+    # .................................................................................................................
+
+    def close(self):
+        self._connection.close()
+
+    # .................................................................................................................
+
+    def _setup_schema(self):
+
+        # Rebuild the catalog if it was made with a different layout (it only holds cached info, so this is safe)
+        schema_version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version != CATALOG_SCHEMA_VERSION:
+            with self._connection:
+                self._connection.execute("DROP TABLE IF EXISTS videos")
+            self._connection.execute("PRAGMA user_version = {}".format(CATALOG_SCHEMA_VERSION))
+        self._connection.executescript(CATALOG_SCHEMA_SQL)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def probe_video(video_path):
+
+    '''
+    Function which reads basic info about a video file (without decoding more than a single frame)
+    Returns:
+        probe_dict (keys: "ok", "total_frames", "fps", "WH", "codec", "duration_sec", "error")
+    '''
+
+    video_object = cv2.VideoCapture(video_path)
+    try:
+        if not video_object.isOpened():
+            return {"ok": False, "total_frames": 0, "fps": 0.0, "WH": (0, 0), "codec": "unknown",
+                    "duration_sec": 0.0, "error": "Couldn't open video"}
+
+        video_info = get_video_object_info(video_object)
+        received_frame, _ = video_object.read()
+
+    finally:
+        video_object.release()
+
+    # Catch videos that open, but can't actually be processed
+    total_frames, fps = video_info["total_frames"], video_info["fps"]
+    error_msg = None
+    if not received_frame:
+        error_msg = "Couldn't read frames"
+    elif fps <= 0:
+        error_msg = "Bad framerate ({})".format(fps)
+
+    probe_dict = {"ok": error_msg is None,
+                  "total_frames": total_frames,
+                  "fps": fps,
+                  "WH": (video_info["width"], video_info["height"]),
+                  "codec": video_info["codec"],
+                  "duration_sec": (total_frames / fps) if fps > 0 else 0.0,
+                  "error": error_msg}
+
+    return probe_dict
+
+# .....................................................................................................................
+
+def probe_videos(video_path_list, num_workers = None, executor = None):
+
+    '''
+    Function which probes a list of videos in parallel. Results are returned in the same order as the inputs.
+    If an (already running) executor is given, it's used instead of starting a new pool of workers
+    '''
+
+    if len(video_path_list) == 0:
+        return []
+
+    # Hand out work in chunks, which cuts down on inter-process overhead with (very) long lists of videos
+    num_workers = os.cpu_count() if num_workers is None else num_workers
+    chunk_size = max(1, min(64, len(video_path_list) // (4 * num_workers)))
+    if executor is not None:
+        return list(executor.map(probe_video, video_path_list, chunksize = chunk_size))
+    with ProcessPoolExecutor(max_workers = num_workers) as executor:
+        probe_results_list = list(executor.map(probe_video, video_path_list, chunksize = chunk_size))
+
+    return probe_results_list
+
+# .....................................................................................................................
+
+def _row_to_probe_dict(row):
+    return {"ok": bool(row["ok"]),
+            "total_frames": row["total_frames"],
+            "fps": row["fps"],
+            "WH": (row["width"], row["height"]),
+            "codec": row["codec"],
+            "duration_sec": row["duration_sec"],
+            "error": row["error"]}
+
+# .....................................................................................................................
+
+def _get_file_stats(file_path):
+    try:
+        file_stats = os.stat(file_path)
+    except OSError:
+        return None
+    return (file_stats.st_size, file_stats.st_mtime_ns)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 15:08:51 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import heapq
+import shutil
+
+from local.eolib.video.read_write import get_codec_capability_key
+from local.eolib.video.scheduler import estimate_task_work
+from local.eolib.video.tuning import DEFAULT_TRIAL_SEC, get_tuning_class, run_parallel_trials
+from local.eolib.video.processing import Processing_Job, get_rotated_WH
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def calibrate_class(sample_task_list, num_workers = 1, num_threads = None, trial_sec = DEFAULT_TRIAL_SEC):
+
+    '''
+    Function which benchmarks the processing speed & output sizes for a class of (similar) videos,
+    by running short calibration trials with the same number of workers/threads as the real run
+    Returns:
+        calibration_dict (keys: "workers", "opencv_threads", "work_per_sec", "bytes_per_mpix")
+        -> "work_per_sec" is the total throughput of all workers (see estimate_task_work(...))
+        -> "bytes_per_mpix" holds the output file size per megapixel recorded, for each "ext/codec"
+    '''
+
+    trial_time_sec, trial_stats_list = run_parallel_trials(sample_task_list, num_workers, num_threads, trial_sec)
+
+    # Total up the work done by each trial, as if each sample video were only as long as the trial
+    total_work = 0.0
+    codec_totals_dict = {}
+    for each_idx, each_stats in enumerate(trial_stats_list):
+        sample_task = sample_task_list[each_idx % len(sample_task_list)]
+        trial_probe_dict = {**sample_task["probe"], "total_frames": each_stats["source_frames"]}
+        total_work += estimate_task_work({**sample_task, "probe": trial_probe_dict})
+        for each_output in each_stats["outputs"]:
+            codec_totals = codec_totals_dict.setdefault(each_output["codec_key"], [0.0, 0.0])
+            codec_totals[0] += each_output["bytes"]
+            codec_totals[1] += each_output["mpix"]
+
+    calibration_dict = {"workers": num_workers,
+                        "opencv_threads": num_threads,
+                        "work_per_sec": total_work / max(trial_time_sec, 1E-6),
+                        "bytes_per_mpix": {each_key: (each_bytes / each_mpix)
+                                           for each_key, (each_bytes, each_mpix) in codec_totals_dict.items()
+                                           if each_mpix > 0}}
+
+    return calibration_dict
+
+# .....................................................................................................................
+
+def estimate_task(task_dict, calibration_dict = None, output_root = None, input_root = None):
+
+    '''
+    Function which predicts the processing time & outputs of a single batch task, using it's probed info
+    Inputs:
+        task_dict -> Dictionary. Describes the video & it's settings (see Batch_Job.plan(...))
+
+        calibration_dict -> Dictionary or None. Benchmark results for the class of the video
+                            (see calibrate_class(...)). Times & sizes are None without calibration
+
+        output_root -> String or None. Folder in which output folders are created (as with processing)
+
+        input_root -> String or None. Folder containing every input, whose layout is kept in the output root
+    Returns:
+        task_estimate_dict (keys: "source_path", "time_sec", "total_bytes", "outputs": list of dictionaries
+                            with keys "save_folder", "frames", "duration_sec", "bytes")
+    '''
+
+    probe_dict = task_dict["probe"]
+    task_settings = task_dict["settings"]
+    processing_job = Processing_Job(rotation_n90 = task_settings["rotation_n90"],
+                                    target_fps = task_settings["target_fps"],
+                                    output_root = output_root,
+                                    input_root = input_root,
+                                    output_spec_list = task_settings["output_spec_list"])
+
+    # Each worker only gets a share of the (total) measured throughput
+    time_sec = None
+    bytes_per_mpix_dict = {}
+    if calibration_dict is not None and calibration_dict["work_per_sec"] > 0:
+        worker_work_per_sec = calibration_dict["work_per_sec"] / max(1, calibration_dict["workers"])
+        time_sec = estimate_task_work(task_dict) / worker_work_per_sec
+        bytes_per_mpix_dict = calibration_dict["bytes_per_mpix"]
+
+    # Figure out the frame count & size of each output
+    rot_width, rot_height = get_rotated_WH(probe_dict["WH"], task_settings["rotation_n90"])
+    output_estimate_list = processing_job.estimate_outputs(probe_dict["total_frames"], probe_dict["fps"])
+    output_list = []
+    for each_spec, (each_folder_name, _), each_estimate in zip(processing_job.output_spec_list,
+                                                               processing_job.output_naming_list,
+                                                               output_estimate_list):
+        scale_factor = each_spec["scale_factor"]
+        output_mpix = round(rot_width * scale_factor) * round(rot_height * scale_factor) / 1.0E6
+        bytes_per_mpix = bytes_per_mpix_dict.get(get_codec_capability_key(each_spec["recording_ext"],
+                                                                          each_spec["codec"]))
+        output_bytes = None if bytes_per_mpix is None else each_estimate["frames"] * output_mpix * bytes_per_mpix
+        output_list.append({"save_folder": processing_job.get_save_folder(task_dict["source_path"], each_folder_name),
+                            "frames": each_estimate["frames"],
+                            "duration_sec": each_estimate["duration_sec"],
+                            "bytes": output_bytes})
+
+    output_bytes_list = [each_output["bytes"] for each_output in output_list]
+    task_estimate_dict = {"source_path": task_dict["source_path"],
+                          "time_sec": time_sec,
+                          "total_bytes": None if None in output_bytes_list else sum(output_bytes_list),
+                          "outputs": output_list}
+
+    return task_estimate_dict
+
+# .....................................................................................................................
+
+def estimate_batch(task_list, calibration_results_dict, output_root = None, input_root = None):
+
+    ''' Helper used to estimate every task of a batch, using the calibration results for the class of each video '''
+
+    return [estimate_task(each_task, calibration_results_dict.get(get_tuning_class(each_task)), output_root, input_root)
+            for each_task in task_list]
+
+# .....................................................................................................................
+
+def estimate_wall_time(time_sec_list, num_workers = 1):
+
+    '''
+    Function which predicts the total (wall) time to run a set of tasks on a pool of workers,
+    assuming tasks are handed out longest-first to whichever worker is free (as done by batch jobs)
+    '''
+
+    worker_end_times = [0.0] * max(1, num_workers)
+    for each_time_sec in sorted(time_sec_list, reverse = True):
+        heapq.heapreplace(worker_end_times, worker_end_times[0] + each_time_sec)
+
+    return max(worker_end_times)
+
+# .....................................................................................................................
+
+def check_free_space(task_estimate_list):
+
+    '''
+    Function which totals up the (estimated) output sizes on each destination drive & checks the available space.
+    Outputs going to folders that don't exist yet are counted against the drive of their closest existing parent
+    Returns:
+        free_space_list (list of dictionaries, with keys: "path", "needed_bytes", "free_bytes", "ok")
+    '''
+
+    # Group outputs by the drive/filesystem they'll be written to
+    drive_totals_dict = {}
+    for each_estimate in task_estimate_list:
+        for each_output in each_estimate["outputs"]:
+            if each_output["bytes"] is None:
+                continue
+            existing_path = _find_existing_parent(each_output["save_folder"])
+            drive_id = os.stat(existing_path).st_dev
+            drive_totals = drive_totals_dict.setdefault(drive_id, [existing_path, 0.0])
+            drive_totals[1] += each_output["bytes"]
+
+    free_space_list = []
+    for each_path, each_needed_bytes in drive_totals_dict.values():
+        free_bytes = shutil.disk_usage(each_path).free
+        free_space_list.append({"path": each_path,
+                                "needed_bytes": each_needed_bytes,
+                                "free_bytes": free_bytes,
+                                "ok": each_needed_bytes < free_bytes})
+
+    return free_space_list
+
+# .....................................................................................................................
+
+def _find_existing_parent(folder_path):
+
+    # Walk up the folder path until we find something that exists (the filesystem root always does)
+    check_path = os.path.abspath(os.path.expanduser(folder_path))
+    while not os.path.exists(check_path):
+        check_path = os.path.dirname(check_path)
+
+    return check_path
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:02:17 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import json
+import hashlib
+import numpy as np
+
+from time import time
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Frame_Cache:
+
+    '''
+    Class used to manage an on-disk cache of decoded (sampled & rotated) frames.
+    Each entry is a raw frame file, read back as a memory-mapped array, along with a small json metadata file.
+    Entries are keyed by the source path, modification time & transform, and evicted by size (least recently used).
+    Only the frames sampled by the run that filled the cache are stored, so later runs only hit the cache when
+    their timelapse factors are whole multiples of a cached factor (e.g. x8 or x12 after x4, but not x6)
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, cache_folder, max_size_gb = 50.0):
+
+        # Store inputs
+        self.cache_folder = os.path.expanduser(cache_folder)
+        self.max_size_bytes = int(max_size_gb * (1024 ** 3))
+
+        # Make sure the cache folder exists
+        os.makedirs(self.cache_folder, exist_ok = True)
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Frame cache @ {} ({:.1f} / {:.1f} GB)".format(self.cache_folder,
+                                                            self.total_size_bytes() / (1024 ** 3),
+                                                            self.max_size_bytes / (1024 ** 3))
+
+    # .................................................................................................................
+
+    def lookup(self, source_path, rotation_n90, timelapse_factor_list):
+
+        '''
+        Function which checks for a cached copy of the frames needed for a given source/transform/timelapse(s).
+        Cached frames can be re-used as long as they include every frame the timelapse(s) would sample
+        (i.e. each factor is a whole multiple of one of the factors used when the frames were cached).
+        Returns:
+            frames_array (np.memmap, read-only), source_indices (list of ints), row_indices (list of ints)
+            (or None, None, None if not cached)
+        '''
+
+        # Bail if we don't have a (complete) entry for this source/transform
+        entry_key = get_frame_cache_key(source_path, rotation_n90)
+        meta_path, frames_path, index_path = self._get_entry_paths(entry_key)
+        entry_exists = all(os.path.exists(each_path) for each_path in (meta_path, frames_path, index_path))
+        if not entry_exists:
+            return None, None, None
+
+        # Load metadata describing the cached frames
+        try:
+            with open(meta_path, "r") as in_file:
+                meta_dict = json.load(in_file)
+            cached_indices = np.load(index_path)
+        except (ValueError, OSError):
+            return None, None, None
+
+        # Figure out which frames we need and make sure they're all in the cache
+        needed_indices = get_union_sample_indices(meta_dict["source_frames"], timelapse_factor_list)
+        row_indices = np.searchsorted(cached_indices, needed_indices)
+        row_indices = np.clip(row_indices, 0, max(0, len(cached_indices) - 1))
+        all_frames_cached = (len(cached_indices) > 0) and np.array_equal(cached_indices[row_indices], needed_indices)
+        if not all_frames_cached:
+            return None, None, None
+
+        # Map the frame data without reading it into memory
+        frames_shape = (len(cached_indices), *meta_dict["frame_shape"])
+        frames_array = np.memmap(frames_path, dtype = meta_dict["dtype"], mode = "r", shape = frames_shape)
+
+        # Mark the entry as recently used (for LRU eviction)
+        os.utime(meta_path, None)
+
+        return frames_array, needed_indices.tolist(), row_indices.tolist()
+
+    # .................................................................................................................
+
+    def create_writer(self, source_path, rotation_n90):
+        entry_key = get_frame_cache_key(source_path, rotation_n90)
+        meta_path, frames_path, index_path = self._get_entry_paths(entry_key)
+        return Frame_Cache_Writer(self, source_path, rotation_n90, meta_path, frames_path, index_path)
+
+    # .................................................................................................................
+
+    def total_size_bytes(self):
+        return sum(each_size for _, each_size, _ in self._list_entries())
+
+    # .................................................................................................................
+
+    def evict(self, keep_free_bytes = 0, stale_partial_sec = 86400):
+
+        ''' Removes least-recently-used entries until the cache fits within its size limit '''
+
+        # Clean up partial files left behind by crashed runs
+        time_now = time()
+        for each_name in os.listdir(self.cache_folder):
+            each_path = os.path.join(self.cache_folder, each_name)
+            if each_name.endswith(".partial") and (time_now - os.path.getmtime(each_path)) > stale_partial_sec:
+                _remove_if_exists(each_path)
+
+        # Remove the oldest entries until we're under the size limit
+        entry_list = sorted(self._list_entries(), key = lambda entry: entry[2])
+        total_size = sum(each_size for _, each_size, _ in entry_list)
+        size_limit = self.max_size_bytes - keep_free_bytes
+        for each_key, each_size, _ in entry_list:
+            if total_size <= size_limit:
+                break
+            for each_path in self._get_entry_paths(each_key):
+                _remove_if_exists(each_path)
+            total_size -= each_size
+
+        return total_size
+
+    # .................................................................................................................
+
+    def _get_entry_paths(self, entry_key):
+        meta_path = os.path.join(self.cache_folder, "{}.json".format(entry_key))
+        frames_path = os.path.join(self.cache_folder, "{}.frames".format(entry_key))
+        index_path = os.path.join(self.cache_folder, "{}.idx.npy".format(entry_key))
+        return meta_path, frames_path, index_path
+
+    # .................................................................................................................
+
+    def _list_entries(self):
+
+        ''' Returns list of (entry_key, size_bytes, last_used_time) for all complete cache entries '''
+
+        entry_list = []
+        for each_name in os.listdir(self.cache_folder):
+            entry_key, ext = os.path.splitext(each_name)
+            if ext != ".json":
+                continue
+            entry_paths = self._get_entry_paths(entry_key)
+            entry_size = sum(os.path.getsize(each_path) for each_path in entry_paths if os.path.exists(each_path))
+            last_used_time = os.path.getmtime(entry_paths[0])
+            entry_list.append((entry_key, entry_size, last_used_time))
+
+        return entry_list
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+class Frame_Cache_Writer:
+
+    '''
+    Class used to (sequentially) store frames into the cache while a video is being decoded.
+    Nothing is visible to lookups until finish() is called, so interrupted runs never leave partial entries.
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, frame_cache_ref, source_path, rotation_n90, meta_path, frames_path, index_path):
+
+        # Store inputs
+        self._cache = frame_cache_ref
+        self.source_path = source_path
+        self.rotation_n90 = rotation_n90
+        self._meta_path = meta_path
+        self._frames_path = frames_path
+        self._index_path = index_path
+
+        # Write to temporary files until we're finished
+        self._partial_frames_path = "{}.partial".format(frames_path)
+        self._out_file = open(self._partial_frames_path, "wb")
+        self._source_indices = []
+        self._frame_shape = None
+        self._dtype = None
+        self._bytes_written = 0
+        self._enabled = True
+
+    # .................................................................................................................
+
+    def write(self, source_index, frame):
+
+        # Don't bother writing if we've given up on caching
+        if not self._enabled:
+            return False
+
+        # Record the frame layout on the first write
+        if self._frame_shape is None:
+            self._frame_shape = frame.shape
+            self._dtype = frame.dtype.str
+
+        # Give up if the frame layout changes or we run out of room in the cache
+        frame_bytes = frame.nbytes
+        layout_changed = (frame.shape != self._frame_shape)
+        too_big = (self._bytes_written + frame_bytes) > self._cache.max_size_bytes
+        if layout_changed or too_big:
+            self.abort()
+            return False
+
+        self._out_file.write(np.ascontiguousarray(frame).tobytes())
+        self._source_indices.append(source_index)
+        self._bytes_written += frame_bytes
+
+        return True
+
+    # .................................................................................................................
+
+    def finish(self, total_source_frames):
+
+        ''' Makes the cached frames available for lookups. Needs the true number of frames in the source '''
+
+        if not self._enabled:
+            return False
+        self._out_file.close()
+        self._enabled = False
+
+        # Nothing to store if we never got any frames
+        if len(self._source_indices) == 0:
+            _remove_if_exists(self._partial_frames_path)
+            return False
+
+        # Make room for the new entry, then move it into place (metadata last, since it marks a complete entry)
+        self._cache.evict(keep_free_bytes = self._bytes_written)
+        os.replace(self._partial_frames_path, self._frames_path)
+        np.save(self._index_path, np.int64(self._source_indices))
+        meta_dict = {"source_path": os.path.realpath(self.source_path),
+                     "rotation_n90": self.rotation_n90,
+                     "source_frames": int(total_source_frames),
+                     "frame_shape": list(self._frame_shape),
+                     "dtype": self._dtype}
+        with open(self._meta_path, "w") as out_file:
+            json.dump(meta_dict, out_file, indent = 2)
+
+        return True
+
+    # .................................................................................................................
+
+    def abort(self):
+        if self._enabled:
+            self._out_file.close()
+            self._enabled = False
+        _remove_if_exists(self._partial_frames_path)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def _remove_if_exists(file_path):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+# .....................................................................................................................
+
+def get_frame_cache_key(source_path, rotation_n90):
+
+    # Key on the file identity (path + modification time + size) as well as the transform applied to the frames
+    real_path = os.path.realpath(source_path)
+    file_stats = os.stat(real_path)
+    rotation_n90 = int(rotation_n90) % 4
+    key_str = "{}|{}|{}|rot{}".format(real_path, file_stats.st_mtime_ns, file_stats.st_size, rotation_n90)
+
+    return hashlib.sha1(key_str.encode("utf-8")).hexdigest()
+
+# .....................................................................................................................
+
+def get_timelapse_sample_indices(num_source_frames, timelapse_factor):
+
+    '''
+    Function which returns the (0-indexed) source frames that would be kept when timelapsing.
+    Mirrors the frame accumulator used in the recording loop, so results always match a full decode.
+    '''
+
+    sample_indices = []
+    frame_count = -1
+    for each_idx in range(int(num_source_frames)):
+        frame_count += 1.0
+        if frame_count >= timelapse_factor:
+            frame_count = (frame_count - timelapse_factor)
+            sample_indices.append(each_idx)
+
+    return np.int64(sample_indices)
+
+# .....................................................................................................................
+
+def get_union_sample_indices(num_source_frames, timelapse_factor_list):
+
+    # Combine the sampled frames from several timelapse factors (e.g. for recording multiple outputs at once)
+    index_arrays = [get_timelapse_sample_indices(num_source_frames, each_factor)
+                    for each_factor in timelapse_factor_list]
+
+    return np.unique(np.concatenate(index_arrays)) if len(index_arrays) > 0 else np.int64([])
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:34:18 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import cv2
+import numpy as np
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Should be bumped whenever the stored layout changes (older index files are then rebuilt)
+FRAME_INDEX_VERSION = 1
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Frame_Index:
+
+    '''
+    Class used to hold an exact index of the frames in a video file: the total frame count, the position of
+    every keyframe & the timestamp of every frame. Built from a single pass over the (undecoded) packets of a
+    video, since the frame count reported by the container is often wrong
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, keyframe_indices, timestamps_ms):
+
+        # Store inputs
+        self.keyframe_indices = np.int64(keyframe_indices)
+        self.timestamps_ms = np.float64(timestamps_ms)
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Frame index ({} frames, {} keyframes)".format(self.total_frames, len(self.keyframe_indices))
+
+    # .................................................................................................................
+
+    @property
+    def total_frames(self):
+        return len(self.timestamps_ms)
+
+    # .................................................................................................................
+
+    def get_keyframe_before(self, frame_index):
+
+        ''' Returns the index of the closest keyframe at (or before) the given frame index '''
+
+        keyframe_idx = np.searchsorted(self.keyframe_indices, frame_index, side = "right") - 1
+        return int(self.keyframe_indices[keyframe_idx]) if keyframe_idx >= 0 else 0
+
+    # .................................................................................................................
+
+    def get_timestamp_ms(self, frame_index):
+        return float(self.timestamps_ms[frame_index])
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def get_frame_index_path(video_path):
+    # Index files are hidden & stored beside the video they describe
+    video_folder, video_name = os.path.split(os.path.realpath(video_path))
+    return os.path.join(video_folder, ".{}.frameindex.npz".format(video_name))
+
+# .....................................................................................................................
+
+def scan_frame_index(video_path):
+
+    '''
+    Function which builds a frame index by reading every packet of a video, without decoding anything
+    (so this is mostly limited by disk speed). Needs the FFmpeg backend of OpenCV, which supports raw reads
+    Returns:
+        frame_index (Frame_Index object, or None if the video can't be read as raw packets)
+    '''
+
+    # Open the video in 'raw' mode, where grabbing a frame only reads the packet data
+    video_object = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    try:
+        raw_mode = video_object.isOpened() and (video_object.get(cv2.CAP_PROP_FORMAT) == -1)
+        if not raw_mode:
+            return None
+
+        keyframe_list, timestamp_list = [], []
+        while video_object.grab():
+            if video_object.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframe_list.append(len(timestamp_list))
+            timestamp_list.append(video_object.get(cv2.CAP_PROP_POS_MSEC))
+
+    finally:
+        video_object.release()
+
+    # Videos always start with a keyframe, even if the container doesn't flag it
+    if len(keyframe_list) == 0 or keyframe_list[0] != 0:
+        keyframe_list.insert(0, 0)
+
+    return Frame_Index(keyframe_list, timestamp_list)
+
+# .....................................................................................................................
+
+def load_frame_index(video_path):
+
+    ''' Loads a previously saved frame index, or returns None if there isn't one (or the video has changed) '''
+
+    index_path = get_frame_index_path(video_path)
+    try:
+        file_stats = os.stat(video_path)
+        with np.load(index_path) as index_data:
+            index_key = index_data["key"].tolist()
+            if index_key != [FRAME_INDEX_VERSION, file_stats.st_size, file_stats.st_mtime_ns]:
+                return None
+            return Frame_Index(index_data["keyframe_indices"], index_data["timestamps_ms"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+# .....................................................................................................................
+
+def save_frame_index(video_path, frame_index):
+
+    ''' Saves a frame index beside the video. Returns False if the video folder isn't writable '''
+
+    index_path = get_frame_index_path(video_path)
+    temp_path = "{}.tmp".format(index_path)
+    try:
+        file_stats = os.stat(video_path)
+        index_key = np.int64([FRAME_INDEX_VERSION, file_stats.st_size, file_stats.st_mtime_ns])
+        with open(temp_path, "wb") as out_file:
+            np.savez_compressed(out_file, key = index_key,
+                                keyframe_indices = frame_index.keyframe_indices,
+                                timestamps_ms = frame_index.timestamps_ms)
+        os.replace(temp_path, index_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+    return True
+
+# .....................................................................................................................
+
+def get_frame_index(video_path, build_if_missing = True):
+
+    '''
+    Function which loads the frame index for a video, building (& saving) it first if needed
+    Returns:
+        frame_index (Frame_Index object, or None if no index is available)
+    '''
+
+    frame_index = load_frame_index(video_path)
+    if frame_index is None and build_if_missing:
+        frame_index = scan_frame_index(video_path)
+        if frame_index is not None:
+            save_frame_index(video_path, frame_index)
+
+    return frame_index
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:03:27 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+
+from collections import deque
+from time import perf_counter, strftime
+from concurrent.futures import ProcessPoolExecutor
+
+from local.eolib.utils.folder_watch import make_folder_watcher, Inotify_Watcher
+from local.eolib.video.processing import find_video_files, is_source_video, parse_folder_name
+from local.eolib.video.batch import resolve_task_settings, get_task_key, run_task, get_task_result
+from local.eolib.video.batch import make_state_entry, load_job_state, save_job_state, get_run_options, init_worker
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Name of the file used to record processed videos (stored inside each watched folder)
+WATCH_STATE_FILE_NAME = ".rottler_watch_state.json"
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Watch_Folder_Ingest:
+
+    '''
+    Class used to continuously process new videos as they show up in a set of watched folders.
+    Settings come from a job spec (see batch.py), where the "inputs" are the folders to watch.
+
+    New files are only processed once they've stopped changing (i.e. they're done being copied/recorded).
+    Processed videos are recorded in a state file inside each watched folder, so restarts and
+    repeated file events never lead to re-processing (unless the file itself changes).
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, job_spec_dict, capability_dict = None, stable_sec = 10.0, use_polling = False,
+                 poll_interval_sec = 5.0, rescan_interval_sec = 600.0, verbose = False):
+
+        '''
+        Inputs:
+            job_spec_dict -> Dictionary. Job spec, where the "inputs" entry lists the folders to watch
+
+            capability_dict -> Dictionary or None. Codec probe results, used to check sidecar file settings
+
+            stable_sec -> Float. Time a file's size/modification time must go unchanged before it's processed
+
+            use_polling -> Boolean. If true, folders are polled for changes instead of using inotify.
+                           Polling is also used if inotify isn't available
+
+            poll_interval_sec -> Float. Time between polls (only used when polling)
+
+            rescan_interval_sec -> Float. Time between full re-scans of the watched folders when using inotify,
+                                   as a safety net for missed events. Set to None to disable
+
+            verbose -> Boolean. If true, progress messages are printed to the terminal
+        '''
+
+        # Store inputs
+        self.job_spec = job_spec_dict
+        self.capability_dict = capability_dict
+        self.stable_sec = stable_sec
+        self.rescan_interval_sec = rescan_interval_sec
+        self.verbose = verbose
+
+        # Pull out job-wide settings
+        concurrency_dict = job_spec_dict.get("concurrency", {})
+        self.num_workers = concurrency_dict.get("workers", 1)
+        self.num_opencv_threads = concurrency_dict.get("opencv_threads")
+        self.output_root = job_spec_dict.get("output_root")
+        self.run_options = get_run_options(job_spec_dict)
+        self.recursive = job_spec_dict.get("recursive", True)
+        self.folder_path_list = [os.path.realpath(os.path.expanduser(each_folder))
+                                 for each_folder in job_spec_dict["inputs"]]
+
+        # Load previous progress for each folder
+        self._state_lut = {each_folder: load_job_state(self._get_state_path(each_folder))
+                           for each_folder in self.folder_path_list}
+
+        # Set up watching
+        self.watcher = make_folder_watcher(self.folder_path_list, self.recursive, is_watched_folder_name,
+                                           use_polling, poll_interval_sec)
+        self.using_inotify = isinstance(self.watcher, Inotify_Watcher)
+
+        # Allocate storage for tracking files as they move from 'seen' -> 'stable' -> 'processing' -> 'done'
+        self._unstable_lut = {}
+        self._ready_queue = deque()
+        self._queued_path_set = set()
+        self._future_lut = {}
+        self._last_rescan_time = None
+        self.num_done = 0
+        self.num_failed = 0
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Watch folder ingest ({}, {} workers)".format(self.watcher, self.num_workers)
+
+    # .................................................................................................................
+
+    def run_forever(self):
+
+        ''' Function which watches & processes videos until interrupted (with Ctrl+C / KeyboardInterrupt) '''
+
+        self._print("Watching {} folder(s) using {}".format(len(self.folder_path_list),
+                                                            "inotify" if self.using_inotify else "polling"),
+                    *["  {}".format(each_folder) for each_folder in self.folder_path_list])
+
+        executor = ProcessPoolExecutor(max_workers = self.num_workers, initializer = init_worker,
+                                       initargs = (self.num_opencv_threads, self.run_options["low_impact"]))
+        try:
+            while True:
+                self.step(executor)
+
+        except KeyboardInterrupt:
+            self._print("", "Stopping... waiting on {} video(s) already processing".format(len(self._future_lut)))
+
+        # Let running tasks finish (so they're recorded as done), but don't start anything new
+        executor.shutdown(wait = True, cancel_futures = True)
+        self._collect_finished(list(self._future_lut.keys()))
+        self.watcher.close()
+
+        return self.num_done, self.num_failed
+
+    # .................................................................................................................
+
+    def step(self, executor, timeout_sec = 1.0):
+
+        ''' Function which runs a single iteration of the watch loop (check for changes & hand out work) '''
+
+        # Re-scan everything on start up (catches files that arrived while we weren't running) & periodically
+        is_first_scan = (self._last_rescan_time is None)
+        rescan_due = (not is_first_scan and self.using_inotify and self.rescan_interval_sec is not None
+                      and (perf_counter() - self._last_rescan_time) > self.rescan_interval_sec)
+        if is_first_scan or rescan_due:
+            self._rescan()
+
+        # Record any file changes
+        changed_path_list, needs_rescan = self.watcher.get_changes(timeout_sec)
+        if needs_rescan:
+            self._rescan()
+        for each_path in changed_path_list:
+            self._mark_changed(each_path)
+
+        # Check which files are done changing, then hand out work
+        self._check_stability()
+        self._submit_ready(executor)
+
+        # Record results of finished processing
+        finished_future_list = [each_future for each_future in self._future_lut if each_future.done()]
+        self._collect_finished(finished_future_list)
+
+    # .................................................................................................................
+
+    def _rescan(self):
+
+        # Treat every video in the watched folders as changed. Videos already processed are skipped later on
+        self._last_rescan_time = perf_counter()
+        for each_path in find_video_files(self.folder_path_list, self.recursive):
+            self._mark_changed(each_path)
+
+    # .................................................................................................................
+
+    def _mark_changed(self, file_path):
+
+        # Ignore non-videos (e.g. state/sidecar files) & our own outputs
+        if not is_source_video(file_path):
+            return
+
+        # Ignore files we're already handling (repeated events are common, e.g. one per write while copying)
+        if file_path in self._queued_path_set:
+            return
+
+        # Restart the stability timer whenever the file changes
+        file_stats = _get_file_stats(file_path)
+        if file_stats is None:
+            self._unstable_lut.pop(file_path, None)
+            return
+        prev_stats, _ = self._unstable_lut.get(file_path, (None, None))
+        if prev_stats != file_stats:
+            self._unstable_lut[file_path] = (file_stats, perf_counter())
+
+    # .................................................................................................................
+
+    def _check_stability(self):
+
+        time_now = perf_counter()
+        for each_path, (each_stats, each_change_time) in list(self._unstable_lut.items()):
+
+            # Files that keep changing restart their timer (changes may not produce events, e.g. on shares)
+            new_stats = _get_file_stats(each_path)
+            if new_stats is None:
+                del self._unstable_lut[each_path]
+                continue
+            if new_stats != each_stats:
+                self._unstable_lut[each_path] = (new_stats, time_now)
+                continue
+
+            # Queue up files that have stopped changing (unless they've already been processed)
+            if (time_now - each_change_time) >= self.stable_sec:
+                del self._unstable_lut[each_path]
+                self._queue_if_new(each_path)
+
+    # .................................................................................................................
+
+    def _queue_if_new(self, file_path):
+
+        # Work out the settings for the video (bad sidecar files are recorded as failures)
+        folder_path = self._get_watched_folder(file_path)
+        try:
+            task_settings = resolve_task_settings(self.job_spec, file_path, self.capability_dict)
+            settings_error = None
+        except ValueError as err:
+            task_settings, settings_error = None, str(err)
+
+        # Drop files that were deleted/renamed since they stopped changing (common on camera drop shares)
+        # -> If they show up again, the next event or rescan will pick them up
+        try:
+            task_key = get_task_key(file_path, task_settings, self.output_root, self.run_options["input_root"])
+        except FileNotFoundError:
+            return
+
+        if settings_error is not None:
+            task_dict = {"source_path": file_path, "settings": None, "task_key": task_key}
+            self._record_result(folder_path, task_dict, {"status": "failed", "outputs": [], "issues": [settings_error],
+                                                         "frame_source": None, "degraded": [], "resource_usage": None,
+                                                         "interrupted": False, "process_time_sec": 0.0})
+            return
+
+        # Skip anything that was already handled (including failures, to avoid retrying bad files forever)
+        if task_key in self._state_lut[folder_path]["tasks"]:
+            return
+
+        self._ready_queue.append({"task_key": task_key, "source_path": file_path, "settings": task_settings})
+        self._queued_path_set.add(file_path)
+
+    # .................................................................................................................
+
+    def _submit_ready(self, executor):
+
+        # Only give the pool as much work as it can start on, so bursts of new files wait in our (ordered) queue
+        while len(self._ready_queue) > 0 and len(self._future_lut) < self.num_workers:
+            task_dict = self._ready_queue.popleft()
+            new_future = executor.submit(run_task, task_dict, self.run_options)
+            self._future_lut[new_future] = task_dict
+            self._print("{} | Processing: {} ({} waiting)".format(strftime("%Y-%m-%d %H:%M:%S"),
+                                                                  task_dict["source_path"], len(self._ready_queue)))
+
+    # .................................................................................................................
+
+    def _collect_finished(self, finished_future_list):
+
+        for each_future in finished_future_list:
+            if not each_future.done() or each_future.cancelled():
+                self._future_lut.pop(each_future, None)
+                continue
+
+            task_dict = self._future_lut.pop(each_future)
+            task_result = get_task_result(each_future)
+            self._queued_path_set.discard(task_dict["source_path"])
+
+            # Interrupted tasks aren't recorded, so they're picked up again on the next start up
+            if task_result["status"] == "interrupted":
+                continue
+
+            folder_path = self._get_watched_folder(task_dict["source_path"])
+            self._record_result(folder_path, task_dict, task_result)
+
+    # .................................................................................................................
+
+    def _record_result(self, folder_path, task_dict, task_result):
+
+        state_dict = self._state_lut[folder_path]
+        state_dict["tasks"][task_dict["task_key"]] = make_state_entry(task_dict, task_result)
+        save_job_state(self._get_state_path(folder_path), state_dict)
+
+        task_ok = (task_result["status"] == "done")
+        self.num_done += int(task_ok)
+        self.num_failed += int(not task_ok)
+        self._print("{} | {}: {}".format(strftime("%Y-%m-%d %H:%M:%S"), "Finished" if task_ok else "FAILED",
+                                         task_dict["source_path"]),
+                    *["  {}".format(each_issue) for each_issue in task_result["issues"]])
+
+    # .................................................................................................................
+
+    def _get_watched_folder(self, file_path):
+
+        # Pick the most specific watched folder containing the file (in case watched folders are nested)
+        real_path = os.path.realpath(file_path)
+        containing_list = [each_folder for each_folder in self.folder_path_list
+                           if real_path.startswith(os.path.join(each_folder, ""))]
+
+        return max(containing_list, key = len) if len(containing_list) > 0 else self.folder_path_list[0]
+
+    # .................................................................................................................
+
+    def _get_state_path(self, folder_path):
+        return os.path.join(folder_path, WATCH_STATE_FILE_NAME)
+
+    # .................................................................................................................
+
+    def _print(self, *print_strs):
+        if self.verbose:
+            print(*print_strs, sep = "\n", flush = True)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def is_watched_folder_name(folder_name):
+    # Skip hidden folders & folders of saved outputs
+    return not folder_name.startswith(".") and parse_folder_name(folder_name) is None
+
+# .....................................................................................................................
+
+def _get_file_stats(file_path):
+    try:
+        file_stats = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (file_stats.st_size, file_stats.st_mtime_ns)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
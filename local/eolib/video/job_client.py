@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 14:21:37 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import json
+
+from time import sleep
+from urllib.error import URLError, HTTPError
+from urllib.request import Request, urlopen
+
+# Note: Only standard library imports here! Submitting jobs should be quick, so this must not import OpenCV/numpy
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Port used by the job server (always on localhost)
+DEFAULT_SERVER_PORT = 8765
+
+# Job statuses that won't change anymore
+FINAL_JOB_STATUS_SET = {"done", "error"}
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def send_request(url_path, data_dict = None, port = DEFAULT_SERVER_PORT, timeout_sec = 10.0):
+
+    '''
+    Function which sends a request to the (local) job server. Requests are POSTed if data is given,
+    otherwise they're sent as a GET.
+    Returns:
+        response_dict
+    Raises a ConnectionError if the server can't be reached, or a ValueError if the server rejects the request
+    '''
+
+    url = "http://127.0.0.1:{}{}".format(port, url_path)
+    request_data = None if data_dict is None else json.dumps(data_dict).encode("utf-8")
+    request = Request(url, data = request_data, headers = {"Content-Type": "application/json"})
+    try:
+        with urlopen(request, timeout = timeout_sec) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except HTTPError as err:
+        error_dict = _read_error_body(err)
+        raise ValueError("\n".join(error_dict.get("errors", [str(err)])))
+    except URLError as err:
+        raise ConnectionError("Couldn't reach job server on port {} ({})".format(port, err.reason))
+
+# .....................................................................................................................
+
+def submit_job_file(job_file_path, port = DEFAULT_SERVER_PORT):
+
+    ''' Function which submits a job file (json/yaml) to the server. Returns the job id '''
+
+    data_dict = {"job_file": os.path.realpath(os.path.expanduser(job_file_path))}
+    response_dict = send_request("/jobs", data_dict, port)
+
+    return response_dict["job_id"]
+
+# .....................................................................................................................
+
+def submit_job_spec(job_spec_dict, base_folder = None, port = DEFAULT_SERVER_PORT):
+
+    '''
+    Function which submits a job spec (same format as job files) to the server. Returns the job id.
+    Relative paths in the spec are treated as relative to the base folder (the current directory by default)
+    '''
+
+    base_folder = os.getcwd() if base_folder is None else base_folder
+    data_dict = {"job": job_spec_dict, "base_folder": os.path.realpath(os.path.expanduser(base_folder))}
+    response_dict = send_request("/jobs", data_dict, port)
+
+    return response_dict["job_id"]
+
+# .....................................................................................................................
+
+def get_job_status(job_id = None, port = DEFAULT_SERVER_PORT):
+
+    ''' Returns the status of a single job (as a dictionary), or a list of every job if no id is given '''
+
+    url_path = "/jobs" if job_id is None else "/jobs/{}".format(job_id)
+
+    return send_request(url_path, port = port)
+
+# .....................................................................................................................
+
+def wait_for_jobs(job_id_list, port = DEFAULT_SERVER_PORT, poll_sec = 0.5, status_callback = None):
+
+    '''
+    Function which blocks until every one of the given jobs has finished.
+    If provided, the status callback is called with each job status dictionary whenever it changes
+    Returns:
+        job_status_list (final status of each job, in the same order as the ids)
+    '''
+
+    last_status_lut = {}
+    pending_id_set = set(job_id_list)
+    while True:
+        for each_id in list(pending_id_set):
+            job_status = get_job_status(each_id, port)
+            if status_callback is not None and job_status != last_status_lut.get(each_id):
+                status_callback(job_status)
+            last_status_lut[each_id] = job_status
+            if job_status["status"] in FINAL_JOB_STATUS_SET:
+                pending_id_set.discard(each_id)
+        if len(pending_id_set) == 0:
+            break
+        sleep(poll_sec)
+
+    return [last_status_lut[each_id] for each_id in job_id_list]
+
+# .....................................................................................................................
+
+def _read_error_body(http_error):
+
+    # Error responses from the server carry a json body explaining the problem
+    try:
+        return json.loads(http_error.read().decode("utf-8"))
+    except (ValueError, OSError):
+        return {}
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 13:05:52 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import json
+import queue
+import signal
+import threading
+
+from time import perf_counter, strftime
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from local.eolib.video.read_write import DEFAULT_CODEC_CANDIDATES, load_codec_capabilities
+from local.eolib.video.job_client import DEFAULT_SERVER_PORT
+from local.eolib.video.batch import Batch_Job, load_job_spec, resolve_job_paths, validate_job_spec
+from local.eolib.video.batch import get_job_codec_list, init_worker
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Job_Server:
+
+    '''
+    Class used to run batch jobs that are submitted over time (e.g. by other scripts), using a single pool of
+    worker processes that stays running between jobs. This way, the cost of starting up (importing OpenCV,
+    probing codecs, starting workers etc.) is only paid once, instead of for every job, which matters when
+    running lots of small jobs. Jobs are run one at a time, in the order they're submitted.
+
+    Since the workers are shared, the server's pool settings take precedence over per-job worker settings:
+    job "concurrency" settings are ignored and "low_impact" only throttles each video to the job's CPU/disk
+    budget (workers aren't re-prioritized or kept to fewer cores for each job).
+
+    Example:
+        job_server = Job_Server(num_workers = 4)
+        job_id, error_list = job_server.submit(job_spec_dict)
+        ...
+        job_status_dict = job_server.get_job_status(job_id)
+        job_server.close()
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, num_workers = 1, num_opencv_threads = None, codec_cache_path = None, verbose = False):
+
+        '''
+        Inputs:
+            num_workers -> Integer. Number of (warm) worker processes, shared by every job
+
+            num_opencv_threads -> Integer or None. Number of threads OpenCV may use in each worker.
+                                  If None, OpenCV picks for itself
+
+            codec_cache_path -> String or None. Path to the codec probe results file used to check job settings
+
+            verbose -> Boolean. If true, progress messages are printed to the terminal
+        '''
+
+        # Store inputs
+        self.num_workers = num_workers
+        self.num_opencv_threads = num_opencv_threads
+        self.codec_cache_path = codec_cache_path
+        self.verbose = verbose
+
+        # Allocate storage for job tracking
+        self._lock = threading.Lock()
+        self._job_status_lut = {}
+        self._job_queue = queue.Queue()
+        self._next_job_id = 1
+        self._t_start = perf_counter()
+
+        # Start up the (shared) worker pool & the thread that runs jobs as they come in
+        # -> Workers are started right away, so even the first job doesn't need to wait on them
+        self.executor = ProcessPoolExecutor(max_workers = self.num_workers, initializer = init_server_worker,
+                                            initargs = (self.num_opencv_threads,))
+        for each_future in [self.executor.submit(os.getpid) for _ in range(self.num_workers)]:
+            each_future.result()
+        self._thread = threading.Thread(target = self._run_jobs, name = "job_runner", daemon = True)
+        self._thread.start()
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Job server ({} workers, {} job(s) submitted)".format(self.num_workers, len(self._job_status_lut))
+
+    # .................................................................................................................
+
+    def submit(self, job_spec_dict):
+
+        '''
+        Function which checks a job spec & queues it up to be run (see Batch_Job for the job spec format).
+        Paths in the job spec should be absolute (see resolve_job_paths(...))
+        Returns:
+            job_id (None if the job spec has problems), error_list
+        '''
+
+        # Check the job spec before accepting it, including the recording settings (probed once, then cached)
+        error_list = validate_job_spec(job_spec_dict)
+        if len(error_list) == 0:
+            with self._lock:
+                capability_dict = load_codec_capabilities(self.codec_cache_path,
+                                                          get_job_codec_list(job_spec_dict) + DEFAULT_CODEC_CANDIDATES)
+            error_list = validate_job_spec(job_spec_dict, capability_dict)
+        if len(error_list) > 0:
+            return None, error_list
+
+        with self._lock:
+            job_id = str(self._next_job_id)
+            self._next_job_id += 1
+            self._job_status_lut[job_id] = {"job_id": job_id,
+                                            "status": "queued",
+                                            "submitted": strftime("%Y-%m-%d %H:%M:%S"),
+                                            "inputs": job_spec_dict["inputs"],
+                                            "videos": None,
+                                            "processed": 0,
+                                            "finished": 0,
+                                            "skipped": 0,
+                                            "failed": {},
+                                            "plan_failures": {},
+                                            "error": None,
+                                            "total_time_sec": None}
+        self._job_queue.put((job_id, job_spec_dict, capability_dict))
+        self._print("", "Job {} queued ({} input(s))".format(job_id, len(job_spec_dict["inputs"])))
+
+        return job_id, []
+
+    # .................................................................................................................
+
+    def get_job_status(self, job_id = None):
+
+        ''' Returns a copy of the status of a job (None if there's no such job), or a list of all jobs if no id '''
+
+        with self._lock:
+            if job_id is None:
+                return [dict(each_status) for each_status in self._job_status_lut.values()]
+            job_status = self._job_status_lut.get(str(job_id))
+            return None if job_status is None else dict(job_status)
+
+    # .................................................................................................................
+
+    def get_server_status(self):
+
+        with self._lock:
+            status_list = [each_status["status"] for each_status in self._job_status_lut.values()]
+
+        return {"workers": self.num_workers,
+                "opencv_threads": self.num_opencv_threads,
+                "uptime_sec": perf_counter() - self._t_start,
+                "jobs": {each_status: status_list.count(each_status) for each_status in sorted(set(status_list))}}
+
+    # .................................................................................................................
+
+    def close(self):
+
+        '''
+        Shuts down the worker pool, after the job currently running (if any) is finished.
+        Jobs that haven't started yet are dropped & marked as errors
+        '''
+
+        # Clear out jobs that haven't started, so we don't wait on them
+        while True:
+            try:
+                queue_entry = self._job_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._update_status(queue_entry[0], status = "error", error = "Server stopped before the job started")
+
+        self._job_queue.put(None)
+        self._thread.join()
+        self.executor.shutdown(wait = True, cancel_futures = True)
+
+    # .................................................................................................................
+
+    def _run_jobs(self):
+
+        while True:
+            queue_entry = self._job_queue.get()
+            if queue_entry is None:
+                break
+            self._run_job(*queue_entry)
+
+    # .................................................................................................................
+
+    def _run_job(self, job_id, job_spec_dict, capability_dict):
+
+        # Plan & run the job using the shared pool (so the pool size decides the number of workers)
+        t_start = perf_counter()
+        self._update_status(job_id, status = "planning")
+        batch_job = Batch_Job(job_spec_dict, capability_dict = capability_dict, executor = self.executor,
+                              progress_bar_func = lambda total: Job_Progress(self, job_id))
+        try:
+            task_list = batch_job.plan()
+            batch_job.num_workers = self.num_workers
+            self._update_status(job_id, status = "running", videos = len(task_list),
+                                plan_failures = batch_job.plan_failures_dict)
+            self._print("Job {} running ({} video(s))".format(job_id, len(task_list)))
+            run_stats = batch_job.run()
+
+        except Exception as err:
+            self._update_status(job_id, status = "error", error = str(err), total_time_sec = perf_counter() - t_start)
+            self._print("Job {} error: {}".format(job_id, err))
+            return
+
+        self._update_status(job_id, status = "done",
+                            finished = len(run_stats["finished"]),
+                            skipped = run_stats["skipped"],
+                            failed = run_stats["failed"],
+                            total_time_sec = perf_counter() - t_start)
+        self._print("Job {} done ({} finished, {} failed, {:.1f} sec)".format(job_id, len(run_stats["finished"]),
+                                                                             len(run_stats["failed"]),
+                                                                             perf_counter() - t_start))
+
+    # .................................................................................................................
+
+    def _update_status(self, job_id, **status_updates):
+        with self._lock:
+            self._job_status_lut[job_id].update(status_updates)
+
+    # .................................................................................................................
+
+    def _count_processed(self, job_id, num_processed):
+        with self._lock:
+            self._job_status_lut[job_id]["processed"] += num_processed
+
+    # .................................................................................................................
+
+    def _print(self, *print_strs):
+        if self.verbose:
+            print(*print_strs, sep = "\n")
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+class Job_Progress:
+
+    ''' Stand-in for a progress bar, used to keep track of the number of videos processed by a server job '''
+
+    # .................................................................................................................
+
+    def __init__(self, job_server, job_id):
+        self._job_server = job_server
+        self._job_id = job_id
+
+    # .................................................................................................................
+
+    def update(self, num_processed = 1):
+        self._job_server._count_processed(self._job_id, num_processed)
+
+    # .................................................................................................................
+
+    def close(self):
+        pass
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+class Job_Request_Handler(BaseHTTPRequestHandler):
+
+    '''
+    Class used to handle requests to the job server (json in, json out). Available requests:
+        GET /status -> Server info (number of workers, uptime, job counts)
+        GET /jobs -> Status of every job
+        GET /jobs/<job_id> -> Status of a single job
+        POST /jobs -> Submit a job, given as {"job_file": path} or {"job": job_spec, "base_folder": path}
+    '''
+
+    # Set when creating the http server (see make_http_server(...))
+    job_server = None
+
+    # .................................................................................................................
+
+    def do_GET(self):
+
+        url_parts = self.path.strip("/").split("/")
+        if url_parts == ["status"]:
+            return self._respond(200, self.job_server.get_server_status())
+        if url_parts == ["jobs"]:
+            return self._respond(200, self.job_server.get_job_status())
+        if len(url_parts) == 2 and url_parts[0] == "jobs":
+            job_status = self.job_server.get_job_status(url_parts[1])
+            if job_status is None:
+                return self._respond(404, {"errors": ["No job with id: {}".format(url_parts[1])]})
+            return self._respond(200, job_status)
+
+        return self._respond(404, {"errors": ["Unknown request: {}".format(self.path)]})
+
+    # .................................................................................................................
+
+    def do_POST(self):
+
+        if self.path.strip("/") != "jobs":
+            return self._respond(404, {"errors": ["Unknown request: {}".format(self.path)]})
+
+        # Load the job spec, either from a file or given directly (with paths relative to the base folder)
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+            request_dict = json.loads(self.rfile.read(content_length).decode("utf-8"))
+            if not isinstance(request_dict, dict):
+                raise ValueError("Request must be a dictionary/mapping!")
+            if "job_file" in request_dict:
+                job_spec_dict = load_job_spec(request_dict["job_file"])
+            else:
+                job_spec_dict = request_dict["job"]
+                if not isinstance(job_spec_dict, dict):
+                    raise ValueError("Job spec must be a dictionary/mapping!")
+                resolve_job_paths(job_spec_dict, request_dict.get("base_folder", os.getcwd()))
+        except (OSError, ValueError, KeyError, ImportError, AttributeError) as err:
+            return self._respond(400, {"errors": ["Couldn't load job: {}".format(err)]})
+
+        job_id, error_list = self.job_server.submit(job_spec_dict)
+        if job_id is None:
+            return self._respond(400, {"errors": error_list})
+
+        return self._respond(202, {"job_id": job_id})
+
+    # .................................................................................................................
+
+    def log_message(self, format, *args):
+        # Requests aren't logged (clients poll for status, which would flood the terminal)
+        pass
+
+    # .................................................................................................................
+
+    def _respond(self, status_code, response_data):
+        response_bytes = json.dumps(response_data).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response_bytes)))
+        self.end_headers()
+        self.wfile.write(response_bytes)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def init_server_worker(num_opencv_threads = None):
+
+    # Workers ignore Ctrl+C (which goes to every process in the terminal), so stopping the server doesn't kill them
+    # -> The server shuts down the pool itself, once the job currently running is finished
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_worker(num_opencv_threads)
+
+# .....................................................................................................................
+
+def make_http_server(job_server, port = DEFAULT_SERVER_PORT):
+
+    '''
+    Function which creates an http server for submitting jobs & checking their status.
+    Only listens on localhost, since submitted jobs can read & write any file the server can.
+    Call serve_forever() on the result to start handling requests
+    '''
+
+    handler_class = type("Bound_Job_Request_Handler", (Job_Request_Handler,), {"job_server": job_server})
+
+    return ThreadingHTTPServer(("127.0.0.1", port), handler_class)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
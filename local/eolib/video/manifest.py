@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 14:21:45 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import json
+import hashlib
+
+from time import strftime
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Manifests are stored in a hidden folder inside each output folder, named by a hash of the input content & settings
+MANIFEST_FOLDER_NAME = ".manifests"
+
+# Size & number of chunks read (spread evenly through the file) to build the partial content hash of an input
+PARTIAL_HASH_CHUNK_BYTES = 256 * 1024
+PARTIAL_HASH_NUM_CHUNKS = 4
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def get_input_identity(source_path):
+
+    '''
+    Function which builds a (fast) description of the contents of an input video. Only a few small chunks of the
+    file are read, so this takes the same (short) amount of time no matter how large the video is
+    Returns:
+        input_identity_dict (keys: "size", "mtime_ns", "partial_hash")
+    '''
+
+    file_stats = os.stat(source_path)
+    file_size = file_stats.st_size
+
+    # Hash evenly spaced chunks of the file (always including the start & end), along with the total size
+    hasher = hashlib.sha1(str(file_size).encode("utf-8"))
+    max_offset = max(0, file_size - PARTIAL_HASH_CHUNK_BYTES)
+    chunk_offsets = sorted({(max_offset * each_idx) // (PARTIAL_HASH_NUM_CHUNKS - 1)
+                            for each_idx in range(PARTIAL_HASH_NUM_CHUNKS)})
+    with open(source_path, "rb") as in_file:
+        for each_offset in chunk_offsets:
+            in_file.seek(each_offset)
+            hasher.update(in_file.read(PARTIAL_HASH_CHUNK_BYTES))
+
+    input_identity_dict = {"size": file_size,
+                           "mtime_ns": file_stats.st_mtime_ns,
+                           "partial_hash": hasher.hexdigest()}
+
+    return input_identity_dict
+
+# .....................................................................................................................
+
+def get_manifest_path(save_folder, input_identity_dict, output_settings_dict, engine_version):
+
+    '''
+    Function which builds the (content-addressed) path to the manifest of a single output.
+    The path only depends on the input contents (not it's name or location), the settings & the engine version,
+    so identical inputs selected under different names map to the same manifest
+    '''
+
+    key_dict = {"size": input_identity_dict["size"],
+                "partial_hash": input_identity_dict["partial_hash"],
+                "settings": output_settings_dict,
+                "engine_version": engine_version}
+    key_str = json.dumps(key_dict, sort_keys = True)
+    manifest_key = hashlib.sha1(key_str.encode("utf-8")).hexdigest()
+
+    return os.path.join(save_folder, MANIFEST_FOLDER_NAME, "{}.json".format(manifest_key))
+
+# .....................................................................................................................
+
+def _check_same_source(source_dict, source_path, input_identity_dict):
+
+    # Inputs must have the same contents. Files at the same path must also be unmodified (an edited file
+    # may keep the same size & partial hash)
+    same_contents = (source_dict.get("size") == input_identity_dict["size"]
+                     and source_dict.get("partial_hash") == input_identity_dict["partial_hash"])
+    same_path = (source_dict.get("path") == os.path.realpath(source_path))
+    if same_path and source_dict.get("mtime_ns") != input_identity_dict["mtime_ns"]:
+        return False
+
+    return same_contents
+
+# .....................................................................................................................
+
+def check_manifest(manifest_path, source_path, input_identity_dict, output_settings_dict, engine_version):
+
+    '''
+    Function which checks if a manifest exists for the given input/settings & that the output it describes
+    is still intact. The same input at the same path must also have the same modification time (an edited file
+    may keep the same size & partial hash), while copies of the input under other names only need matching contents
+    Returns:
+        output_path (or None if there is no usable output), duplicate_of_path (None unless the output was made
+        from the same contents under a different name)
+    '''
+
+    # Bail if there's no manifest
+    try:
+        with open(manifest_path, "r") as in_file:
+            manifest_dict = json.load(in_file)
+    except (ValueError, OSError):
+        return None, None
+
+    # Make sure the manifest describes the same input contents & settings
+    source_dict = manifest_dict.get("source", {})
+    same_source = _check_same_source(source_dict, source_path, input_identity_dict)
+    same_settings = (manifest_dict.get("settings") == output_settings_dict
+                     and manifest_dict.get("engine_version") == engine_version)
+    if not (same_source and same_settings):
+        return None, None
+    same_path = (source_dict.get("path") == os.path.realpath(source_path))
+
+    # Make sure the output hasn't been deleted or replaced (e.g. re-recorded with other settings) since then
+    output_dict = manifest_dict.get("output", {})
+    output_path = os.path.join(os.path.dirname(os.path.dirname(manifest_path)), output_dict.get("name", ""))
+    try:
+        output_stats = os.stat(output_path)
+        output_ok = (output_stats.st_size == output_dict.get("size")
+                     and output_stats.st_mtime_ns == output_dict.get("mtime_ns"))
+    except OSError:
+        output_ok = False
+    if not output_ok:
+        return None, None
+
+    duplicate_of_path = None if same_path else source_dict.get("path")
+
+    return output_path, duplicate_of_path
+
+# .....................................................................................................................
+
+def check_derive_source(output_path, source_path, input_identity_dict, engine_version):
+
+    '''
+    Function which checks if an existing output can be used to derive new outputs of the given input.
+    The output must have a manifest showing that it was made from the same input contents (by the same engine),
+    directly from the original video, otherwise derived frames could come from a different (or older) video.
+    Outputs made with cheaper (deadline) settings are also skipped, since derived outputs would otherwise
+    hide the lower quality & never get re-processed
+    Returns:
+        output_settings_dict (or None if the output can't be used as a derive source)
+    '''
+
+    manifest_folder = os.path.join(os.path.dirname(output_path), MANIFEST_FOLDER_NAME)
+    try:
+        output_stats = os.stat(output_path)
+        manifest_name_list = sorted(os.listdir(manifest_folder))
+    except OSError:
+        return None
+
+    # Find the manifest describing this exact output file
+    manifest_dict = None
+    for each_name in manifest_name_list:
+        try:
+            with open(os.path.join(manifest_folder, each_name), "r") as in_file:
+                each_manifest_dict = json.load(in_file)
+        except (ValueError, OSError):
+            continue
+        output_dict = each_manifest_dict.get("output", {})
+        same_output = (output_dict.get("name") == os.path.basename(output_path)
+                       and output_dict.get("size") == output_stats.st_size
+                       and output_dict.get("mtime_ns") == output_stats.st_mtime_ns)
+        if same_output:
+            manifest_dict = each_manifest_dict
+            break
+    if manifest_dict is None:
+        return None
+
+    # Make sure the output was made from the current input, by this engine, at full quality
+    # & not derived from another output
+    same_source = _check_same_source(manifest_dict.get("source", {}), source_path, input_identity_dict)
+    same_engine = (manifest_dict.get("engine_version") == engine_version)
+    is_derived = (manifest_dict.get("derived_from") is not None)
+    is_degraded = (len(manifest_dict.get("settings", {}).get("degraded", [])) > 0)
+    if not same_source or not same_engine or is_derived or is_degraded:
+        return None
+
+    return manifest_dict.get("settings")
+
+# .....................................................................................................................
+
+def write_manifest(manifest_path, source_path, input_identity_dict, output_settings_dict, engine_version,
+                   output_path, frames_written, derived_from = None):
+
+    '''
+    Function which records the input/settings used to make an output, so it can be re-used on later runs.
+    Outputs made from an existing output (rather than the original video) record the path of that output,
+    since they've been through an extra round of (lossy) encoding
+    '''
+
+    output_stats = os.stat(output_path)
+    manifest_dict = {"source": {"path": os.path.realpath(source_path), **input_identity_dict},
+                     "settings": output_settings_dict,
+                     "engine_version": engine_version,
+                     "output": {"name": os.path.basename(output_path),
+                                "size": output_stats.st_size,
+                                "mtime_ns": output_stats.st_mtime_ns,
+                                "frames": frames_written},
+                     "derived_from": derived_from,
+                     "timestamp": strftime("%Y-%m-%d %H:%M:%S")}
+
+    # Write to a temporary file first, so an interruption never leaves a partial manifest behind
+    os.makedirs(os.path.dirname(manifest_path), exist_ok = True)
+    temp_path = "{}.tmp".format(manifest_path)
+    with open(temp_path, "w") as out_file:
+        json.dump(manifest_dict, out_file, indent = 2)
+    os.replace(temp_path, manifest_path)
+
+    return manifest_dict
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
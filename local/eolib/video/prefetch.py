@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 10:17:05 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import threading
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Size of each read made while prefetching. Smaller reads let the prefetcher switch targets more quickly
+PREFETCH_CHUNK_BYTES = 4 * (1024 ** 2)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Input_Prefetcher:
+
+    '''
+    Class used to read upcoming input videos into the (operating system) page cache using a background thread,
+    so processing doesn't stall on cold reads (e.g. from network storage) when moving on to the next video.
+    Upcoming videos are read in order, from the start of each file, until the memory budget is used up.
+    The data itself is thrown away, it only needs to pass through the page cache to speed up the real reads.
+
+    Example:
+        prefetcher = Input_Prefetcher(budget_mb = 256)
+        for each_idx, each_path in enumerate(path_list):
+            prefetcher.set_upcoming(path_list[1 + each_idx:])
+            (process each_path)
+        prefetcher.close()
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, budget_mb = 256):
+
+        # Store inputs
+        self.budget_bytes = int(budget_mb * (1024 ** 2))
+
+        # Allocate storage for the list of upcoming files (replaced as processing moves along)
+        self._condition = threading.Condition()
+        self._upcoming_list = []
+        self._generation = 0
+        self._stop = False
+
+        # Keep track of how much of each file has already been read, so files aren't re-read on every update
+        self._read_bytes_lut = {}
+        self.total_bytes_read = 0
+
+        # Start up the background thread (as a daemon, so it can never keep the program from exiting)
+        self._thread = threading.Thread(target = self._run, name = "input_prefetcher", daemon = True)
+        self._thread.start()
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Input prefetcher ({:.0f} MB budget, {:.1f} MB read)".format(self.budget_bytes / (1024 ** 2),
+                                                                             self.total_bytes_read / (1024 ** 2))
+
+    # .................................................................................................................
+
+    def set_upcoming(self, path_list):
+
+        ''' Function used to replace the list of upcoming files (in the order they'll be processed) '''
+
+        with self._condition:
+            self._upcoming_list = list(path_list)
+            self._generation += 1
+            self._condition.notify()
+
+    # .................................................................................................................
+
+    def close(self):
+
+        ''' Stops prefetching. Any read in progress is abandoned after the current chunk '''
+
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        self._thread.join()
+
+    # .................................................................................................................
+
+    def _run(self):
+
+        seen_generation = 0
+        while True:
+
+            # Wait for a new list of upcoming files
+            with self._condition:
+                while not self._stop and self._generation == seen_generation:
+                    self._condition.wait()
+                if self._stop:
+                    return
+                seen_generation = self._generation
+                path_list = self._upcoming_list
+
+            # Forget about files that are no longer upcoming (they've been processed, or were dropped)
+            path_set = set(path_list)
+            self._read_bytes_lut = {each_key: each_bytes for each_key, each_bytes in self._read_bytes_lut.items()
+                                    if each_key[0] in path_set}
+
+            # Read upcoming files in order until the budget runs out (or we're given a new list)
+            budget_left = self.budget_bytes
+            for each_path in path_list:
+                if budget_left <= 0 or self._is_stale(seen_generation):
+                    break
+                budget_left -= self._prefetch_file(each_path, budget_left, seen_generation)
+
+    # .................................................................................................................
+
+    def _prefetch_file(self, file_path, max_bytes, generation):
+
+        # Returns the number of bytes of the file that are (now) in the page cache, as counted against the budget
+        try:
+            with open(file_path, "rb", buffering = 0) as in_file:
+                file_stats = os.fstat(in_file.fileno())
+                read_limit = min(file_stats.st_size, max_bytes)
+                file_key = (file_path, file_stats.st_size, file_stats.st_mtime_ns)
+
+                # Let the OS know the data will be needed (this alone is enough on some filesystems)
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(in_file.fileno(), 0, read_limit, os.POSIX_FADV_WILLNEED)
+
+                # Read through the file anyways, since network filesystems may ignore the hint
+                bytes_read = self._read_bytes_lut.get(file_key, 0)
+                in_file.seek(bytes_read)
+                read_buffer = bytearray(min(PREFETCH_CHUNK_BYTES, max(1, read_limit)))
+                while bytes_read < read_limit and not self._is_stale(generation):
+                    num_read = in_file.readinto(read_buffer)
+                    if not num_read:
+                        break
+                    bytes_read += num_read
+                    self.total_bytes_read += num_read
+                    self._read_bytes_lut[file_key] = bytes_read
+
+        except OSError:
+            return 0
+
+        return read_limit
+
+    # .................................................................................................................
+
+    def _is_stale(self, generation):
+        return self._stop or (self._generation != generation)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
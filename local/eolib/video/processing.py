@@ -0,0 +1,1459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:40:06 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import cv2
+import glob
+import json
+import hashlib
+import numpy as np
+
+from time import perf_counter
+
+from local.eolib.video.windowing import SimpleWindow
+from local.eolib.video.read_write import Video_Reader, Video_Recorder, get_video_source_type, verify_recording
+from local.eolib.video.transcoding import Background_Transcoder, join_videos
+from local.eolib.video.prefetch import Input_Prefetcher
+from local.eolib.video.frame_cache import get_timelapse_sample_indices, get_union_sample_indices
+from local.eolib.video.manifest import get_input_identity, get_manifest_path, check_manifest, write_manifest
+from local.eolib.video.manifest import check_derive_source
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Version of the processing engine, recorded in output manifests. Should be bumped whenever a change to the
+# processing would change the recorded outputs, so that outputs from older versions aren't re-used
+ENGINE_VERSION = "1.0"
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Timelapse_Output:
+
+    '''
+    Class used to record a single (timelapsed & scaled) output from a shared stream of rotated frames.
+    Each output keeps its own sampling accumulator, so several outputs can be fed from one decode.
+    Recordings can be split into segments (for checkpointing), which are joined back together on close.
+    If a staging folder is given, recording happens there & the finished file is published to it's destination.
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, save_path, source_fps, rotated_source_WH, timelapse_factor, scale_factor,
+                 target_fps = 30.0, codec = "avc1", intermediate_codec = None, interpolation = cv2.INTER_LINEAR,
+                 staging_dir = None):
+
+        # Store inputs
+        self.save_path = save_path
+        self.staging_dir = staging_dir
+        self.timelapse_factor = timelapse_factor
+        self.scale_factor = scale_factor
+        self.interpolation = interpolation
+        self.rotated_source_WH = tuple(rotated_source_WH)
+        self.needs_resizing = abs(scale_factor - 1.0) > 0.001
+
+        # Figure out timelapse/fps combination
+        timelapse_fps = (source_fps * timelapse_factor)
+        self.recording_fps = min(target_fps, timelapse_fps)
+        self.effective_tl_factor = timelapse_fps / self.recording_fps
+
+        # Figure out the final output sizing
+        rot_width, rot_height = self.rotated_source_WH
+        self.output_WH = (int(round(rot_width * scale_factor)), int(round(rot_height * scale_factor)))
+
+        # Set up recorder
+        self._codec = codec
+        self._intermediate_codec = intermediate_codec
+        self.vwriter = self._make_recorder()
+
+        # Set up sampling accumulator (matches original recording loop, where the first frame counts as 0)
+        self._source_counter = -1
+        self._accumulator = -1.0
+        self._next_sample_idx = -1
+        self._advance()
+
+        # Keep track of the last recorded frame, so resuming can never record the same frame twice
+        self._last_written_idx = -1
+        self._pending_idx = -1
+
+        # Allocate storage for finished segments, as (path, num_frames) pairs
+        self.segment_list = []
+        self._joined_frames = None
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Timelapse output (TLx{}, scale {}): {}".format(self.timelapse_factor, self.scale_factor,
+                                                               self.save_path)
+
+    # .................................................................................................................
+
+    def check_sample(self, source_idx):
+
+        '''
+        Returns True if the given (0-indexed) source frame should be recorded by this output.
+        Source indices must be checked in increasing order, but may skip frames
+        '''
+
+        while self._next_sample_idx < source_idx:
+            self._advance()
+
+        is_sample = (self._next_sample_idx == source_idx) and (source_idx > self._last_written_idx)
+        if is_sample:
+            self._pending_idx = source_idx
+
+        return is_sample
+
+    # .................................................................................................................
+
+    def write(self, rotated_frame):
+
+        # Scale relative to the source if we have a source-sized frame, otherwise just force the output size
+        frame_height, frame_width = rotated_frame.shape[0:2]
+        frame_WH = (frame_width, frame_height)
+        if frame_WH == self.output_WH:
+            scaled_frame = rotated_frame
+        elif frame_WH == self.rotated_source_WH:
+            scaled_frame = cv2.resize(rotated_frame, dsize = None, fx = self.scale_factor, fy = self.scale_factor,
+                                      interpolation = self.interpolation)
+        else:
+            scaled_frame = cv2.resize(rotated_frame, dsize = self.output_WH, interpolation = self.interpolation)
+
+        self.vwriter.write(scaled_frame)
+        self._last_written_idx = self._pending_idx
+
+        return scaled_frame
+
+    # .................................................................................................................
+
+    def close(self, join_segments = True):
+
+        ''' Finishes recording. If the output was split into segments, they're joined into the final file '''
+
+        self.vwriter.close()
+        if not (join_segments and len(self.segment_list) > 0):
+            return
+
+        # Treat the current recording as the final segment & join everything together
+        self.roll_segment(start_new_segment = False)
+        segment_path_list = [each_path for each_path, _ in self.segment_list]
+        joined_ok, self._joined_frames = join_videos(segment_path_list, self.vwriter.save_path, self.vwriter.codec,
+                                                     self.output_WH, self.recording_fps)
+
+        # Only clean up segments once we know they've been joined properly
+        if joined_ok:
+            for each_path in segment_path_list:
+                os.remove(each_path)
+            self.segment_list = []
+
+    # .................................................................................................................
+
+    def verify(self):
+        return verify_recording(self.vwriter.save_path, self.frames_written, self.output_WH, self.recording_fps)
+
+    # .................................................................................................................
+
+    def publish(self):
+        # Move the finished recording out of the staging folder (if used), must be called after closing
+        return self.vwriter.publish()
+
+    # .................................................................................................................
+
+    @property
+    def frames_written(self):
+        if self._joined_frames is not None:
+            return self._joined_frames
+        return self.vwriter.frames_written + sum(each_frames for _, each_frames in self.segment_list)
+
+    # .................................................................................................................
+
+    def roll_segment(self, start_new_segment = True):
+
+        ''' Closes the current recording as a finished segment, so it can't be lost if processing crashes '''
+
+        # Move the current recording out of the way (if anything was recorded)
+        self.vwriter.close()
+        num_frames = self.vwriter.frames_written
+        if num_frames > 0:
+            segment_path = get_segment_path(self.vwriter.save_path, len(self.segment_list))
+            os.replace(self.vwriter.save_path, segment_path)
+            self.segment_list.append((segment_path, num_frames))
+
+        # Start a fresh recording for the next segment
+        if start_new_segment:
+            self.vwriter = self._make_recorder()
+
+    # .................................................................................................................
+
+    def get_state(self):
+
+        ''' Returns a (json-friendly) dictionary describing the recording progress, for checkpointing '''
+
+        return {"source_counter": self._source_counter,
+                "accumulator": self._accumulator,
+                "next_sample_idx": self._next_sample_idx,
+                "last_written_idx": self._last_written_idx,
+                "segment_list": [list(each_entry) for each_entry in self.segment_list]}
+
+    # .................................................................................................................
+
+    def set_state(self, state_dict):
+
+        ''' Restores recording progress from a checkpoint (see get_state(...)) '''
+
+        self._source_counter = state_dict["source_counter"]
+        self._accumulator = state_dict["accumulator"]
+        self._next_sample_idx = state_dict["next_sample_idx"]
+        self._last_written_idx = state_dict["last_written_idx"]
+        self.segment_list = [tuple(each_entry) for each_entry in state_dict["segment_list"]]
+
+    # .................................................................................................................
+
+    def _make_recorder(self):
+        return Video_Recorder(self.save_path, self.recording_fps, None, codec = self._codec, enabled = True,
+                              intermediate_codec = self._intermediate_codec, staging_dir = self.staging_dir)
+
+    # .................................................................................................................
+
+    def _advance(self):
+
+        # Step the accumulator forward until we find the next source frame to sample
+        while True:
+            self._source_counter += 1
+            self._accumulator += 1.0
+            if self._accumulator >= self.effective_tl_factor:
+                self._accumulator = (self._accumulator - self.effective_tl_factor)
+                self._next_sample_idx = self._source_counter
+                break
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+class Processing_Job:
+
+    '''
+    Class used to run the rotate/timelapse/scale processing on a set of videos, without any user interaction.
+    Holds all of the processing settings, so the same job can be re-used on different sets of files.
+
+    Example:
+        job = Processing_Job(rotation_n90 = 1, timelapse_factor = 12, scale_factor = 0.5)
+        run_stats = job.run(["/path/to/video.mp4"])
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, rotation_n90 = 0, timelapse_factor = 1.0, scale_factor = 1.0,
+                 target_fps = 30.0, codec = "avc1", recording_ext = ".mp4", output_root = None, input_root = None,
+                 staging_dir = None, output_spec_list = None, use_intermediate = False, num_compress_workers = 2,
+                 frame_cache = None, enable_derive = True, checkpoint_sec = 300.0, reuse_outputs = True,
+                 use_frame_index = False, governor = None, fast_resize = False, keyframe_sampling = False,
+                 prefetch_mb = None, display_enabled = False, progress_bar_func = None, verbose = False):
+
+        '''
+        Inputs:
+            rotation_n90 -> Integer. Number of counter-clockwise 90 degree rotations to apply
+
+            timelapse_factor, scale_factor -> Floats. Only used if no output_spec_list is given
+
+            target_fps -> Float. Maximum framerate of the recorded videos
+
+            codec, recording_ext -> Strings. Default recording settings (used if not given by the output specs)
+
+            output_root -> String or None. Folder in which output folders are created.
+                           If None, outputs are saved beside the original videos
+
+            input_root -> String or None. Folder containing every input (see get_input_root(...)). When saving
+                          to an output root, the layout of the videos below this folder is kept, so videos with
+                          the same name in different folders don't end up with the same output path
+
+            staging_dir -> String or None. If provided, outputs are recorded into this (ideally fast, local) folder
+                           and only moved to their destination once finished, so partial files never show up in
+                           the output folders & recording isn't slowed down by (network) storage latency
+
+            output_spec_list -> List of dictionaries or None. Each entry describes one output, using keys:
+                                "timelapse_factor", "scale_factor", "codec", "recording_ext"
+                                All outputs are recorded from a single decode of each video
+
+            use_intermediate -> Boolean. If true, record fast intermediate files and compress them in the background
+
+            num_compress_workers -> Integer. Number of background compression workers (if using intermediates)
+
+            frame_cache -> Frame_Cache object or None. Used to re-use decoded frames across runs
+
+            enable_derive -> Boolean. If true, outputs may be derived from compatible, existing outputs
+                             (at the cost of an extra round of lossy encoding, see find_derivable_output(...))
+
+            checkpoint_sec -> Float or None. Time between checkpoints while decoding. Outputs are split into
+                              segments at each checkpoint, so interrupted/crashed processing can be resumed
+                              by re-running the same job. Set to None (or <= 0) to disable
+
+            reuse_outputs -> Boolean. If true, videos are skipped when every output already exists with a
+                             manifest matching the video contents, settings & engine version. This also skips
+                             copies of the same video selected under different names
+
+            use_frame_index -> Boolean. If true, each video is scanned once (without decoding) to build an index
+                               of exact frame counts & keyframes, stored beside the video. Gives accurate
+                               progress/timing for videos with bad frame counts & exact seeking when resuming
+
+            governor -> Resource_Governor object or None. If provided, processing is paused as needed to stay
+                        within the governor's CPU & disk I/O budgets (for running alongside other services)
+
+            fast_resize -> Boolean. If true, outputs are scaled using (cheaper) nearest-neighbour interpolation
+
+            keyframe_sampling -> Boolean. If true, only keyframes are decoded & each timelapsed frame is taken from
+                                 the closest keyframe before it. Much faster, but frame timing is approximate.
+                                 Only used when the timelapse skips at least one keyframe interval per frame
+                                 (requires a frame index, which is built as needed)
+
+            prefetch_mb -> Float or None. If provided, upcoming videos are read into the OS cache in the
+                           background (up to this many MB ahead) while the current video is processed, which
+                           avoids stalling on cold reads when starting each video (e.g. on network storage)
+
+            display_enabled -> Boolean. If true, the recorded frames are displayed while processing
+
+            progress_bar_func -> Function or None. If provided, called as progress_bar_func(total = N) and must
+                                 return an object with update(), reset(), set_description() & close() methods
+                                 (e.g. tqdm)
+
+            verbose -> Boolean. If true, progress messages are printed to the terminal
+        '''
+
+        # Fill in a single output, if we weren't given output specs
+        if output_spec_list is None:
+            output_spec_list = [{"timelapse_factor": timelapse_factor,
+                                 "scale_factor": scale_factor,
+                                 "codec": codec,
+                                 "recording_ext": recording_ext}]
+
+        # Store inputs
+        self.rotation_n90 = int(rotation_n90)
+        self.target_fps = target_fps
+        self.output_root = output_root
+        self.input_root = input_root
+        self.staging_dir = staging_dir
+        self.output_spec_list = [{"codec": codec, "recording_ext": recording_ext, **each_spec}
+                                 for each_spec in output_spec_list]
+        self.use_intermediate = use_intermediate
+        self.num_compress_workers = num_compress_workers
+        self.frame_cache = frame_cache
+        self.enable_derive = enable_derive
+        self.checkpoint_sec = checkpoint_sec if (checkpoint_sec is not None and checkpoint_sec > 0) else None
+        self.reuse_outputs = reuse_outputs
+        self.use_frame_index = use_frame_index
+        self.governor = governor
+        self.fast_resize = fast_resize
+        self.keyframe_sampling = keyframe_sampling
+        self.prefetch_mb = prefetch_mb
+        self.display_enabled = display_enabled
+        self.progress_bar_func = progress_bar_func
+        self.verbose = verbose
+
+        # Create derived variables
+        self.rotation_angle_deg = (90 * self.rotation_n90) % 360
+        self.needs_rotating = abs(self.rotation_angle_deg) > 0
+        self.intermediate_codec = "MJPG" if use_intermediate else None
+        self.interpolation = cv2.INTER_NEAREST if fast_resize else cv2.INTER_LINEAR
+        self.output_naming_list = [build_folder_naming(self.rotation_angle_deg,
+                                                       each_spec["timelapse_factor"],
+                                                       each_spec["scale_factor"])
+                                   for each_spec in self.output_spec_list]
+
+        # Allocate storage for background compression
+        self._transcoder = None
+
+        # Keep track of manifests written during a run, so duplicate inputs in different folders are caught too
+        self._engine_version = get_engine_version()
+        self._run_manifest_lut = {}
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        out_strs = ["Processing job (rotation: {} deg)".format(self.rotation_angle_deg)]
+        out_strs += ["  {}".format(each_folder_name) for each_folder_name, _ in self.output_naming_list]
+        return "\n".join(out_strs)
+
+    # .................................................................................................................
+
+    def run(self, file_path_list):
+
+        '''
+        Function which processes every video in the given list
+        Returns:
+            run_stats_dict (keys: "files", "save_folders", "failed_verification", "reused", "interrupted",
+                            "resource_usage", "ingest_time_sec", "total_time_sec")
+        '''
+
+        # Refuse to run if any videos would be saved to the same output path (they'd overwrite each other)
+        collision_lut = self.find_output_collisions(file_path_list)
+        if len(collision_lut) > 0:
+            raise ValueError("Videos with the same output path: {}".format(
+                "; ".join(", ".join(each_list) for each_list in collision_lut.values())))
+
+        # Set up background compression, if needed
+        num_files = len(file_path_list)
+        if self.governor is not None:
+            self.governor.start()
+        self._run_manifest_lut = {}
+        self._transcoder = Background_Transcoder(self.num_compress_workers) if self.use_intermediate else None
+
+        # Start reading ahead, if needed (only helps if there's more than one file)
+        prefetcher = None
+        if self.prefetch_mb is not None and num_files > 1:
+            prefetcher = Input_Prefetcher(self.prefetch_mb)
+
+        # Process each of the files, stopping early if we're interrupted
+        t_start = perf_counter()
+        file_stats_list = []
+        for each_idx, each_file in enumerate(file_path_list):
+            if prefetcher is not None:
+                prefetcher.set_upcoming(file_path_list[1 + each_idx:])
+            file_stats = self.process_file(each_file, each_idx, num_files)
+            file_stats_list.append(file_stats)
+            if file_stats["interrupted"]:
+                break
+        if prefetcher is not None:
+            prefetcher.close()
+        t_ingest_end = perf_counter()
+
+        # Wait for background compression to finish & record final verification results
+        if self._transcoder is not None:
+            self._print("", "Waiting on background compression: {}".format(self._transcoder.progress_string()))
+            compress_results_list = self._transcoder.wait_for_all(self.progress_bar_func)
+            compress_results_lut = {each_result["save_path"]: each_result for each_result in compress_results_list}
+            for each_file_stats in file_stats_list:
+                for each_output_stats in each_file_stats["outputs"]:
+                    compress_result = compress_results_lut.get(each_output_stats["save_path"])
+                    if compress_result is not None:
+                        each_output_stats["ok"] = compress_result["ok"]
+                        each_output_stats["issues"] = compress_result["issues"]
+                self._write_manifests(each_file_stats)
+            self._transcoder = None
+        t_end = perf_counter()
+
+        # Gather up results from every file for convenience
+        save_folder_list = []
+        failed_verification_dict = {}
+        for each_file_stats in file_stats_list:
+            for each_output_stats in each_file_stats["outputs"]:
+                save_folder = os.path.dirname(each_output_stats["save_path"])
+                if save_folder not in save_folder_list:
+                    save_folder_list.append(save_folder)
+                if not each_output_stats["ok"]:
+                    failed_verification_dict[each_output_stats["save_path"]] = each_output_stats["issues"]
+
+        run_stats_dict = {"files": file_stats_list,
+                          "save_folders": save_folder_list,
+                          "failed_verification": failed_verification_dict,
+                          "reused": [each_stats["source_path"] for each_stats in file_stats_list
+                                     if each_stats["frame_source"] == "reused"],
+                          "interrupted": any(each_stats["interrupted"] for each_stats in file_stats_list),
+                          "resource_usage": None if self.governor is None else self.governor.get_usage_stats(),
+                          "ingest_time_sec": t_ingest_end - t_start,
+                          "total_time_sec": t_end - t_start}
+
+        return run_stats_dict
+
+    # .................................................................................................................
+
+    def get_save_folder(self, source_path, folder_name):
+
+        source_folder = os.path.dirname(os.path.realpath(source_path))
+        if self.output_root is None:
+            return os.path.join(source_folder, folder_name)
+
+        # Mirror the folder layout below the input root inside the output root (if the video is inside the root)
+        relative_folder = ""
+        if self.input_root is not None:
+            relative_folder = os.path.relpath(source_folder, os.path.realpath(self.input_root))
+            relative_folder = "" if relative_folder.startswith(os.pardir) else relative_folder
+
+        return os.path.normpath(os.path.join(os.path.expanduser(self.output_root), relative_folder, folder_name))
+
+    # .................................................................................................................
+
+    def get_save_paths(self, source_path):
+
+        ''' Returns the path of every output (in output spec order) that would be saved for the given video '''
+
+        file_name_only, _ = os.path.splitext(os.path.basename(source_path))
+        save_path_list = []
+        for each_spec, (each_folder_name, each_timelapse_name) in zip(self.output_spec_list, self.output_naming_list):
+            save_folder = self.get_save_folder(source_path, each_folder_name)
+            save_name = "{}_{}{}".format(file_name_only, each_timelapse_name, each_spec["recording_ext"])
+            save_path_list.append(os.path.join(save_folder, save_name))
+
+        return save_path_list
+
+    # .................................................................................................................
+
+    def find_output_collisions(self, file_path_list):
+
+        '''
+        Function which checks for videos that would be saved to the same output path (e.g. "clip.avi" & "clip.mp4"
+        in the same folder, or videos with the same name in different folders when using an output root)
+        Returns:
+            collision_lut (keys: output paths, values: list of videos saving to that path)
+        '''
+
+        source_path_lut = {}
+        for each_path in file_path_list:
+            real_path = os.path.realpath(each_path)
+            for each_save_path in self.get_save_paths(real_path):
+                path_list = source_path_lut.setdefault(each_save_path, [])
+                if real_path not in path_list:
+                    path_list.append(real_path)
+
+        return {each_save_path: each_list for each_save_path, each_list in source_path_lut.items()
+                if len(each_list) > 1}
+
+    # .................................................................................................................
+
+    def estimate_outputs(self, total_frames, source_fps):
+
+        '''
+        Function which estimates the size of each output for a video with the given (probed) info,
+        without opening the video
+        Returns:
+            output_estimate_list (list of dictionaries, with keys: "frames", "duration_sec")
+        '''
+
+        output_estimate_list = []
+        for each_spec in self.output_spec_list:
+
+            # Same timelapse/fps combination as used when recording (see Timelapse_Output)
+            timelapse_fps = source_fps * each_spec["timelapse_factor"]
+            recording_fps = min(self.target_fps, timelapse_fps)
+            num_frames = int(total_frames // (timelapse_fps / recording_fps)) if recording_fps > 0 else 0
+            output_estimate_list.append({"frames": num_frames,
+                                         "duration_sec": (num_frames / recording_fps) if recording_fps > 0 else 0.0})
+
+        return output_estimate_list
+
+    # .................................................................................................................
+
+    def process_file(self, source_path, file_index = 0, num_files = 1):
+
+        '''
+        Function which records all outputs for a single video
+        Returns:
+            file_stats_dict (keys: "source_path", "source_frames", "frame_source", "outputs", "duplicate_of",
+                             "derived_from", "degraded", "interrupted", "process_time_sec")
+        '''
+
+        # Get file naming
+        t_start = perf_counter()
+        full_file_path = os.path.realpath(source_path)
+        file_name = os.path.basename(source_path)
+        file_name_only, _ = os.path.splitext(file_name)
+
+        # Figure out where each output is saved, along with it's manifest (based on the input contents & settings)
+        input_identity = get_input_identity(full_file_path)
+        save_path_list = self.get_save_paths(full_file_path)
+        manifest_path_list = [get_manifest_path(os.path.dirname(each_save_path), input_identity,
+                                                self._get_output_settings(each_spec), self._engine_version)
+                              for each_spec, each_save_path in zip(self.output_spec_list, save_path_list)]
+
+        # Skip the video entirely if every output already exists (e.g. from a previous run, or a duplicate input)
+        if self.reuse_outputs:
+            reused_stats_dict = self._check_reusable(full_file_path, input_identity, manifest_path_list, t_start)
+            if reused_stats_dict is not None:
+                duplicate_of_path = reused_stats_dict["duplicate_of"]
+                self._print("", "Skipping ({}/{}): {} ({})".format(1 + file_index, num_files, file_name,
+                                                                   "outputs already exist" if duplicate_of_path is None
+                                                                   else "duplicate of {}".format(duplicate_of_path)))
+                return reused_stats_dict
+
+        # Get video info
+        vreader = Video_Reader(full_file_path, use_frame_index = (self.use_frame_index or self.keyframe_sampling))
+        video_width, video_height = vreader.WH
+        video_fps = vreader.fps
+        video_frames = vreader.total_frames
+        video_length_sec = int(round(video_frames / video_fps))
+        bytes_per_frame = input_identity["size"] / max(1, video_frames)
+
+        # Get mapping used to rotate the video
+        x_map, y_map = get_rotation_mapping(video_width, video_height, self.rotation_n90)
+        rotated_WH = get_rotated_WH((video_width, video_height), self.rotation_n90)
+
+        # Set up recording for each output (all outputs share a single decode of the video)
+        output_list = []
+        for each_spec, save_path in zip(self.output_spec_list, save_path_list):
+
+            # Make sure the save folder exists
+            os.makedirs(os.path.dirname(save_path), exist_ok = True)
+
+            # Set up recorder, with it's own timelapsing & scaling
+            new_output = Timelapse_Output(save_path, video_fps, rotated_WH,
+                                          each_spec["timelapse_factor"], each_spec["scale_factor"],
+                                          self.target_fps, each_spec["codec"], self.intermediate_codec,
+                                          self.interpolation, self.staging_dir)
+            output_list.append(new_output)
+        effective_tl_factor_list = [each_output.effective_tl_factor for each_output in output_list]
+
+        # Set up frame/progress tracking
+        mins_long = video_length_sec // 60
+        sec_long = video_length_sec % 60
+        time_length_str = "{:.0f} mins, {:.0f} seconds long".format(mins_long, sec_long)
+        proc_msg = "Processing ({}/{}): {} ({})".format(1 + file_index, num_files, file_name, time_length_str)
+        self._print("", proc_msg)
+        prog_bar = self._make_progress_bar(video_frames)
+
+        # Set up display
+        disp_window = SimpleWindow("Display", enabled = self.display_enabled)
+        disp_window.move(20, 20)
+
+        # Check for previously decoded frames that we can re-use (skips decoding entirely!)
+        frame_source = "decode"
+        presampled_frames, presampled_total = None, None
+        if self.frame_cache is not None:
+            cached_frames, cached_indices, cached_rows = self.frame_cache.lookup(full_file_path, self.rotation_n90,
+                                                                                 effective_tl_factor_list)
+            if cached_frames is not None:
+                frame_source = "cache"
+                presampled_frames = zip(cached_indices, (cached_frames[each_row] for each_row in cached_rows))
+                presampled_total = len(cached_rows)
+
+        # Otherwise check for an existing output we can derive from, which is cheaper than decoding the original
+        existing_reader, derived_from_path = None, None
+        if self.enable_derive and presampled_frames is None:
+            search_folder = os.path.dirname(self.get_save_folder(full_file_path, "."))
+            save_path_list = [each_output.save_path for each_output in output_list]
+            max_scale_factor = max(each_output.scale_factor for each_output in output_list)
+            existing_path, existing_indices, existing_rows = \
+            find_derivable_output(search_folder, file_name_only, save_path_list, self.rotation_angle_deg,
+                                  max_scale_factor, video_frames, video_fps, (video_width, video_height),
+                                  effective_tl_factor_list, full_file_path, input_identity, self._engine_version)
+            if existing_path is not None:
+                frame_source = "derived"
+                derived_from_path = existing_path
+                existing_reader = Video_Reader(existing_path)
+                presampled_frames = read_derived_frames(existing_reader, existing_indices, existing_rows)
+                presampled_total = len(existing_rows)
+                self._print("Deriving from existing output: {}".format(os.path.relpath(existing_path,
+                                                                                       search_folder)))
+
+        # Otherwise only decode keyframes, if allowed (& the timelapse skips enough frames for this to help)
+        use_keyframes = False
+        if self.keyframe_sampling and presampled_frames is None:
+            use_keyframes = check_keyframe_sampling(vreader.frame_index, effective_tl_factor_list)
+            frame_source = "keyframes" if use_keyframes else frame_source
+
+        # Keep track of any cheaper settings that were actually used, since they affect the output quality
+        degraded_list = []
+        if self.fast_resize and any(each_output.needs_resizing for each_output in output_list):
+            degraded_list.append("fast_resize")
+        if use_keyframes:
+            degraded_list.append("keyframes")
+
+        # Set up checkpointing, if we're decoding the original (other frame sources are fast enough to redo)
+        use_checkpoints = (self.checkpoint_sec is not None and presampled_frames is None and not use_keyframes)
+        checkpoint_path = get_checkpoint_path(output_list[0].save_path, file_name_only)
+        checkpoint_key = self._get_checkpoint_key(full_file_path)
+
+        # Pick up from a previous (interrupted) run, if possible
+        source_idx = -1
+        checkpoint_dict = load_checkpoint(checkpoint_path, checkpoint_key, output_list) if use_checkpoints else None
+        if checkpoint_dict is not None:
+            source_idx = checkpoint_dict["source_idx"]
+            for each_output, each_state in zip(output_list, checkpoint_dict["output_states"]):
+                each_output.set_state(each_state)
+            vreader.set_current_frame(1 + source_idx)
+            prog_bar.update(1 + source_idx)
+            self._print("Resuming from checkpoint (frame {} of {})".format(1 + source_idx, video_frames))
+
+        # Store decoded frames for re-use, if we're going to decode the original anyways
+        # -> Can't cache when resuming, since we won't see every frame
+        cache_writer = None
+        if self.frame_cache is not None and presampled_frames is None and checkpoint_dict is None and not use_keyframes:
+            cache_writer = self.frame_cache.create_writer(full_file_path, self.rotation_n90)
+
+        # Run video recording loop
+        completed_idx = source_idx
+        interrupted = False
+        t_last_checkpoint = perf_counter()
+        try:
+
+            # Record directly from already sampled/rotated frames, if possible
+            if presampled_frames is not None:
+                prog_bar.reset(total = presampled_total)
+                prog_bar.set_description("({})".format(frame_source))
+                for source_idx, rot_frame in presampled_frames:
+                    sample_flags = [each_output.check_sample(source_idx) for each_output in output_list]
+                    record_to_outputs(output_list, sample_flags, rot_frame, disp_window)
+                    prog_bar.update()
+                    if self.governor is not None:
+                        self.governor.throttle()
+
+            # Jump between keyframes, re-using each decoded keyframe for every sample that falls after it
+            if use_keyframes:
+                sample_indices = get_union_sample_indices(video_frames, effective_tl_factor_list)
+                prog_bar.reset(total = len(sample_indices))
+                prog_bar.set_description("(keyframes)")
+                last_keyframe_idx, rot_frame = None, None
+                for source_idx in sample_indices:
+                    keyframe_idx = vreader.frame_index.get_keyframe_before(source_idx)
+                    if keyframe_idx != last_keyframe_idx:
+                        vreader.set_current_frame(keyframe_idx)
+                        req_break, frame = vreader.read()
+                        if req_break:
+                            break
+                        rot_frame = cv2.remap(frame, x_map, y_map, cv2.INTER_NEAREST) if self.needs_rotating else frame
+                        last_keyframe_idx = keyframe_idx
+                    sample_flags = [each_output.check_sample(source_idx) for each_output in output_list]
+                    record_to_outputs(output_list, sample_flags, rot_frame, disp_window)
+                    prog_bar.update()
+                    if self.governor is not None:
+                        self.governor.throttle()
+
+            while presampled_frames is None and not use_keyframes:
+
+                # Grab video frame data, without decoding
+                req_break = vreader.no_decode_read()
+                if req_break:
+                    break
+
+                # Keep track of frames for timelapsing and update progress bar
+                source_idx += 1
+                prog_bar.update()
+
+                # Pause if we're using more than our share of the machine
+                if self.governor is not None:
+                    self.governor.throttle(bytes_per_frame)
+
+                # Only display/record data on frames that (at least one of) the outputs are timelapsing
+                sample_flags = [each_output.check_sample(source_idx) for each_output in output_list]
+                if any(sample_flags):
+
+                    # Now we need the frame, so decode the frame data
+                    req_break, frame = vreader.decode_read()
+                    if req_break:
+                        break
+
+                    # Rotate the incoming frame (each output handles it's own scaling)
+                    rot_frame = cv2.remap(frame, x_map, y_map, cv2.INTER_NEAREST) if self.needs_rotating else frame
+                    if cache_writer is not None:
+                        cache_writer.write(source_idx, rot_frame)
+
+                    # Record & display resulting frame(s)
+                    record_to_outputs(output_list, sample_flags, rot_frame, disp_window)
+
+                # Periodically save progress, so a crash doesn't lose everything
+                completed_idx = source_idx
+                if use_checkpoints and (perf_counter() - t_last_checkpoint) > self.checkpoint_sec:
+                    save_checkpoint(checkpoint_path, checkpoint_key, completed_idx, output_list)
+                    t_last_checkpoint = perf_counter()
+
+            # Store decoded frames for re-use, now that we know we got through the whole video
+            if cache_writer is not None:
+                cache_writer.finish(total_source_frames = 1 + source_idx)
+
+        except KeyboardInterrupt:
+            interrupted = True
+            if cache_writer is not None:
+                cache_writer.abort()
+
+            # Save everything up to the last fully processed frame, so no finished work is lost
+            if use_checkpoints:
+                save_checkpoint(checkpoint_path, checkpoint_key, completed_idx, output_list)
+
+        # Clean up (segments are left as-is if we were interrupted, so we can resume later)
+        prog_bar.close()
+        vreader.close(close_all_windows = self.display_enabled)
+        for each_output in output_list:
+            each_output.close(join_segments = not interrupted)
+        if existing_reader is not None:
+            existing_reader.close(close_all_windows = False)
+        if use_checkpoints and not interrupted:
+            remove_checkpoint(checkpoint_path)
+
+        output_stats_list = []
+        for each_output, each_manifest_path in zip(output_list, manifest_path_list):
+
+            # Check that the output file actually matches what we wrote (only reads metadata, so this is quick)
+            recording_ok, verify_issues_list = each_output.verify()
+            if interrupted and use_checkpoints:
+                recording_ok, verify_issues_list = False, ["Interrupted (will resume from checkpoint on re-run)"]
+            elif not recording_ok:
+                self._print("", "WARNING: Output verification failed! ({})".format(each_output.vwriter.save_name),
+                            *["  {}".format(each_issue) for each_issue in verify_issues_list])
+
+            # Hand off (good & complete) intermediate recordings for compression in the background
+            # -> Interrupted recordings are left in staging, since compressing them would publish a partial output
+            if self._transcoder is not None and recording_ok and not interrupted:
+                self._transcoder.submit_recorder(each_output.vwriter)
+
+            # Move finished recordings out of staging (intermediates are published once they've been compressed)
+            # -> Bad recordings are left in staging, so they can't replace a good output from an earlier run
+            if self._transcoder is None and not interrupted:
+                if recording_ok:
+                    each_output.publish()
+                elif each_output.vwriter.uses_staging:
+                    verify_issues_list = [*verify_issues_list,
+                                          "Not published, left in staging: {}".format(each_output.vwriter.save_path)]
+
+            output_stats_list.append({"save_path": each_output.save_path,
+                                      "recorded_path": each_output.vwriter.save_path,
+                                      "timelapse_factor": each_output.timelapse_factor,
+                                      "scale_factor": each_output.scale_factor,
+                                      "recording_fps": each_output.recording_fps,
+                                      "frames_written": each_output.frames_written,
+                                      "manifest_path": each_manifest_path,
+                                      "ok": recording_ok,
+                                      "issues": verify_issues_list})
+
+        # Report ingest progress vs. background compression progress
+        if self._transcoder is not None:
+            self._print("Ingested: {}/{}  |  Background compression: {}".format(1 + file_index, num_files,
+                                                                              self._transcoder.progress_string()))
+
+        file_stats_dict = {"source_path": full_file_path,
+                           "source_frames": 1 + source_idx if frame_source == "decode" else video_frames,
+                           "frame_source": frame_source,
+                           "input_identity": input_identity,
+                           "outputs": output_stats_list,
+                           "duplicate_of": None,
+                           "derived_from": derived_from_path,
+                           "degraded": degraded_list,
+                           "interrupted": interrupted,
+                           "process_time_sec": perf_counter() - t_start}
+
+        # Record manifests for finished outputs (intermediates get them once they've been compressed)
+        if self._transcoder is None:
+            self._write_manifests(file_stats_dict)
+
+        return file_stats_dict
+
+    # .................................................................................................................
+
+    def _check_reusable(self, source_path, input_identity, manifest_path_list, t_start):
+
+        # Look for a usable manifest for every output, either in the output folder or from earlier in this run
+        # -> Manifests are named by the input contents & settings, so earlier copies of the input have the same name
+        output_path_list, duplicate_of_set = [], set()
+        for each_spec, each_manifest_path in zip(self.output_spec_list, manifest_path_list):
+            output_settings = self._get_output_settings(each_spec)
+            run_manifest_path = self._run_manifest_lut.get(os.path.basename(each_manifest_path))
+            for each_path in [each_manifest_path, run_manifest_path]:
+                if each_path is None:
+                    continue
+                output_path, duplicate_of_path = check_manifest(each_path, source_path, input_identity,
+                                                                output_settings, self._engine_version)
+                if output_path is not None:
+                    break
+            if output_path is None:
+                return None
+            output_path_list.append(output_path)
+            duplicate_of_set.add(duplicate_of_path)
+
+        output_stats_list = [{"save_path": each_path,
+                              "recorded_path": each_path,
+                              "timelapse_factor": each_spec["timelapse_factor"],
+                              "scale_factor": each_spec["scale_factor"],
+                              "recording_fps": None,
+                              "frames_written": None,
+                              "manifest_path": each_manifest_path,
+                              "ok": True,
+                              "issues": []}
+                             for each_path, each_spec, each_manifest_path
+                             in zip(output_path_list, self.output_spec_list, manifest_path_list)]
+
+        # Report a duplicate if any of the outputs came from a differently named copy of the input
+        duplicate_of_set.discard(None)
+        file_stats_dict = {"source_path": source_path,
+                           "source_frames": None,
+                           "frame_source": "reused",
+                           "input_identity": input_identity,
+                           "outputs": output_stats_list,
+                           "duplicate_of": min(duplicate_of_set) if len(duplicate_of_set) > 0 else None,
+                           "derived_from": None,
+                           "degraded": [],
+                           "interrupted": False,
+                           "process_time_sec": perf_counter() - t_start}
+
+        return file_stats_dict
+
+    # .................................................................................................................
+
+    def _write_manifests(self, file_stats_dict):
+
+        # Only record outputs that were actually made (and verified) during this run
+        if file_stats_dict["frame_source"] == "reused" or file_stats_dict["interrupted"]:
+            return
+
+        # Outputs made with cheaper settings are marked in their manifests, so they're never mistaken for
+        # full quality outputs (i.e. later runs will re-process these videos)
+        source_path = file_stats_dict["source_path"]
+        input_identity = file_stats_dict["input_identity"]
+        degraded_list = file_stats_dict["degraded"]
+        for each_spec, each_output_stats in zip(self.output_spec_list, file_stats_dict["outputs"]):
+            if not each_output_stats["ok"]:
+                continue
+            manifest_path = each_output_stats["manifest_path"]
+            output_settings = self._get_output_settings(each_spec)
+            if len(degraded_list) > 0:
+                output_settings["degraded"] = degraded_list
+            write_manifest(manifest_path, source_path, input_identity, output_settings,
+                           self._engine_version, each_output_stats["save_path"], each_output_stats["frames_written"],
+                           file_stats_dict["derived_from"])
+            self._run_manifest_lut[os.path.basename(manifest_path)] = manifest_path
+
+    # .................................................................................................................
+
+    def _get_output_settings(self, output_spec):
+
+        # Every setting that affects the contents of a single output (used to check if outputs can be re-used)
+        output_settings_dict = {"rotation_n90": self.rotation_n90 % 4,
+                                "target_fps": float(self.target_fps),
+                                "timelapse_factor": float(output_spec["timelapse_factor"]),
+                                "scale_factor": float(output_spec["scale_factor"]),
+                                "codec": output_spec["codec"],
+                                "recording_ext": output_spec["recording_ext"]}
+
+        return output_settings_dict
+
+    # .................................................................................................................
+
+    def _get_checkpoint_key(self, source_path):
+
+        # Checkpoints can only be used if the source & every setting affecting the outputs are unchanged
+        file_stats = os.stat(source_path)
+        key_dict = {"source_path": os.path.realpath(source_path),
+                    "mtime_ns": file_stats.st_mtime_ns,
+                    "size": file_stats.st_size,
+                    "rotation_n90": self.rotation_n90,
+                    "target_fps": self.target_fps,
+                    "intermediate_codec": self.intermediate_codec,
+                    "output_spec_list": self.output_spec_list}
+        key_str = json.dumps(key_dict, sort_keys = True)
+
+        return hashlib.sha1(key_str.encode("utf-8")).hexdigest()
+
+    # .................................................................................................................
+
+    def _print(self, *print_strs):
+        if self.verbose:
+            print(*print_strs, sep = "\n")
+
+    # .................................................................................................................
+
+    def _make_progress_bar(self, total):
+        if self.progress_bar_func is None:
+            return _No_Progress_Bar()
+        return self.progress_bar_func(total = total)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+class _No_Progress_Bar:
+
+    ''' Stand-in for a progress bar object, used when running without progress feedback '''
+
+    def update(self, *args, **kwargs): return None
+    def reset(self, *args, **kwargs): return None
+    def set_description(self, *args, **kwargs): return None
+    def close(self, *args, **kwargs): return None
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def get_rotation_mapping(frame_width, frame_height, rot_nx90 = 1):
+
+    left_to_right_count = np.arange(0, frame_width, dtype=np.float32)
+    top_to_bot_count = np.arange(0, frame_height, dtype=np.float32)
+
+    lr_mesh, tb_mesh = np.meshgrid(left_to_right_count, top_to_bot_count)
+
+    x_mapping = np.rot90(lr_mesh, rot_nx90)
+    y_mapping = np.rot90(tb_mesh, rot_nx90)
+
+    return x_mapping, y_mapping
+
+# .....................................................................................................................
+
+def no_decimal_string_format(number_for_string):
+
+    # Split number into integer and decimal parts
+    int_part = int(number_for_string)
+    dec_part = int(round(100 * (number_for_string - int_part)))
+
+    # Build string components
+    int_only_str = str(int_part)
+    dec_str = str(dec_part).zfill(2)
+    with_dec_str = "{}p{}".format(int_only_str, dec_str)
+
+    # Decide which string format to output
+    contains_decimal = (dec_part > 0)
+    formatted_number_string = with_dec_str if contains_decimal else int_only_str
+
+    return formatted_number_string
+
+# .....................................................................................................................
+
+def parse_no_decimal_string(number_string):
+
+    # Reverse of the no-decimal string formatting (e.g. "4p50" -> 4.5)
+    int_str, _, dec_str = number_string.partition("p")
+
+    return float("{}.{}".format(int_str, dec_str)) if dec_str else float(int_str)
+
+# .....................................................................................................................
+
+def build_folder_naming(rotation_angle_deg, tl_factor, scale_factor):
+
+    # For readability, figure out which modifications we're making
+    needs_rotating = abs(rotation_angle_deg) > 0
+    needs_resizing = abs(scale_factor - 1.0) > 0.001
+    needs_timelapsing =  abs(tl_factor - 1.0) > 0.001
+
+    # Get rotation string
+    rotation_name = "Rot0deg"
+    if needs_rotating:
+        rot_str = no_decimal_string_format(rotation_angle_deg)
+        rotation_name = "Rot{}deg".format(rot_str)
+
+    # Get scaling string
+    scaling_name = "Scale100pct"
+    if needs_resizing:
+        scale_pct = int(round(100 * scale_factor))
+        scale_str = no_decimal_string_format(scale_pct)
+        scaling_name = "Scale{}pct".format(scale_str)
+
+    # Get timelapse string
+    timelapse_name = "TLx1"
+    if needs_timelapsing:
+        timelapse_str = no_decimal_string_format(tl_factor)
+        timelapse_name = "TLx{}".format(timelapse_str)
+
+    # Build folder name for saving video(s)
+    folder_name = "-".join(filter(None, [rotation_name, timelapse_name, scaling_name]))
+
+    return folder_name, timelapse_name
+
+# .....................................................................................................................
+
+def parse_folder_name(folder_name):
+
+    '''
+    Function which recovers the rotation/timelapse/scaling settings from a saved folder name
+    (e.g. "Rot90deg-TLx4-Scale100pct"). Returns None for folders that don't follow the naming convention
+    Outputs:
+        rotation_deg, timelapse_factor, scaling_factor
+    '''
+
+    try:
+        rotation_name, timelapse_name, scaling_name = folder_name.split("-")
+        if not (rotation_name.startswith("Rot") and rotation_name.endswith("deg")):
+            return None
+        if not (timelapse_name.startswith("TLx") and scaling_name.startswith("Scale") and scaling_name.endswith("pct")):
+            return None
+        rotation_deg = parse_no_decimal_string(rotation_name[3:-3])
+        timelapse_factor = parse_no_decimal_string(timelapse_name[3:])
+        scaling_factor = parse_no_decimal_string(scaling_name[5:-3]) / 100
+
+    except ValueError:
+        return None
+
+    return rotation_deg, timelapse_factor, scaling_factor
+
+# .....................................................................................................................
+
+def find_derivable_output(source_folder_path, source_name_only, save_path_list, rotation_deg, scale_factor,
+                          source_frames, source_fps, source_WH, effective_tl_factor_list,
+                          source_path, input_identity_dict, engine_version):
+
+    '''
+    Function which searches for previous outputs (from the same source video) that the requested output(s) can be
+    derived from, which is much cheaper than decoding the original video again. An existing output can be used if
+    it has the same rotation, a larger (or equal) scale and contains every frame that the new timelapse(s) need.
+    Existing outputs must also have a manifest showing they were made from the current source contents, so a
+    replaced video never picks up frames from outputs of the old one. Outputs that were themselves derived are
+    skipped, so quality loss from re-encoding doesn't build up over several generations. Outputs made with cheaper
+    (deadline) settings are skipped too, so their lower quality is never passed on to outputs marked as full quality.
+    Outputs:
+        existing_output_path,
+        source_indices (list of source frame indices that are needed),
+        row_indices (list of frame indices to keep from the existing output)
+        (or None, None, None if nothing suitable is found)
+    '''
+
+    # Figure out which source frames the requested output(s) need
+    needed_indices = get_union_sample_indices(source_frames, effective_tl_factor_list)
+    if len(needed_indices) == 0:
+        return None, None, None
+
+    # Figure out the (rotated) source frame size, used to check existing output sizing
+    rot_width, rot_height = source_WH if (rotation_deg % 180) == 0 else source_WH[::-1]
+
+    # Check every sibling folder that follows our folder naming convention
+    candidate_list = []
+    for each_folder_name in sorted(os.listdir(source_folder_path)):
+
+        each_folder_path = os.path.join(source_folder_path, each_folder_name)
+        folder_settings = parse_folder_name(each_folder_name)
+        if folder_settings is None or not os.path.isdir(each_folder_path):
+            continue
+
+        # Skip anything with different rotation or a smaller scale than we need
+        existing_rotation, existing_tl, existing_scale = folder_settings
+        if existing_rotation != rotation_deg or existing_scale < (scale_factor - 0.001):
+            continue
+
+        # Look for the matching output file in the folder (skipping leftover intermediate files)
+        existing_prefix = "{}_{}".format(source_name_only, each_folder_name.split("-")[1])
+        for each_file_name in sorted(os.listdir(each_folder_path)):
+            existing_name_only, _ = os.path.splitext(each_file_name)
+            existing_path = os.path.join(each_folder_path, each_file_name)
+            if existing_name_only != existing_prefix or existing_path in save_path_list:
+                continue
+
+            # Make sure the existing file was made (directly) from this source, with compatible settings
+            existing_settings = check_derive_source(existing_path, source_path, input_identity_dict, engine_version)
+            if existing_settings is None:
+                continue
+            same_rotation = (existing_settings.get("rotation_n90") == (rotation_deg // 90))
+            enough_scale = (existing_settings.get("scale_factor", 0) >= (scale_factor - 0.001))
+            if not (same_rotation and enough_scale):
+                continue
+
+            # Check the existing file info, without decoding anything
+            try:
+                existing_info = Video_Reader(existing_path, close_immediately = True).info()
+            except FileNotFoundError:
+                continue
+            if existing_info["fps"] <= 0 or existing_info["total_frames"] < 1:
+                continue
+
+            # Make sure the existing file has the sizing we expect, given it's folder settings
+            expected_width = int(round(rot_width * existing_scale))
+            expected_height = int(round(rot_height * existing_scale))
+            if abs(existing_info["width"] - expected_width) > 1 or abs(existing_info["height"] - expected_height) > 1:
+                continue
+
+            # Figure out which source frames are in the existing output (& make sure it has the frames we need)
+            existing_tl_factor = (source_fps * existing_tl) / existing_info["fps"]
+            existing_indices = get_timelapse_sample_indices(source_frames, existing_tl_factor)
+            if len(existing_indices) != existing_info["total_frames"]:
+                continue
+            row_indices = np.searchsorted(existing_indices, needed_indices)
+            row_indices = np.clip(row_indices, 0, len(existing_indices) - 1)
+            if not np.array_equal(existing_indices[row_indices], needed_indices):
+                continue
+
+            # Record the relative decoding cost of this candidate, so we can choose the cheapest one
+            decode_cost = existing_info["total_frames"] * existing_info["width"] * existing_info["height"]
+            candidate_list.append((decode_cost, existing_path, row_indices.tolist()))
+
+    # Bail if nothing worked
+    if len(candidate_list) == 0:
+        return None, None, None
+
+    _, existing_output_path, row_indices = min(candidate_list, key = lambda candidate: candidate[0])
+
+    return existing_output_path, needed_indices.tolist(), row_indices
+
+# .....................................................................................................................
+
+def read_derived_frames(existing_reader, source_indices, row_indices):
+
+    # Generator which decodes only the frames we need out of an existing output video
+    row_to_source_lut = dict(zip(row_indices, source_indices))
+    row_idx = -1
+    while True:
+
+        req_break = existing_reader.no_decode_read()
+        if req_break:
+            break
+
+        row_idx += 1
+        if row_idx in row_to_source_lut:
+            req_break, frame = existing_reader.decode_read()
+            if req_break:
+                break
+            yield row_to_source_lut[row_idx], frame
+
+# .....................................................................................................................
+
+def check_keyframe_sampling(frame_index, timelapse_factor_list):
+
+    '''
+    Function which checks if only decoding keyframes would help for a video. This requires a frame index &
+    every output must skip (on average) at least one keyframe interval per recorded frame, otherwise
+    jumping between keyframes costs more than just decoding everything
+    '''
+
+    if frame_index is None or len(timelapse_factor_list) == 0:
+        return False
+
+    mean_keyframe_interval = frame_index.total_frames / max(1, len(frame_index.keyframe_indices))
+
+    return min(timelapse_factor_list) >= mean_keyframe_interval
+
+# .....................................................................................................................
+
+def record_to_outputs(output_list, sample_flags, rotated_frame, display_window):
+
+    # Record the frame to every output that sampled it
+    display_frame = None
+    for each_output, each_sampled in zip(output_list, sample_flags):
+        if each_sampled:
+            scaled_frame = each_output.write(rotated_frame)
+            display_frame = scaled_frame if display_frame is None else display_frame
+
+    # Display the first recorded output
+    if display_frame is not None:
+        win_exists = display_window.imshow(display_frame)
+        if win_exists:
+            cv2.waitKey(1)
+
+# .....................................................................................................................
+
+def get_rotated_WH(frame_WH, rotation_n90):
+
+    # Swap the width/height for 'sideways' rotations
+    frame_width, frame_height = frame_WH
+    is_sideways = (int(rotation_n90) % 2) == 1
+
+    return (frame_height, frame_width) if is_sideways else (frame_width, frame_height)
+
+# .....................................................................................................................
+
+def parse_output_spec(spec_string, default_codec = "avc1", default_ext = ".mp4"):
+
+    '''
+    Function which converts an output spec string of the form "timelapse:scale[:codec[:ext]]"
+    (e.g. "12:1.0" or "60:0.25:XVID:.avi") into a dictionary of output settings
+    '''
+
+    spec_parts = [each_part.strip() for each_part in spec_string.split(":")]
+    if not (2 <= len(spec_parts) <= 4):
+        raise ValueError("Bad output spec: {} (expecting timelapse:scale[:codec[:ext]])".format(spec_string))
+
+    # Fill in missing codec/extension entries with defaults
+    spec_parts += [None] * (4 - len(spec_parts))
+    tl_str, scale_str, codec, recording_ext = spec_parts
+    codec = default_codec if not codec else codec
+    recording_ext = default_ext if not recording_ext else recording_ext
+
+    output_spec_dict = {"timelapse_factor": float(tl_str),
+                        "scale_factor": float(scale_str),
+                        "codec": codec if len(codec) == 4 else codec[0:4].zfill(4),
+                        "recording_ext": recording_ext if recording_ext[0] == "." else "." + recording_ext}
+
+    return output_spec_dict
+
+# .....................................................................................................................
+
+def get_engine_version():
+    # Outputs depend on the OpenCV version as well (e.g. encoder/resizing changes), so include it in the version
+    return "{}/opencv-{}".format(ENGINE_VERSION, cv2.__version__)
+
+# .....................................................................................................................
+
+def get_segment_path(recording_path, segment_index):
+    recording_path_only, recording_ext = os.path.splitext(recording_path)
+    return "{}.seg{:03d}{}".format(recording_path_only, segment_index, recording_ext)
+
+# .....................................................................................................................
+
+def get_checkpoint_path(first_save_path, source_name_only):
+    # Checkpoints are stored (hidden) alongside the first output
+    return os.path.join(os.path.dirname(first_save_path), ".{}.checkpoint.json".format(source_name_only))
+
+# .....................................................................................................................
+
+def save_checkpoint(checkpoint_path, checkpoint_key, completed_idx, output_list):
+
+    '''
+    Function which records processing progress, so it can be resumed later.
+    Every output is split into a new segment first, so all recorded frames are in finished (readable) files
+    '''
+
+    for each_output in output_list:
+        each_output.roll_segment()
+
+    checkpoint_dict = {"checkpoint_key": checkpoint_key,
+                       "source_idx": completed_idx,
+                       "output_states": [each_output.get_state() for each_output in output_list]}
+
+    # Write to a temporary file first, so a crash mid-write can't corrupt the previous checkpoint
+    temp_path = "{}.tmp".format(checkpoint_path)
+    with open(temp_path, "w") as out_file:
+        json.dump(checkpoint_dict, out_file, indent = 2)
+    os.replace(temp_path, checkpoint_path)
+
+# .....................................................................................................................
+
+def load_checkpoint(checkpoint_path, checkpoint_key, output_list):
+
+    '''
+    Function which loads a checkpoint, if one exists for the same source & settings,
+    and all of it's recorded segments are intact. Unusable checkpoints (and segments) are removed
+    Returns:
+        checkpoint_dict (or None if there is no usable checkpoint)
+    '''
+
+    if not os.path.exists(checkpoint_path):
+        return None
+
+    try:
+        with open(checkpoint_path, "r") as in_file:
+            checkpoint_dict = json.load(in_file)
+    except (ValueError, OSError):
+        checkpoint_dict = {}
+
+    # Make sure the checkpoint belongs to this job & every segment still matches what was recorded
+    checkpoint_ok = (checkpoint_dict.get("checkpoint_key") == checkpoint_key
+                     and len(checkpoint_dict.get("output_states", [])) == len(output_list))
+    segment_list = [(each_path, each_frames, each_output)
+                    for each_state, each_output in zip(checkpoint_dict.get("output_states", []), output_list)
+                    for each_path, each_frames in each_state["segment_list"]]
+    for each_path, each_frames, each_output in segment_list:
+        if not checkpoint_ok:
+            break
+        checkpoint_ok, _ = verify_recording(each_path, each_frames, each_output.output_WH, each_output.recording_fps)
+    if checkpoint_ok:
+        return checkpoint_dict
+
+    # Clear out anything left over from the unusable checkpoint, since we'll be starting over
+    # -> Only segments belonging to the current outputs are removed, to avoid deleting anything unexpected
+    for each_path, _, each_output in segment_list:
+        segment_prefix, _ = os.path.splitext(each_output.vwriter.save_path)
+        if each_path.startswith(segment_prefix) and os.path.exists(each_path):
+            os.remove(each_path)
+    remove_checkpoint(checkpoint_path)
+
+    return None
+
+# .....................................................................................................................
+
+def remove_checkpoint(checkpoint_path):
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+# .....................................................................................................................
+
+def is_source_video(file_path):
+
+    # Decide if a file found by searching (rather than listed explicitly) is a video that should be processed
+    is_intermediate = ".intermediate." in os.path.basename(file_path)
+    is_saved_output = parse_folder_name(os.path.basename(os.path.dirname(file_path))) is not None
+
+    return get_video_source_type(file_path)["file"] and not (is_intermediate or is_saved_output)
+
+# .....................................................................................................................
+
+def get_input_root(input_list):
+
+    '''
+    Function which finds the folder containing every input (files, folders or glob patterns, as with
+    find_video_files(...)). Used to keep the folder layout of the inputs when saving to an output root.
+    Returns None if there's no common folder (e.g. inputs on different drives)
+    '''
+
+    root_folder_list = []
+    for each_input in input_list:
+        each_input = os.path.expanduser(each_input)
+
+        # Glob patterns are rooted at the last folder before any wildcards
+        if glob.has_magic(each_input):
+            path_part_list = each_input.split(os.sep)
+            num_plain_parts = next(idx for idx, each_part in enumerate(path_part_list) if glob.has_magic(each_part))
+            root_folder = os.sep.join(path_part_list[:num_plain_parts]) or (os.sep if num_plain_parts > 0 else ".")
+        else:
+            root_folder = each_input if os.path.isdir(each_input) else (os.path.dirname(each_input) or ".")
+        root_folder_list.append(os.path.realpath(root_folder))
+
+    try:
+        return os.path.commonpath(root_folder_list) if len(root_folder_list) > 0 else None
+    except ValueError:
+        return None
+
+# .....................................................................................................................
+
+def find_video_files(input_list, recursive = True):
+
+    '''
+    Function which expands a list of file paths, glob patterns (e.g. "~/videos/*.mp4") and folders
+    into a list of video files. Folders are searched for any known video file type, skipping over
+    folders of previously saved outputs (e.g. "Rot90deg-TLx4-Scale100pct") and intermediate recordings.
+    Explicitly listed files are always included, regardless of extension.
+    Outputs:
+        video_path_list (sorted within each input, without duplicates)
+    '''
+
+    video_path_list = []
+    for each_input in input_list:
+        each_input = os.path.expanduser(each_input)
+
+        # Search folders for videos, pruning output folders & hidden folders as we go
+        if os.path.isdir(each_input):
+            found_list = []
+            for each_parent, each_folder_list, each_file_list in os.walk(each_input):
+                each_folder_list[:] = [each_folder for each_folder in each_folder_list
+                                       if not each_folder.startswith(".") and parse_folder_name(each_folder) is None]
+                found_list += [os.path.join(each_parent, each_file) for each_file in each_file_list
+                               if is_source_video(os.path.join(each_parent, each_file))]
+                if not recursive:
+                    break
+
+        # Expand glob patterns
+        elif glob.has_magic(each_input):
+            found_list = [each_path for each_path in glob.glob(each_input, recursive = recursive)
+                          if os.path.isfile(each_path) and is_source_video(each_path)]
+
+        # Anything else should be a path to an existing file
+        elif os.path.isfile(each_input):
+            found_list = [each_input]
+
+        else:
+            raise FileNotFoundError("Couldn't find input: {}".format(each_input))
+
+        video_path_list += sorted(found_list)
+
+    # Remove duplicates (e.g. from overlapping globs/folders), keeping the original ordering
+    unique_path_set = set()
+    unique_path_list = []
+    for each_path in video_path_list:
+        real_path = os.path.realpath(each_path)
+        if real_path not in unique_path_set:
+            unique_path_set.add(real_path)
+            unique_path_list.append(each_path)
+
+    return unique_path_list
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -12,8 +12,29 @@ Created on Wed Jan 30 15:13:27 2019
 
 import os
 import cv2
+import json
+import shutil
+import hashlib
+import numpy as np
 import datetime as dt
 
+from time import perf_counter
+from tempfile import TemporaryDirectory
+
+from local.eolib.video.frame_index import get_frame_index
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Extension/codec pairs tried when searching for a working recording setup (listed in order of preference)
+DEFAULT_CODEC_CANDIDATES = [(".mp4", "avc1"),
+                            (".mp4", "X264"),
+                            (".mkv", "X264"),
+                            (".mp4", "mp4v"),
+                            (".avi", "XVID"),
+                            (".avi", "MJPG")]
+
+
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Define classes
 
@@ -21,7 +42,8 @@ class Video_Recorder:
     
     # .................................................................................................................
     
-    def __init__(self, save_path, recording_FPS, recording_WH = None, codec="X264", enabled = True):
+    def __init__(self, save_path, recording_FPS, recording_WH = None, codec="X264", enabled = True,
+                 intermediate_codec = None, intermediate_ext = ".avi", staging_dir = None):
             
         # Store inputs
         self.save_path = save_path
@@ -30,11 +52,27 @@ class Video_Recorder:
         self.codec = codec
         self._disabled = (not enabled)
         self.video_quality = None
+        self.staging_dir = staging_dir
+        
+        # Store the final output settings, in case we record to a (cheap) intermediate file first
+        self.final_save_path = save_path
+        self.final_codec = codec
+        self.uses_intermediate = (intermediate_codec is not None)
+        if self.uses_intermediate:
+            final_path_only, _ = os.path.splitext(save_path)
+            self.save_path = "{}.intermediate{}".format(final_path_only, intermediate_ext)
+            self.codec = intermediate_codec
+        
+        # Record into a (local) staging folder if needed, the file is only moved to it's destination once finished
+        self.publish_path = self.save_path
+        self.uses_staging = (staging_dir is not None)
+        if self.uses_staging:
+            self.save_path = get_staging_path(self.publish_path, staging_dir)
     
         # Create derived variables
-        self.save_name = os.path.basename(save_path)
+        self.save_name = os.path.basename(self.save_path)
         self.save_name_only, self.save_extension = os.path.splitext(self.save_name)
-        self._fourcc = cv2.VideoWriter_fourcc(*codec)
+        self._fourcc = cv2.VideoWriter_fourcc(*self.codec)
         self.video_writer = None
         
         # Store start time
@@ -104,6 +142,42 @@ class Video_Recorder:
         
     # .................................................................................................................
     
+    def publish(self):
+        
+        '''
+        Function which moves a (closed) staged recording to it's destination, so that the finished file appears
+        all at once. Does nothing if the recording isn't staged (or nothing was recorded).
+        Returns:
+            published_path
+        '''
+        
+        if self.uses_staging and os.path.exists(self.save_path):
+            publish_file(self.save_path, self.publish_path)
+            self.save_path = self.publish_path
+            self.uses_staging = False
+        
+        return self.save_path
+        
+    # .................................................................................................................
+    
+    def verify(self, frame_count_tolerance = 0, fps_tolerance = 0.01):
+        
+        '''
+        Function which re-opens the (finished) recording to check that the file metadata matches
+        what was actually written. Only container metadata is read (no decoding), so this is fast.
+        Returns:
+            recording_ok (boolean), issues_list (list of strings)
+        '''
+        
+        # Nothing to check if we weren't recording
+        if self._disabled:
+            return True, []
+        
+        return verify_recording(self.save_path, self.frames_written, self.frameWH, self.fps,
+                                frame_count_tolerance, fps_tolerance)
+    
+    # .................................................................................................................
+    
     def set_quality(self, quality_percent):
         #raise NotImplementedError("Quality settings do not appear to work properly yet...")
         self.video_quality = quality_percent
@@ -114,6 +188,12 @@ class Video_Recorder:
         
     # .................................................................................................................
     
+    @property
+    def frames_written(self):
+        return self._frame_count
+    
+    # .................................................................................................................
+    
     def is_open(self):
         try:
             return self.video_writer.isOpened()
@@ -204,11 +284,25 @@ class Video_Recorder:
         
     # .................................................................................................................
     
-    def find_valid_codec(self):
+    def find_valid_codec(self, capabilities_cache_path = None, candidate_list = None, force_reprobe = False):
+        
+        '''
+        Function which tries making a few (tiny) videos with various codecs to see which ones work,
+        since different systems (and OpenCV builds!) may support different codecs.
+        Results are cached per OpenCV build, if a cache path is provided.
+        Returns:
+            fastest_recording_ext, fastest_codec (both None if nothing works)
+        '''
+        
+        # Always include the recorder's own settings as a candidate
+        own_candidate = (self.save_extension, self.codec)
+        candidate_list = DEFAULT_CODEC_CANDIDATES if candidate_list is None else candidate_list
+        candidate_list = [own_candidate] + [each_entry for each_entry in candidate_list if each_entry != own_candidate]
+        
+        # Probe (or load cached results) and pick out the fastest working codec
+        capability_dict = load_codec_capabilities(capabilities_cache_path, candidate_list, force_reprobe)
         
-        # Function that should try making a few videos with various codecs to see which one works
-        # (different systems may support different codecs!)
-        raise NotImplementedError("Sorry, not done yet!")
+        return find_fastest_valid_codec(capability_dict)
         
     # .................................................................................................................
         
@@ -255,7 +349,18 @@ class Video_Recorder:
 
 class Video_Reader:
     
-    def __init__(self, source_path, close_immediately = False):
+    def __init__(self, source_path, close_immediately = False, use_frame_index = False):
+        
+        '''
+        Inputs:
+            source_path -> String. Path to a video file (or an rtsp url/webcam number)
+            
+            close_immediately -> Boolean. If true, the video is closed right after reading it's info
+            
+            use_frame_index -> Boolean. If true, an exact index of frames & keyframes is loaded (or built once,
+                               by scanning the file, & saved beside it). Used for exact frame counts, which
+                               containers often get wrong, and for seeking from the nearest keyframe
+        '''
         
         # Get basic info about the video before opening
         self.video_source = source_path
@@ -287,6 +392,13 @@ class Video_Reader:
         # Get the video info
         self.video_info = get_video_object_info(self.video_object)
         
+        # Replace the (often inaccurate) container frame count with an exact count, if possible
+        self.frame_index = None
+        if use_frame_index and self.source_type("file"):
+            self.frame_index = get_frame_index(source_path)
+            if self.frame_index is not None:
+                self.video_info["total_frames"] = self.frame_index.total_frames
+        
         # Set up frame indexing variables
         self.frame_count = 0
         self.start_frame = 0
@@ -415,13 +527,23 @@ class Video_Reader:
     # .................................................................................................................
     
     def set_current_frame(self, frame_index):
-        self.video_object.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        
+        # Without an index, rely on the container for seeking (may be inexact, depending on the file)
+        if self.frame_index is None:
+            self.video_object.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            return
+        
+        # Otherwise seek to the nearest keyframe (always exact) and step forward to the target frame
+        keyframe_index = self.frame_index.get_keyframe_before(frame_index)
+        self.video_object.set(cv2.CAP_PROP_POS_FRAMES, keyframe_index)
+        for _ in range(int(frame_index) - keyframe_index):
+            self.video_object.grab()
         
     # .................................................................................................................
     
     def set_current_progress(self, progress_fraction):
         frame_index = int(round((self.total_frames - 1) * progress_fraction))
-        self.video_object.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        self.set_current_frame(frame_index)
         
     # .................................................................................................................
     
@@ -706,7 +828,7 @@ def get_video_source_type(video_source):
         full_filename = os.path.basename(video_source)
         name_only, ext = os.path.splitext(full_filename)
         
-        known_video_file_ext_list = [".avi", ".mp4", ".mpg", ".mpeg", ".mov", ".mkv", ".webm", "wmv"]
+        known_video_file_ext_list = [".avi", ".mp4", ".mpg", ".mpeg", ".mov", ".mkv", ".webm", ".wmv"]
         is_file = ext.lower() in known_video_file_ext_list
         
     # Finally set unknown flag
@@ -792,6 +914,266 @@ def get_video_rtsp_info(video_source, error_if_not_rtsp = True):
     return rtsp_info_dict
 
 # .....................................................................................................................
+
+def verify_recording(video_path, expected_frames, expected_WH, expected_fps,
+                     frame_count_tolerance = 0, fps_tolerance = 0.01):
+    
+    '''
+    Function which checks a recorded file against the number of frames, frame size and framerate
+    that were written into it. Relies on container metadata only, so costs a few milliseconds per file.
+    Inputs:
+        video_path -> String. Path to the recorded video file
+        
+        expected_frames -> Integer. Number of frames written to the file
+        
+        expected_WH -> Tuple or None. Frame size (width, height) written to the file
+        
+        expected_fps -> Float. Framerate used when recording
+        
+        frame_count_tolerance -> Integer. Allowable difference in the reported frame count
+        
+        fps_tolerance -> Float. Allowable relative difference in the reported framerate
+        
+    Outputs:
+        recording_ok (boolean), issues_list (list of strings)
+    '''
+    
+    # Bail early if there is nothing to open
+    if expected_frames < 1:
+        return False, ["No frames were written"]
+    if not os.path.exists(video_path):
+        return False, ["Missing file"]
+    if os.path.getsize(video_path) == 0:
+        return False, ["Empty file"]
+    
+    # Open the file just to read metadata
+    video_object = cv2.VideoCapture(video_path)
+    if not video_object.isOpened():
+        video_object.release()
+        return False, ["Unreadable file"]
+    file_info = get_video_object_info(video_object)
+    video_object.release()
+    
+    # Compare file metadata to what was written
+    issues_list = []
+    file_frames = file_info["total_frames"]
+    if abs(file_frames - expected_frames) > frame_count_tolerance:
+        issues_list.append("Frame count mismatch (wrote {}, file reports {})".format(expected_frames, file_frames))
+    
+    file_WH = (file_info["width"], file_info["height"])
+    if expected_WH is not None and tuple(expected_WH) != file_WH:
+        issues_list.append("Frame size mismatch (wrote {} x {}, file reports {} x {})".format(*expected_WH, *file_WH))
+    
+    file_fps = file_info["fps"]
+    if abs(file_fps - expected_fps) > (fps_tolerance * expected_fps):
+        issues_list.append("Framerate mismatch (wrote {:.3f}, file reports {:.3f})".format(expected_fps, file_fps))
+    
+    recording_ok = (len(issues_list) == 0)
+    
+    return recording_ok, issues_list
+
+# .....................................................................................................................
+
+def get_opencv_build_key():
+    
+    # Build a key which changes whenever the OpenCV build changes (codec support depends on the build!)
+    build_info_str = cv2.getBuildInformation()
+    build_hash = hashlib.md5(build_info_str.encode("utf-8")).hexdigest()[0:12]
+    
+    return "{}-{}".format(cv2.__version__, build_hash)
+
+# .....................................................................................................................
+
+def get_staging_path(final_path, staging_dir):
+    
+    # Prefix with a hash of the destination, so outputs with the same name (from different folders) don't collide
+    # -> Also means the same output always gets the same staging path, so leftovers are replaced on re-runs
+    real_path = os.path.realpath(os.path.expanduser(final_path))
+    path_hash = hashlib.sha1(real_path.encode("utf-8")).hexdigest()[:12]
+    staging_name = "{}-{}".format(path_hash, os.path.basename(real_path))
+    
+    return os.path.join(os.path.expanduser(staging_dir), staging_name)
+
+# .....................................................................................................................
+
+def publish_file(staged_path, final_path):
+    
+    '''
+    Function which moves a finished file to it's final location, such that the destination only ever holds
+    either nothing (or the previous version) or the complete file, never a partial copy.
+    Moves within a filesystem are a (atomic) rename. Otherwise the file is copied to a hidden temporary file
+    beside the destination first, which is then renamed into place.
+    '''
+    
+    final_folder, final_name = os.path.split(final_path)
+    os.makedirs(final_folder, exist_ok = True)
+    try:
+        os.replace(staged_path, final_path)
+        return final_path
+    except OSError:
+        pass
+    
+    # Different filesystems (e.g. local disk -> network storage), so copy beside the destination, then rename
+    temp_path = os.path.join(final_folder, ".{}.publishing".format(final_name))
+    try:
+        shutil.copyfile(staged_path, temp_path)
+        os.replace(temp_path, final_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.remove(staged_path)
+    
+    return final_path
+
+# .....................................................................................................................
+
+def get_codec_capability_key(recording_ext, codec):
+    return "{}/{}".format(recording_ext, codec)
+
+# .....................................................................................................................
+
+def probe_codec(recording_ext, codec, frame_WH = (160, 96), num_frames = 24, probe_fps = 30.0):
+    
+    '''
+    Function which writes a tiny synthetic clip using the given extension/codec, then re-reads it
+    to confirm that the recording actually worked (OpenCV doesn't always complain when it doesn't!)
+    Returns:
+        probe_result_dict (keys: "valid", "encode_fps", "frames_read", "error")
+    '''
+    
+    # Build a set of (moving) synthetic frames, so the encoder has something non-trivial to work on
+    frame_width, frame_height = frame_WH
+    x_ramp = np.linspace(0, 255, frame_width, dtype = np.float32)
+    y_ramp = np.linspace(0, 255, frame_height, dtype = np.float32)
+    base_frame = np.uint8((x_ramp[np.newaxis, :] + y_ramp[:, np.newaxis]) / 2)
+    synthetic_frames = [cv2.cvtColor(np.roll(base_frame, 4 * k, axis = 1), cv2.COLOR_GRAY2BGR)
+                        for k in range(num_frames)]
+    
+    # Initialize outputs
+    encode_fps = 0.0
+    frames_read = 0
+    error_msg = None
+    
+    with TemporaryDirectory() as temp_dir_path:
+        
+        probe_path = os.path.join(temp_dir_path, "codec_probe{}".format(recording_ext))
+        try:
+            # Write the synthetic clip and time the encoding
+            t_start = perf_counter()
+            fourcc = cv2.VideoWriter_fourcc(*codec)
+            video_writer = cv2.VideoWriter(probe_path, fourcc, probe_fps, frame_WH, True)
+            if not video_writer.isOpened():
+                raise IOError("Couldn't open video writer")
+            for each_frame in synthetic_frames:
+                video_writer.write(each_frame)
+            video_writer.release()
+            t_end = perf_counter()
+            encode_fps = num_frames / max(t_end - t_start, 1E-6)
+            
+            # Re-read the clip to make sure we actually recorded something sensible
+            video_reader = cv2.VideoCapture(probe_path)
+            while True:
+                received_frame, frame = video_reader.read()
+                if not received_frame:
+                    break
+                if frame.shape[0:2] != (frame_height, frame_width):
+                    raise ValueError("Bad frame size on re-read ({} x {})".format(*frame.shape[1::-1]))
+                frames_read += 1
+            video_reader.release()
+            
+            if frames_read != num_frames:
+                raise ValueError("Wrote {} frames, but re-read {}".format(num_frames, frames_read))
+            
+        except Exception as err:
+            error_msg = str(err)
+    
+    # Bundle results for caching
+    probe_result_dict = {"valid": (error_msg is None),
+                         "encode_fps": round(encode_fps, 1) if error_msg is None else 0.0,
+                         "frames_read": frames_read,
+                         "error": error_msg}
+    
+    return probe_result_dict
+
+# .....................................................................................................................
+
+def load_codec_capabilities(cache_path = None, candidate_list = None, force_reprobe = False):
+    
+    '''
+    Function which returns a capability matrix (dictionary) of extension/codec probe results
+    for the current OpenCV build. Only candidates missing from the cache are probed.
+    Inputs:
+        cache_path -> String or None. Path to a json file used to store probe results (per OpenCV build)
+        
+        candidate_list -> List of (recording_ext, codec) tuples to check. Defaults to DEFAULT_CODEC_CANDIDATES
+        
+        force_reprobe -> Boolean. If true, all candidates are re-probed, ignoring cached results
+        
+    Output:
+        capability_dict (keys: "ext/codec" strings, values: probe result dictionaries)
+    '''
+    
+    # Load existing cache data (for all OpenCV builds), if possible
+    candidate_list = DEFAULT_CODEC_CANDIDATES if candidate_list is None else candidate_list
+    all_builds_dict = {}
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r") as in_file:
+                all_builds_dict = json.load(in_file)
+        except (ValueError, OSError):
+            all_builds_dict = {}
+    
+    # Pick out the results for the current build
+    build_key = get_opencv_build_key()
+    capability_dict = {} if force_reprobe else all_builds_dict.get(build_key, {})
+    
+    # Probe anything we haven't seen before
+    need_save = False
+    for each_ext, each_codec in candidate_list:
+        capability_key = get_codec_capability_key(each_ext, each_codec)
+        if capability_key not in capability_dict:
+            capability_dict[capability_key] = probe_codec(each_ext, each_codec)
+            need_save = True
+    
+    # Save updated results, so we don't need to re-probe on the next run
+    if need_save and cache_path is not None:
+        all_builds_dict[build_key] = capability_dict
+        try:
+            with open(cache_path, "w") as out_file:
+                json.dump(all_builds_dict, out_file, indent = 2)
+        except OSError:
+            pass
+    
+    return capability_dict
+
+# .....................................................................................................................
+
+def check_codec_capability(capability_dict, recording_ext, codec):
+    
+    ''' Returns True/False if the extension/codec pair was probed, otherwise None (i.e. unknown) '''
+    
+    probe_result = capability_dict.get(get_codec_capability_key(recording_ext, codec))
+    
+    return None if probe_result is None else probe_result.get("valid", False)
+
+# .....................................................................................................................
+
+def find_fastest_valid_codec(capability_dict, recording_ext = None):
+    
+    # Sort all working codecs by their encoding speed (only for the given file type, if provided)
+    valid_entries = [(each_result.get("encode_fps", 0.0), each_key)
+                     for each_key, each_result in capability_dict.items() if each_result.get("valid", False)
+                     and (recording_ext is None or each_key.split("/")[0] == recording_ext)]
+    if len(valid_entries) == 0:
+        return None, None
+    
+    _, fastest_key = max(valid_entries)
+    fastest_ext, fastest_codec = fastest_key.split("/")
+    
+    return fastest_ext, fastest_codec
+
+# .....................................................................................................................
         
 
 # ---------------------------------------------------------------------------------------------------------------------
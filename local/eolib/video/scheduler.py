@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 13:47:02 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+
+from time import time
+from datetime import datetime, timedelta
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Cheaper settings that can be used to finish a batch by a deadline, in the order they're stepped through
+# -> "fast_resize": nearest-neighbour scaling, "fast_codec": fastest working codec for the same file type,
+#    "keyframes": only keyframes are decoded (each timelapsed frame comes from the closest keyframe before it)
+DEADLINE_STEPS_LIST = ["fast_resize", "fast_codec", "keyframes"]
+
+# Step back up to full quality once the remaining work is estimated to need less than this fraction of the time left
+# (the gap to 1.0 prevents flip-flopping between settings)
+DEADLINE_RECOVERY_FRACTION = 0.7
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Task_Scheduler:
+
+    '''
+    Class used to decide the order in which batch tasks are handed out to workers.
+    The most expensive tasks are always handed out first (so a single long video doesn't end up running alone
+    at the end of a batch), where costs are estimated from the probed video info & settings. As tasks finish,
+    the measured processing time per unit of work is tracked for each resolution class, so the estimates
+    (and the order of the remaining tasks) adapt to the actual throughput of the machine.
+
+    Example:
+        scheduler = Task_Scheduler(task_list)
+        while scheduler.num_remaining > 0:
+            task_dict = scheduler.next_task()
+            ...
+            scheduler.record_result(task_dict, process_time_sec)
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, task_list):
+
+        # Store tasks along with their (fixed) amount of work, which is converted to time using measured rates
+        self._remaining_list = [(estimate_task_work(each_task), get_task_class(each_task), each_task)
+                                for each_task in task_list]
+
+        # Allocate storage for measured throughput (total seconds & work units, per class)
+        self._class_totals_dict = {}
+        self._all_totals = [0.0, 0.0]
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Task scheduler ({} remaining, rates: {})".format(self.num_remaining, self.get_rates())
+
+    # .................................................................................................................
+
+    @property
+    def num_remaining(self):
+        return len(self._remaining_list)
+
+    # .................................................................................................................
+
+    def next_task(self):
+
+        ''' Returns the task with the longest (estimated) processing time, or None if there are no tasks left '''
+
+        if len(self._remaining_list) == 0:
+            return None
+
+        # Re-estimate with the latest throughput measurements, since rates can differ by resolution
+        longest_idx = max(range(len(self._remaining_list)),
+                          key = lambda idx: self._estimate_sec(*self._remaining_list[idx][0:2]))
+        _, _, task_dict = self._remaining_list.pop(longest_idx)
+
+        return task_dict
+
+    # .................................................................................................................
+
+    def add_tasks(self, task_list):
+        # Add (or put back) tasks to be handed out
+        self._remaining_list += [(estimate_task_work(each_task), get_task_class(each_task), each_task)
+                                 for each_task in task_list]
+
+    # .................................................................................................................
+
+    def peek_tasks(self, num_tasks = 1):
+
+        ''' Returns (without removing) the tasks that would be handed out next, in the order they'd be handed out '''
+
+        sorted_list = sorted(self._remaining_list, key = lambda entry: -self._estimate_sec(*entry[0:2]))
+
+        return [each_task for _, _, each_task in sorted_list[:num_tasks]]
+
+    # .................................................................................................................
+
+    def record_result(self, task_dict, process_time_sec):
+
+        ''' Function used to record how long a task actually took, which updates the throughput estimates '''
+
+        task_work = estimate_task_work(task_dict)
+        if task_work <= 0 or process_time_sec <= 0:
+            return
+
+        class_totals = self._class_totals_dict.setdefault(get_task_class(task_dict), [0.0, 0.0])
+        for each_totals in (class_totals, self._all_totals):
+            each_totals[0] += process_time_sec
+            each_totals[1] += task_work
+
+    # .................................................................................................................
+
+    def estimate_remaining_sec(self, num_workers = 1):
+
+        ''' Rough estimate of the time needed to finish all remaining tasks (or None if nothing was measured) '''
+
+        if self._all_totals[1] <= 0:
+            return None
+        total_sec = sum(self._estimate_sec(each_work, each_class) for each_work, each_class, _ in self._remaining_list)
+
+        return total_sec / max(1, num_workers)
+
+    # .................................................................................................................
+
+    def get_rates(self):
+        # Measured processing time per unit of work, for each class of task
+        return {each_class: (each_sec / each_work) for each_class, (each_sec, each_work)
+                in self._class_totals_dict.items()}
+
+    # .................................................................................................................
+
+    def _estimate_sec(self, task_work, task_class):
+
+        # Use the rate measured for tasks of the same class, falling back to the overall rate (or just the work)
+        total_sec, total_work = self._class_totals_dict.get(task_class, self._all_totals)
+        if total_work <= 0:
+            total_sec, total_work = self._all_totals
+        if total_work <= 0:
+            return task_work
+
+        return task_work * (total_sec / total_work)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+class Deadline_Tracker:
+
+    '''
+    Class used to decide how much quality to give up so that a batch finishes by a deadline.
+    Each time work is handed out, the estimated time needed for the remaining tasks is compared to the time left.
+    When falling behind, the next (cheaper) step from the allowed list is switched on, one step per update.
+    Steps are switched back off (again one at a time) once the batch is comfortably ahead of schedule.
+
+    Example:
+        deadline_tracker = Deadline_Tracker(parse_deadline("17:30"), ["fast_resize", "keyframes"])
+        if deadline_tracker.update(scheduler.estimate_remaining_sec(num_workers)):
+            print("Now using: {}".format(deadline_tracker.degrade_list))
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, deadline_timestamp, allowed_steps_list = DEADLINE_STEPS_LIST):
+
+        # Store inputs, with steps always applied in the same (cheapest-quality-loss first) order
+        self.deadline_timestamp = deadline_timestamp
+        self.allowed_steps_list = [each_step for each_step in DEADLINE_STEPS_LIST if each_step in allowed_steps_list]
+
+        # Number of allowed steps currently in use
+        self.level = 0
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Deadline tracker ({:.0f} sec left, using: {})".format(self.time_left_sec, self.degrade_list)
+
+    # .................................................................................................................
+
+    @property
+    def time_left_sec(self):
+        return self.deadline_timestamp - time()
+
+    # .................................................................................................................
+
+    @property
+    def degrade_list(self):
+        return self.allowed_steps_list[:self.level]
+
+    # .................................................................................................................
+
+    def update(self, estimated_remaining_sec):
+
+        '''
+        Function used to adjust the settings level, given the estimated (wall) time to finish the remaining work.
+        The estimate can be None (e.g. nothing measured yet), in which case the level is only raised if the
+        deadline has already passed. Returns True if the level changed
+        '''
+
+        time_left_sec = self.time_left_sec
+        max_level = len(self.allowed_steps_list)
+        new_level = self.level
+        if time_left_sec <= 0:
+            new_level = max_level
+        elif estimated_remaining_sec is None:
+            pass
+        elif estimated_remaining_sec > time_left_sec:
+            new_level = min(max_level, self.level + 1)
+        elif estimated_remaining_sec < (time_left_sec * DEADLINE_RECOVERY_FRACTION):
+            new_level = max(0, self.level - 1)
+
+        level_changed = (new_level != self.level)
+        self.level = new_level
+
+        return level_changed
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def estimate_task_work(task_dict):
+
+    '''
+    Function which estimates the amount of work needed to process a task, in units of megapixels.
+    Every source frame is decoded, while only the timelapsed frames of each output are resized & encoded
+    '''
+
+    # Fall back to the file size if there's no probe info (e.g. tasks that weren't probed)
+    probe_dict = task_dict.get("probe")
+    if probe_dict is None or not probe_dict["ok"]:
+        try:
+            return os.path.getsize(task_dict["source_path"]) / 1.0E6
+        except OSError:
+            return 0.0
+
+    total_frames = probe_dict["total_frames"]
+    frame_width, frame_height = probe_dict["WH"]
+    source_mpix = (frame_width * frame_height) / 1.0E6
+    decode_work = total_frames * source_mpix
+
+    # Add encoding work for each output (timelapse reduces the frame count, scaling reduces the frame size)
+    settings_dict = task_dict["settings"]
+    encode_work = 0.0
+    for each_spec in settings_dict["output_spec_list"]:
+        timelapse_fps = probe_dict["fps"] * each_spec["timelapse_factor"]
+        recording_fps = min(settings_dict["target_fps"], timelapse_fps)
+        effective_tl_factor = (timelapse_fps / recording_fps) if recording_fps > 0 else 1.0
+        encode_work += (total_frames / effective_tl_factor) * source_mpix * (each_spec["scale_factor"] ** 2)
+
+    return decode_work + encode_work
+
+# .....................................................................................................................
+
+def parse_deadline(finish_by_str, current_datetime = None):
+
+    '''
+    Function which converts a deadline string into a (unix) timestamp.
+    Deadlines can be given as "YYYY-MM-DD HH:MM" or just "HH:MM", which means the next time the clock reads
+    that time (i.e. later today, or tomorrow if that time has already passed).
+    Raises a ValueError if the string isn't in either format
+    '''
+
+    current_datetime = datetime.now() if current_datetime is None else current_datetime
+    finish_by_str = str(finish_by_str).strip()
+    try:
+        return datetime.strptime(finish_by_str, "%Y-%m-%d %H:%M").timestamp()
+    except ValueError:
+        pass
+
+    try:
+        clock_time = datetime.strptime(finish_by_str, "%H:%M").time()
+    except ValueError:
+        raise ValueError("Bad deadline: {} (use 'HH:MM' or 'YYYY-MM-DD HH:MM')".format(finish_by_str))
+
+    deadline_datetime = datetime.combine(current_datetime.date(), clock_time)
+    if deadline_datetime <= current_datetime:
+        deadline_datetime += timedelta(days = 1)
+
+    return deadline_datetime.timestamp()
+
+# .....................................................................................................................
+
+def get_task_class(task_dict):
+
+    # Group tasks by source resolution, since decoding rates (per pixel) vary a lot with resolution
+    probe_dict = task_dict.get("probe")
+    if probe_dict is None or not probe_dict["ok"]:
+        return "unknown"
+
+    return "{}p".format(probe_dict["WH"][1])
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 11:02:48 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import json
+import socket
+import hashlib
+import threading
+
+from time import time, strftime
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Leases that haven't been renewed for this long are considered abandoned (e.g. the node crashed)
+DEFAULT_LEASE_SEC = 120.0
+
+# Number of times each lease is renewed within the lease time, so a few slow renewals don't lose the lease
+LEASE_RENEWALS_PER_PERIOD = 4
+
+# Queue folder entries for each task (named using the task key)
+LEASE_EXT = ".lease"
+DONE_EXT = ".done"
+FAILED_EXT = ".failed"
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Lease_Queue:
+
+    '''
+    Class used to share a batch of tasks between several processes (possibly on different machines), using
+    files in a shared folder. Before running a task, a node claims it by creating a lease file, which only one
+    node can do (files are created exclusively). Leases are renewed in the background while tasks run, so leases
+    left behind by crashed nodes go stale and can be taken over by other nodes. Finished (or failed) tasks are
+    marked with a file in the queue folder, so no node runs them again.
+
+    Example:
+        work_queue = Lease_Queue("/mnt/shared/job_queue")
+        for each_task in task_list:
+            if work_queue.claim(each_task["task_key"], each_task["source_path"]) == "claimed":
+                (process the task)
+                work_queue.finish(each_task["task_key"], "done")
+        work_queue.close()
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, queue_dir, lease_sec = DEFAULT_LEASE_SEC, node_name = None):
+
+        '''
+        Inputs:
+            queue_dir -> String. Folder shared by every node working on the batch (created if missing)
+
+            lease_sec -> Float. Time after which a lease that hasn't been renewed can be taken over by another node.
+                         Node clocks must agree to well within this time
+
+            node_name -> String or None. Name recorded in lease & marker files. Defaults to hostname-pid
+        '''
+
+        # Store inputs
+        self.queue_dir = os.path.expanduser(queue_dir)
+        self.lease_sec = lease_sec
+        self.node_name = node_name if node_name is not None else "{}-{}".format(socket.gethostname(), os.getpid())
+
+        # Allocate storage for the leases held by this node
+        self._lock = threading.Lock()
+        self._held_key_set = set()
+
+        # Keep held leases fresh in the background
+        os.makedirs(self.queue_dir, exist_ok = True)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target = self._renew_leases, name = "lease_renewal", daemon = True)
+        self._thread.start()
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Lease queue ({} held by {}): {}".format(len(self._held_key_set), self.node_name, self.queue_dir)
+
+    # .................................................................................................................
+
+    def claim(self, task_key, source_path = None):
+
+        '''
+        Function which tries to claim a task for this node
+        Returns:
+            claim_status -> One of: "claimed" (this node should run the task), "done" or "failed" (already run
+                            by some node), "leased" (another node is running it)
+        '''
+
+        marker_status = self.check_finished(task_key)
+        if marker_status is not None:
+            return marker_status
+
+        # Try to create the lease, taking over an abandoned lease if needed (but only once)
+        lease_path = self._get_path(task_key, LEASE_EXT)
+        lease_dict = {"node": self.node_name, "source_path": source_path, "claimed": strftime("%Y-%m-%d %H:%M:%S")}
+        for _ in range(2):
+            try:
+                lease_fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if not self._break_stale_lease(lease_path):
+                    return "leased"
+                continue
+            with os.fdopen(lease_fd, "w") as out_file:
+                json.dump(lease_dict, out_file)
+
+            # Another node may have finished the task between our check & creating the lease
+            marker_status = self.check_finished(task_key)
+            if marker_status is not None:
+                os.remove(lease_path)
+                return marker_status
+
+            with self._lock:
+                self._held_key_set.add(task_key)
+            return "claimed"
+
+        return "leased"
+
+    # .................................................................................................................
+
+    def finish(self, task_key, status, info_dict = None):
+
+        '''
+        Function used to record the outcome of a claimed task & release it's lease.
+        Tasks that were "done" or "failed" get a marker file, so they aren't run again.
+        Any other status (e.g. "interrupted") only releases the lease, so another node can pick it up
+        '''
+
+        if status in {"done", "failed"}:
+            marker_ext = DONE_EXT if status == "done" else FAILED_EXT
+            marker_dict = {"node": self.node_name, "status": status, "timestamp": strftime("%Y-%m-%d %H:%M:%S"),
+                           **({} if info_dict is None else info_dict)}
+            _write_json_atomic(self._get_path(task_key, marker_ext), marker_dict, self.node_name)
+
+        self.release(task_key)
+
+    # .................................................................................................................
+
+    def release(self, task_key):
+
+        ''' Gives up a lease held by this node, without marking the task as finished '''
+
+        with self._lock:
+            if task_key not in self._held_key_set:
+                return
+            self._held_key_set.discard(task_key)
+
+        try:
+            os.remove(self._get_path(task_key, LEASE_EXT))
+        except FileNotFoundError:
+            pass
+
+    # .................................................................................................................
+
+    def check_finished(self, task_key):
+
+        ''' Returns "done" or "failed" if a node has already run the task, otherwise None '''
+
+        for each_ext, each_status in [(DONE_EXT, "done"), (FAILED_EXT, "failed")]:
+            if os.path.exists(self._get_path(task_key, each_ext)):
+                return each_status
+
+        return None
+
+    # .................................................................................................................
+
+    def close(self):
+
+        ''' Stops renewing leases & releases any that are still held (e.g. after being interrupted) '''
+
+        self._stop_event.set()
+        self._thread.join()
+        with self._lock:
+            held_key_list = list(self._held_key_set)
+        for each_key in held_key_list:
+            self.release(each_key)
+
+    # .................................................................................................................
+
+    def _get_path(self, task_key, file_ext):
+        return os.path.join(self.queue_dir, "{}{}".format(task_key, file_ext))
+
+    # .................................................................................................................
+
+    def _break_stale_lease(self, lease_path):
+
+        # Returns True if the lease is gone (so claiming can be retried), False if it's still held
+        try:
+            lease_age_sec = time() - os.stat(lease_path).st_mtime
+        except FileNotFoundError:
+            return True
+        if lease_age_sec < self.lease_sec:
+            return False
+
+        # Move the lease out of the way first, since only one node can succeed at renaming it
+        stale_path = "{}.stale-{}".format(lease_path, self.node_name)
+        try:
+            os.rename(lease_path, stale_path)
+        except FileNotFoundError:
+            return True
+
+        # Another node may have replaced the stale lease just before we renamed it, in which case we put it back
+        if (time() - os.stat(stale_path).st_mtime) < self.lease_sec:
+            os.rename(stale_path, lease_path)
+            return False
+        os.remove(stale_path)
+
+        return True
+
+    # .................................................................................................................
+
+    def _renew_leases(self):
+
+        # Touch every held lease periodically, so other nodes can tell that we're still working on them
+        renew_period_sec = self.lease_sec / LEASE_RENEWALS_PER_PERIOD
+        while not self._stop_event.wait(renew_period_sec):
+            with self._lock:
+                held_key_list = list(self._held_key_set)
+            for each_key in held_key_list:
+                try:
+                    os.utime(self._get_path(each_key, LEASE_EXT))
+                except FileNotFoundError:
+                    pass
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def parse_shard(shard_str):
+
+    '''
+    Function which interprets a shard given as "i/N" (e.g. "2/4" is the 2nd of 4 shards)
+    Returns:
+        shard_number, num_shards (shard numbers run from 1 to N)
+    Raises a ValueError for badly formatted or out-of-range shards
+    '''
+
+    try:
+        number_str, count_str = str(shard_str).split("/")
+        shard_number, num_shards = int(number_str), int(count_str)
+    except ValueError:
+        raise ValueError("Bad shard: {} (use 'i/N', e.g. 2/4)".format(shard_str))
+
+    if num_shards < 1 or not (1 <= shard_number <= num_shards):
+        raise ValueError("Bad shard: {} (need 1 <= i <= N)".format(shard_str))
+
+    return shard_number, num_shards
+
+# .....................................................................................................................
+
+def get_shard_number(source_path, num_shards):
+
+    '''
+    Function which assigns a video to one of N shards, using a stable hash of it's (real) path.
+    Every machine gets the same answer as long as the videos are mounted at the same path
+    '''
+
+    real_path = os.path.realpath(os.path.expanduser(source_path))
+    path_hash = hashlib.sha1(real_path.encode("utf-8")).hexdigest()
+
+    return 1 + (int(path_hash, 16) % num_shards)
+
+# .....................................................................................................................
+
+def _write_json_atomic(file_path, data_dict, writer_name):
+
+    # Write to a temporary file first (named per writer, in case several nodes write at once), then rename
+    temp_path = "{}.tmp-{}".format(file_path, writer_name)
+    with open(temp_path, "w") as out_file:
+        json.dump(data_dict, out_file, indent = 2)
+    os.replace(temp_path, file_path)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
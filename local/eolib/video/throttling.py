@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 09:41:26 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import math
+
+from time import perf_counter, process_time, sleep
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Process priority used in low-impact mode (19 is the lowest priority on unix systems)
+LOW_IMPACT_NICENESS = 19
+
+# Fraction of the machine always left free for other processes, when the machine is busy
+LOAD_HEADROOM_FRACTION = 0.1
+
+# Processing never slows to less than this fraction of the budget, so jobs always make progress
+MIN_BUDGET_FRACTION = 0.1
+
+# Maximum amount of unused budget (in seconds) that can be saved up, which limits bursts after idle periods
+MAX_BURST_SEC = 1.0
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Resource_Governor:
+
+    '''
+    Class used to keep processing within a CPU & disk I/O budget, by pausing whenever usage gets ahead of
+    the budget (so it acts as a framerate governor when called once per frame). The CPU budget is also reduced
+    automatically while other processes are keeping the machine busy, so processing backs off under load.
+    Budgets are given for a whole job, which may be split across several processes using the share input.
+
+    Example:
+        governor = Resource_Governor(cpu_budget_pct = 25, io_budget_mbps = 50)
+        governor.start()
+        while ...:
+            (process a frame)
+            governor.throttle(bytes_per_frame)
+        usage_dict = governor.get_usage_stats()
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, cpu_budget_pct = None, io_budget_mbps = None, share = 1.0, adjust_to_load = True,
+                 check_interval_sec = 0.25):
+
+        '''
+        Inputs:
+            cpu_budget_pct -> Float or None. Maximum CPU usage of the job, as a percentage of the whole machine
+                              (e.g. 25 on an 8 core machine allows 2 cores). None disables CPU throttling
+
+            io_budget_mbps -> Float or None. Maximum disk read + write rate of the job, in MB/s.
+                              None disables I/O throttling
+
+            share -> Float. Fraction of the budgets used by this process (e.g. 1/N for one of N workers)
+
+            adjust_to_load -> Boolean. If true, the CPU budget is reduced while other processes are busy
+                              (needs /proc/stat, so only works on linux)
+
+            check_interval_sec -> Float. Minimum time between usage checks
+        '''
+
+        # Store inputs
+        self.cpu_budget_pct = cpu_budget_pct
+        self.io_budget_mbps = io_budget_mbps
+        self.share = share
+        self.adjust_to_load = adjust_to_load
+        self.check_interval_sec = check_interval_sec
+
+        # Convert budgets to per-process rates (cores & bytes per second)
+        self.num_cpus = os.cpu_count()
+        self._cpu_budget_cores = None
+        if cpu_budget_pct is not None:
+            self._cpu_budget_cores = (cpu_budget_pct / 100.0) * self.num_cpus * share
+        self._io_budget_bps = None if io_budget_mbps is None else io_budget_mbps * 1.0E6 * share
+
+        # Allocate storage for usage tracking
+        self.start()
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Resource governor (CPU: {}%, I/O: {} MB/s, share: {:.2f})".format(self.cpu_budget_pct,
+                                                                                    self.io_budget_mbps, self.share)
+
+    # .................................................................................................................
+
+    @property
+    def enabled(self):
+        return (self._cpu_budget_cores is not None) or (self._io_budget_bps is not None)
+
+    # .................................................................................................................
+
+    def start(self):
+
+        ''' Resets usage tracking (budgets are measured from the last call to this function) '''
+
+        self._t_start = perf_counter()
+        self._t_last_check = self._t_start
+        self._cpu_start = process_time()
+        self._cpu_last = self._cpu_start
+        self._io_start = _read_process_io_bytes()
+        self._io_last = self._io_start
+        self._estimated_io_bytes = 0
+
+        # Usage 'debt' (positive means we're ahead of the budget & need to pause), in seconds
+        self._cpu_debt_sec = 0.0
+        self._io_debt_sec = 0.0
+        self.throttled_sec = 0.0
+
+        # Load tracking, used to reduce the CPU budget when the machine is busy
+        self._machine_busy_last = _read_machine_busy_sec()
+        self._other_busy_cores = 0.0
+        self._current_cpu_cores = self._cpu_budget_cores
+
+    # .................................................................................................................
+
+    def throttle(self, estimated_io_bytes = 0):
+
+        '''
+        Function which should be called regularly (e.g. once per frame) while processing. Pauses if usage has
+        gotten ahead of the budget. The estimated I/O is only used if actual process I/O can't be measured
+        Returns:
+            paused_sec
+        '''
+
+        self._estimated_io_bytes += estimated_io_bytes
+        if not self.enabled:
+            return 0.0
+
+        # Only check usage periodically, since reading usage counters isn't free
+        t_now = perf_counter()
+        dt_sec = t_now - self._t_last_check
+        if dt_sec < self.check_interval_sec:
+            return 0.0
+        self._t_last_check = t_now
+
+        # Measure usage since the last check
+        cpu_now = process_time()
+        cpu_used_sec = cpu_now - self._cpu_last
+        self._cpu_last = cpu_now
+        io_used_bytes = self._measure_io_bytes()
+
+        # Back off the CPU budget when other processes are keeping the machine busy
+        if self._cpu_budget_cores is not None:
+            self._update_load(cpu_used_sec, dt_sec)
+            self._cpu_debt_sec = self._update_debt(self._cpu_debt_sec, cpu_used_sec, self._current_cpu_cores, dt_sec)
+        if self._io_budget_bps is not None:
+            self._io_debt_sec = self._update_debt(self._io_debt_sec, io_used_bytes, self._io_budget_bps, dt_sec)
+
+        # Pause long enough to get back within both budgets
+        paused_sec = max(self._cpu_debt_sec, self._io_debt_sec, 0.0)
+        if paused_sec > 0:
+            sleep(paused_sec)
+            self.throttled_sec += paused_sec
+            self._cpu_debt_sec -= paused_sec
+            self._io_debt_sec -= paused_sec
+            self._t_last_check = perf_counter()
+
+        return paused_sec
+
+    # .................................................................................................................
+
+    def get_usage_stats(self):
+
+        '''
+        Function which reports actual usage (since start) vs. the budget
+        Returns:
+            usage_dict (keys: "cpu_budget_pct", "cpu_used_pct", "io_budget_mbps", "io_used_mbps", "cpu_sec",
+                        "io_bytes", "wall_sec", "throttled_sec", "share")
+        '''
+
+        wall_sec = max(perf_counter() - self._t_start, 1.0E-6)
+        cpu_sec = process_time() - self._cpu_start
+        io_now = _read_process_io_bytes()
+        io_bytes = self._estimated_io_bytes if (io_now is None or self._io_start is None) else io_now - self._io_start
+
+        usage_dict = {"cpu_budget_pct": self.cpu_budget_pct,
+                      "cpu_used_pct": 100.0 * cpu_sec / (wall_sec * self.num_cpus * self.share),
+                      "io_budget_mbps": self.io_budget_mbps,
+                      "io_used_mbps": io_bytes / (wall_sec * 1.0E6 * self.share),
+                      "cpu_sec": cpu_sec,
+                      "io_bytes": io_bytes,
+                      "wall_sec": wall_sec,
+                      "throttled_sec": self.throttled_sec,
+                      "share": self.share}
+
+        return usage_dict
+
+    # .................................................................................................................
+
+    def _measure_io_bytes(self):
+
+        # Use actual process I/O if possible, otherwise fall back to the estimates we were given
+        io_now = _read_process_io_bytes()
+        if io_now is None or self._io_last is None:
+            io_used_bytes = self._estimated_io_bytes
+            self._estimated_io_bytes = 0
+            return io_used_bytes
+
+        io_used_bytes = io_now - self._io_last
+        self._io_last = io_now
+
+        return io_used_bytes
+
+    # .................................................................................................................
+
+    def _update_load(self, cpu_used_sec, dt_sec):
+
+        # Figure out how busy the rest of the machine is (assuming all processes sharing the budget are similar)
+        machine_busy_now = _read_machine_busy_sec()
+        if not self.adjust_to_load or machine_busy_now is None or self._machine_busy_last is None:
+            return
+        machine_busy_cores = (machine_busy_now - self._machine_busy_last) / dt_sec
+        self._machine_busy_last = machine_busy_now
+        job_busy_cores = (cpu_used_sec / dt_sec) / self.share
+        other_busy_cores = max(0.0, machine_busy_cores - job_busy_cores)
+
+        # Smooth out the measurement, so we don't jump around from one check to the next
+        self._other_busy_cores = 0.7 * self._other_busy_cores + 0.3 * other_busy_cores
+
+        # Only use what's left over by other processes (keeping some headroom), up to the budget
+        job_budget_cores = self._cpu_budget_cores / self.share
+        free_cores = self.num_cpus * (1.0 - LOAD_HEADROOM_FRACTION) - self._other_busy_cores
+        job_cores = min(job_budget_cores, max(MIN_BUDGET_FRACTION * job_budget_cores, free_cores))
+        self._current_cpu_cores = job_cores * self.share
+
+    # .................................................................................................................
+
+    def _update_debt(self, debt_sec, amount_used, budget_rate, dt_sec):
+
+        # Usage adds to the debt, while elapsed time pays it off. Unused budget can only be saved up a little
+        new_debt_sec = debt_sec + (amount_used / budget_rate) - dt_sec
+
+        return max(new_debt_sec, -MAX_BURST_SEC)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def set_low_impact_priority(niceness = LOW_IMPACT_NICENESS, cpu_budget_pct = None):
+
+    '''
+    Function which lowers the priority of the current process, so other services get the CPU (& disk, for
+    schedulers that follow CPU priority) first. If a CPU budget is given, the process is also kept to the
+    last (highest numbered) cores, only using as many cores as the budget allows
+    '''
+
+    try:
+        os.nice(niceness)
+    except (AttributeError, OSError):
+        pass
+
+    if cpu_budget_pct is None or not hasattr(os, "sched_setaffinity"):
+        return
+
+    try:
+        available_cpus = sorted(os.sched_getaffinity(0))
+        num_allowed = max(1, math.ceil(len(available_cpus) * cpu_budget_pct / 100.0))
+        os.sched_setaffinity(0, available_cpus[-num_allowed:])
+    except OSError:
+        pass
+
+# .....................................................................................................................
+
+def combine_usage_stats(usage_list, wall_sec, cpu_budget_pct = None, io_budget_mbps = None):
+
+    '''
+    Function which combines usage stats from several processes (see Resource_Governor.get_usage_stats(...))
+    into a single report for a job, over the given (total) wall time
+    '''
+
+    wall_sec = max(wall_sec, 1.0E-6)
+    total_cpu_sec = sum(each_usage["cpu_sec"] for each_usage in usage_list)
+    total_io_bytes = sum(each_usage["io_bytes"] for each_usage in usage_list)
+
+    usage_dict = {"cpu_budget_pct": cpu_budget_pct,
+                  "cpu_used_pct": 100.0 * total_cpu_sec / (wall_sec * os.cpu_count()),
+                  "io_budget_mbps": io_budget_mbps,
+                  "io_used_mbps": total_io_bytes / (wall_sec * 1.0E6),
+                  "cpu_sec": total_cpu_sec,
+                  "io_bytes": total_io_bytes,
+                  "wall_sec": wall_sec,
+                  "throttled_sec": sum(each_usage["throttled_sec"] for each_usage in usage_list),
+                  "share": 1.0}
+
+    return usage_dict
+
+# .....................................................................................................................
+
+def format_usage_report(usage_dict):
+
+    ''' Function which builds (printable) lines comparing actual usage with the budget '''
+
+    def budget_str(value, units): return "no limit" if value is None else "{:.1f}{}".format(value, units)
+
+    return ["CPU usage: {:.1f}% (budget: {})".format(usage_dict["cpu_used_pct"],
+                                                     budget_str(usage_dict["cpu_budget_pct"], "%")),
+            "I/O rate: {:.1f} MB/s (budget: {})".format(usage_dict["io_used_mbps"],
+                                                        budget_str(usage_dict["io_budget_mbps"], " MB/s")),
+            "Time spent throttled: {:.1f} sec".format(usage_dict["throttled_sec"])]
+
+# .....................................................................................................................
+
+def _read_process_io_bytes():
+
+    # Read total disk I/O (reads + writes that actually hit storage) for this process. Only works on linux
+    try:
+        with open("/proc/self/io", "r") as in_file:
+            io_dict = dict(each_line.split(":") for each_line in in_file.read().splitlines() if ":" in each_line)
+        return int(io_dict["read_bytes"]) + int(io_dict["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+# .....................................................................................................................
+
+def _read_machine_busy_sec():
+
+    # Read the total (non-idle) CPU time used by the whole machine, in seconds. Only works on linux
+    try:
+        with open("/proc/stat", "r") as in_file:
+            cpu_times = [int(each_value) for each_value in in_file.readline().split()[1:]]
+        idle_ticks = cpu_times[3] + (cpu_times[4] if len(cpu_times) > 4 else 0)
+        return (sum(cpu_times[0:8]) - idle_ticks) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError, AttributeError):
+        return None
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
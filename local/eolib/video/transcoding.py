@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import cv2
+import shutil
+import subprocess
+
+from tempfile import TemporaryDirectory
+from concurrent.futures import ProcessPoolExecutor
+
+from local.eolib.video.read_write import Video_Recorder, verify_recording
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Background_Transcoder:
+
+    '''
+    Class used to compress (cheap) intermediate recordings into their final codec using a pool of
+    low-priority background processes. Intermediate files are deleted once the final output is verified.
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, num_workers = 2, niceness = 19, delete_intermediates = True):
+
+        # Store inputs
+        self.num_workers = max(1, int(num_workers))
+        self.niceness = niceness
+        self.delete_intermediates = delete_intermediates
+
+        # Allocate storage for tracking queued/finished work
+        self._future_list = []
+        self.results_list = []
+
+        # Start up the worker pool
+        self._executor = ProcessPoolExecutor(max_workers = self.num_workers,
+                                             initializer = _lower_worker_priority,
+                                             initargs = (self.niceness,))
+
+    # .................................................................................................................
+
+    def __repr__(self):
+        return "Background compression: {}".format(self.progress_string())
+
+    # .................................................................................................................
+
+    def submit(self, intermediate_path, final_save_path, final_codec, staging_dir = None):
+
+        new_future = self._executor.submit(transcode_video, intermediate_path, final_save_path, final_codec,
+                                           self.delete_intermediates, staging_dir)
+        self._future_list.append(new_future)
+
+        return new_future
+
+    # .................................................................................................................
+
+    def submit_recorder(self, video_recorder):
+
+        ''' Helper used to queue up the intermediate recording from a (closed) Video_Recorder object '''
+
+        if not video_recorder.uses_intermediate:
+            raise TypeError("Recorder is not using an intermediate file! ({})".format(video_recorder.save_path))
+
+        return self.submit(video_recorder.save_path, video_recorder.final_save_path, video_recorder.final_codec,
+                           video_recorder.staging_dir)
+
+    # .................................................................................................................
+
+    def progress(self):
+
+        ''' Returns: num_finished, num_running, num_queued '''
+
+        num_finished = sum(1 for each_future in self._future_list if each_future.done())
+        num_running = sum(1 for each_future in self._future_list if each_future.running())
+        num_queued = len(self._future_list) - num_finished - num_running
+
+        return num_finished, num_running, num_queued
+
+    # .................................................................................................................
+
+    def progress_string(self):
+        num_finished, num_running, num_queued = self.progress()
+        total_submitted = len(self._future_list)
+        return "{}/{} done ({} running, {} queued)".format(num_finished, total_submitted, num_running, num_queued)
+
+    # .................................................................................................................
+
+    def wait_for_all(self, progress_bar_func = None):
+
+        '''
+        Blocks until all queued transcodes are done, then shuts down the worker pool.
+        Inputs:
+            progress_bar_func -> Function or None. If provided, called as progress_bar_func(total = N)
+                                 and must return an object with update() & close() methods (e.g. tqdm)
+        Outputs:
+            results_list (list of result dictionaries, see transcode_video(...))
+        '''
+
+        # Set up progress feedback, if needed
+        num_finished, _, _ = self.progress()
+        prog_bar = None
+        if progress_bar_func is not None:
+            prog_bar = progress_bar_func(total = len(self._future_list))
+            prog_bar.update(num_finished)
+
+        # Collect results, in submission order
+        results_list = []
+        for each_future in self._future_list:
+            was_done = each_future.done()
+            try:
+                results_list.append(each_future.result())
+            except Exception as err:
+                results_list.append({"intermediate_path": None, "save_path": None, "frames_written": 0,
+                                     "ok": False, "issues": ["Transcoding error: {}".format(err)]})
+            if prog_bar is not None and not was_done:
+                prog_bar.update()
+
+        # Clean up
+        if prog_bar is not None:
+            prog_bar.close()
+        self._executor.shutdown(wait = True)
+        self.results_list = results_list
+
+        return results_list
+
+    # .................................................................................................................
+
+    def cancel(self):
+
+        ''' Cancels any work that hasn't started yet (running transcodes are allowed to finish) '''
+
+        for each_future in self._future_list:
+            each_future.cancel()
+        self._executor.shutdown(wait = True)
+
+    # .................................................................................................................
+
+
+# =====================================================================================================================
+# =====================================================================================================================
+# =====================================================================================================================
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def _lower_worker_priority(niceness):
+
+    # Lower process priority, so background compression doesn't slow down the main processing loop
+    try:
+        os.nice(niceness)
+    except (AttributeError, OSError):
+        pass
+
+    # Keep each worker to a single OpenCV thread, the pool itself provides the parallelism
+    cv2.setNumThreads(1)
+
+# .....................................................................................................................
+
+def transcode_video(intermediate_path, final_save_path, final_codec, delete_intermediate = True, staging_dir = None):
+
+    '''
+    Function which re-encodes a video into a new codec/container, without any other modifications.
+    The intermediate file is only deleted if the final recording passes verification.
+    If a staging folder is given, the final recording is made there & only published to it's destination if it
+    passes verification (otherwise it's left in the staging folder).
+    Returns:
+        result_dict (keys: "intermediate_path", "save_path", "frames_written", "ok", "issues")
+    '''
+
+    # Open the intermediate file
+    video_object = cv2.VideoCapture(intermediate_path)
+    if not video_object.isOpened():
+        return {"intermediate_path": intermediate_path, "save_path": final_save_path, "frames_written": 0,
+                "ok": False, "issues": ["Couldn't open intermediate file"]}
+    intermediate_fps = video_object.get(cv2.CAP_PROP_FPS)
+
+    # Copy every frame into the final recording
+    vwriter = Video_Recorder(final_save_path, intermediate_fps, None, codec = final_codec, enabled = True,
+                             staging_dir = staging_dir)
+    while True:
+        received_frame, frame = video_object.read()
+        if not received_frame:
+            break
+        vwriter.write(frame)
+    video_object.release()
+    vwriter.close()
+
+    # Only publish the final output & remove the intermediate once we know the final output is good
+    recording_ok, issues_list = vwriter.verify()
+    if recording_ok:
+        vwriter.publish()
+    elif vwriter.uses_staging:
+        issues_list = [*issues_list, "Not published, left in staging: {}".format(vwriter.save_path)]
+    if recording_ok and delete_intermediate:
+        os.remove(intermediate_path)
+
+    result_dict = {"intermediate_path": intermediate_path,
+                   "save_path": final_save_path,
+                   "frames_written": vwriter.frames_written,
+                   "ok": recording_ok,
+                   "issues": issues_list}
+
+    return result_dict
+
+# .....................................................................................................................
+
+def join_videos(input_path_list, joined_path, codec, expected_WH, fps):
+
+    '''
+    Function which joins several videos (with matching sizing/codec/framerate) into a single video, in order.
+    Uses ffmpeg (if installed) to join without re-encoding, otherwise frames are copied over using OpenCV.
+    Returns:
+        joined_ok (boolean), num_frames (total frames in the joined video)
+    '''
+
+    # Count up the frames we should end up with
+    num_frames = 0
+    for each_path in input_path_list:
+        video_object = cv2.VideoCapture(each_path)
+        num_frames += int(video_object.get(cv2.CAP_PROP_FRAME_COUNT))
+        video_object.release()
+
+    # Try a (lossless & fast) ffmpeg join first
+    if _join_videos_ffmpeg(input_path_list, joined_path):
+        joined_ok, _ = verify_recording(joined_path, num_frames, expected_WH, fps)
+        if joined_ok:
+            return True, num_frames
+
+    # Fall back to re-encoding every frame
+    vwriter = Video_Recorder(joined_path, fps, expected_WH, codec = codec, enabled = True)
+    for each_path in input_path_list:
+        video_object = cv2.VideoCapture(each_path)
+        while True:
+            received_frame, frame = video_object.read()
+            if not received_frame:
+                break
+            vwriter.write(frame)
+        video_object.release()
+    vwriter.close()
+
+    joined_ok, _ = vwriter.verify()
+
+    return joined_ok, vwriter.frames_written
+
+# .....................................................................................................................
+
+def _join_videos_ffmpeg(input_path_list, joined_path):
+
+    # Can't do anything if ffmpeg isn't available
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path is None:
+        return False
+
+    # Use the concat 'demuxer', which copies the (compressed) video data without re-encoding
+    with TemporaryDirectory() as temp_dir:
+        list_path = os.path.join(temp_dir, "join_list.txt")
+        with open(list_path, "w") as out_file:
+            for each_path in input_path_list:
+                safe_path = os.path.realpath(each_path).replace("'", "'\\''")
+                out_file.write("file '{}'\n".format(safe_path))
+        ffmpeg_command_list = [ffmpeg_path, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                               "-i", list_path, "-c", "copy", joined_path]
+        try:
+            ffmpeg_result = subprocess.run(ffmpeg_command_list, stdout = subprocess.DEVNULL,
+                                           stderr = subprocess.DEVNULL)
+        except OSError:
+            return False
+
+    return ffmpeg_result.returncode == 0
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 10:12:37 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import cv2
+import json
+import platform
+
+from time import perf_counter, strftime
+from tempfile import TemporaryDirectory
+from concurrent.futures import ProcessPoolExecutor
+
+from local.eolib.video.windowing import SimpleWindow
+from local.eolib.video.read_write import Video_Reader, get_opencv_build_key, get_codec_capability_key
+from local.eolib.video.scheduler import estimate_task_work
+from local.eolib.video.processing import Timelapse_Output, get_rotation_mapping, get_rotated_WH, record_to_outputs
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Global settings
+
+# Amount of (source) video processed by each worker in a single calibration trial
+DEFAULT_TRIAL_SEC = 10.0
+
+# Maximum number of videos from each class used for trials (workers cycle through these)
+MAX_SAMPLES_PER_CLASS = 4
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def get_tuning_class(task_dict):
+
+    '''
+    Function which groups batch tasks by the properties that most affect the best worker/thread configuration,
+    which are the source resolution & codec (e.g. "1080p/h264")
+    '''
+
+    probe_dict = task_dict.get("probe")
+    if probe_dict is None or not probe_dict["ok"]:
+        return "unknown"
+
+    return "{}p/{}".format(probe_dict["WH"][1], probe_dict.get("codec", "unknown"))
+
+# .....................................................................................................................
+
+def get_machine_key():
+    # The best configuration depends on the machine (& OpenCV build), so results are stored separately for each
+    return "{}/{}cpu/{}".format(platform.node(), os.cpu_count(), get_opencv_build_key())
+
+# .....................................................................................................................
+
+def get_candidate_configs(num_cpus = None):
+
+    '''
+    Function which lists the (workers, OpenCV threads per worker) pairs worth trying on a machine.
+    Both are stepped in powers of 2, without using more threads in total than there are cpus
+    Returns:
+        candidate_list (list of (num_workers, num_threads) tuples, ordered by workers then threads)
+    '''
+
+    num_cpus = max(1, os.cpu_count() if num_cpus is None else num_cpus)
+
+    # Always include the full cpu count as a worker option, even if it isn't a power of 2
+    worker_options = sorted({2 ** k for k in range(num_cpus.bit_length()) if 2 ** k <= num_cpus} | {num_cpus})
+
+    candidate_list = []
+    for each_num_workers in worker_options:
+        max_threads = max(1, num_cpus // each_num_workers)
+        thread_options = sorted({2 ** k for k in range(max_threads.bit_length()) if 2 ** k <= max_threads})
+        candidate_list += [(each_num_workers, each_num_threads) for each_num_threads in thread_options]
+
+    return candidate_list
+
+# .....................................................................................................................
+
+def select_samples(task_list, max_samples = MAX_SAMPLES_PER_CLASS):
+
+    '''
+    Function which picks out a few representative tasks of every tuning class in a batch
+    Returns:
+        samples_dict (keys: tuning classes, values: lists of task dictionaries)
+    '''
+
+    # Group tasks by class, keeping them in order of size
+    class_tasks_dict = {}
+    for each_task in sorted(task_list, key = estimate_task_work):
+        class_tasks_dict.setdefault(get_tuning_class(each_task), []).append(each_task)
+
+    # Pick evenly spaced (by size) tasks from each class
+    samples_dict = {}
+    for each_class, each_task_list in class_tasks_dict.items():
+        num_tasks = len(each_task_list)
+        num_samples = min(num_tasks, max_samples)
+        sample_indices = sorted({(each_idx * num_tasks) // num_samples for each_idx in range(num_samples)})
+        samples_dict[each_class] = [each_task_list[each_idx] for each_idx in sample_indices]
+
+    return samples_dict
+
+# .....................................................................................................................
+
+def set_opencv_threads(num_threads):
+    # Used as a worker initializer, so every worker of a pool uses the same number of OpenCV threads
+    if num_threads is not None:
+        cv2.setNumThreads(int(num_threads))
+
+# .....................................................................................................................
+
+def run_calibration_trial(task_dict, trial_sec, output_folder):
+
+    '''
+    Function which processes the start of a single video (meant to be called from a worker process),
+    using the same decode/rotate/record steps as a normal run, but without checkpoints, caching or deriving.
+    Outputs are recorded directly with their final codec, into the given (temporary) folder
+    Returns:
+        trial_stats_dict (keys: "source_frames", "outputs": list of dictionaries with keys "frames", "mpix",
+                          "bytes", "codec_key", where "mpix" is the total megapixels recorded)
+    '''
+
+    task_settings = task_dict["settings"]
+    rotation_n90 = task_settings["rotation_n90"]
+
+    # Get video info & rotation mapping
+    vreader = Video_Reader(task_dict["source_path"])
+    video_width, video_height = vreader.WH
+    max_frames = max(1, int(round(trial_sec * vreader.fps)))
+    x_map, y_map = get_rotation_mapping(video_width, video_height, rotation_n90)
+    rotated_WH = get_rotated_WH((video_width, video_height), rotation_n90)
+    needs_rotating = (rotation_n90 % 4) != 0
+
+    # Set up recording for each output
+    output_list = []
+    for each_idx, each_spec in enumerate(task_settings["output_spec_list"]):
+        save_path = os.path.join(output_folder, "trial_{}{}".format(each_idx, each_spec["recording_ext"]))
+        output_list.append(Timelapse_Output(save_path, vreader.fps, rotated_WH,
+                                            each_spec["timelapse_factor"], each_spec["scale_factor"],
+                                            task_settings["target_fps"], each_spec["codec"]))
+    disp_window = SimpleWindow("Tuning", enabled = False)
+
+    # Same recording loop as normal processing, just cut short
+    num_frames = 0
+    while num_frames < max_frames:
+        req_break = vreader.no_decode_read()
+        if req_break:
+            break
+        sample_flags = [each_output.check_sample(num_frames) for each_output in output_list]
+        num_frames += 1
+        if any(sample_flags):
+            req_break, frame = vreader.decode_read()
+            if req_break:
+                break
+            rot_frame = cv2.remap(frame, x_map, y_map, cv2.INTER_NEAREST) if needs_rotating else frame
+            record_to_outputs(output_list, sample_flags, rot_frame, disp_window)
+
+    # Clean up
+    vreader.close(close_all_windows = False)
+    for each_output in output_list:
+        each_output.close(join_segments = False)
+
+    # Record output sizes as well, which are useful for estimating disk usage
+    output_stats_list = []
+    for each_output, each_spec in zip(output_list, task_settings["output_spec_list"]):
+        output_width, output_height = each_output.output_WH
+        output_bytes = os.path.getsize(each_output.save_path) if os.path.exists(each_output.save_path) else 0
+        output_stats_list.append({"frames": each_output.frames_written,
+                                  "mpix": each_output.frames_written * output_width * output_height / 1.0E6,
+                                  "bytes": output_bytes,
+                                  "codec_key": get_codec_capability_key(each_spec["recording_ext"],
+                                                                        each_spec["codec"])})
+
+    trial_stats_dict = {"source_frames": num_frames, "outputs": output_stats_list}
+
+    return trial_stats_dict
+
+# .....................................................................................................................
+
+def measure_config(sample_task_list, num_workers, num_threads, trial_sec = DEFAULT_TRIAL_SEC):
+
+    '''
+    Function which measures the total throughput of a pool of workers, each processing one of the sample videos
+    Returns:
+        frames_per_sec (source frames processed per second, across all workers)
+    '''
+
+    trial_time_sec, trial_stats_list = run_parallel_trials(sample_task_list, num_workers, num_threads, trial_sec)
+    total_frames = sum(each_stats["source_frames"] for each_stats in trial_stats_list)
+
+    return total_frames / max(trial_time_sec, 1E-6)
+
+# .....................................................................................................................
+
+def run_parallel_trials(sample_task_list, num_workers, num_threads, trial_sec = DEFAULT_TRIAL_SEC):
+
+    '''
+    Function which runs a calibration trial on every worker of a pool at the same time (see run_calibration_trial)
+    Returns:
+        trial_time_sec (wall time for all trials to finish), trial_stats_list (one entry per worker)
+    '''
+
+    with TemporaryDirectory() as temp_dir_path:
+        with ProcessPoolExecutor(max_workers = num_workers,
+                                 initializer = set_opencv_threads, initargs = (num_threads,)) as executor:
+
+            # Make sure every worker has started up before timing anything
+            list(executor.map(set_opencv_threads, [num_threads] * num_workers))
+
+            # Every worker gets it's own sample (cycling through the samples if there are more workers)
+            t_start = perf_counter()
+            future_list = []
+            for each_idx in range(num_workers):
+                trial_folder = os.path.join(temp_dir_path, "trial_{}".format(each_idx))
+                os.makedirs(trial_folder)
+                sample_task = sample_task_list[each_idx % len(sample_task_list)]
+                future_list.append(executor.submit(run_calibration_trial, sample_task, trial_sec, trial_folder))
+            trial_stats_list = [each_future.result() for each_future in future_list]
+            t_end = perf_counter()
+
+    return (t_end - t_start), trial_stats_list
+
+# .....................................................................................................................
+
+def tune_class(sample_task_list, trial_sec = DEFAULT_TRIAL_SEC, candidate_list = None, trial_callback = None):
+
+    '''
+    Function which searches for the fastest worker/thread configuration for a set of (similar) sample videos.
+    For each worker count, thread counts are tried in increasing order until throughput stops improving
+    Inputs:
+        sample_task_list -> List. Batch task dictionaries (see Batch_Job.plan(...)) used for trials
+
+        trial_sec -> Float. Amount of source video processed by each worker in every trial
+
+        candidate_list -> List of (num_workers, num_threads) tuples or None. Defaults to get_candidate_configs()
+
+        trial_callback -> Function or None. If provided, called as trial_callback(trial_result_dict)
+                          after every trial (e.g. to print progress)
+    Returns:
+        best_result_dict (keys: "workers", "opencv_threads", "frames_per_sec", or None if no trials ran),
+        trial_results_list
+    '''
+
+    candidate_list = get_candidate_configs() if candidate_list is None else candidate_list
+
+    trial_results_list = []
+    prev_fps_per_workers = {}
+    stalled_workers_set = set()
+    for each_num_workers, each_num_threads in candidate_list:
+
+        # Skip extra threads once they've stopped helping with this many workers
+        if each_num_workers in stalled_workers_set:
+            continue
+
+        frames_per_sec = measure_config(sample_task_list, each_num_workers, each_num_threads, trial_sec)
+        trial_result_dict = {"workers": each_num_workers,
+                             "opencv_threads": each_num_threads,
+                             "frames_per_sec": round(frames_per_sec, 1)}
+        trial_results_list.append(trial_result_dict)
+        if trial_callback is not None:
+            trial_callback(trial_result_dict)
+
+        prev_fps = prev_fps_per_workers.get(each_num_workers)
+        if prev_fps is not None and frames_per_sec <= prev_fps:
+            stalled_workers_set.add(each_num_workers)
+        prev_fps_per_workers[each_num_workers] = frames_per_sec
+
+    best_result_dict = max(trial_results_list, key = lambda result: result["frames_per_sec"], default = None)
+
+    return best_result_dict, trial_results_list
+
+# .....................................................................................................................
+
+def load_machine_results(results_path):
+
+    '''
+    Function which loads saved results (e.g. from tuning) for the current machine (see save_machine_result(...))
+    Returns:
+        results_dict (keys: tuning classes, values: result dictionaries. Empty if nothing was saved)
+    '''
+
+    try:
+        with open(results_path, "r") as in_file:
+            all_machines_dict = json.load(in_file)
+    except (ValueError, OSError):
+        return {}
+
+    return all_machines_dict.get(get_machine_key(), {})
+
+# .....................................................................................................................
+
+def save_machine_result(results_path, tuning_class, result_dict):
+
+    ''' Function which records a result (e.g. the best configuration) for a class of videos, for the current machine '''
+
+    all_machines_dict = {}
+    if os.path.exists(results_path):
+        try:
+            with open(results_path, "r") as in_file:
+                all_machines_dict = json.load(in_file)
+        except (ValueError, OSError):
+            all_machines_dict = {}
+
+    machine_dict = all_machines_dict.setdefault(get_machine_key(), {})
+    machine_dict[tuning_class] = {**result_dict, "timestamp": strftime("%Y-%m-%d %H:%M:%S")}
+
+    # Write to a temporary file first, so an interruption never corrupts existing results
+    temp_path = "{}.tmp".format(results_path)
+    with open(temp_path, "w") as out_file:
+        json.dump(all_machines_dict, out_file, indent = 2)
+    os.replace(temp_path, results_path)
+
+# .....................................................................................................................
+
+def get_tuned_config(tuning_dict, task_list):
+
+    '''
+    Function which picks the saved configuration to use for a batch. Since all tasks share one worker pool,
+    the configuration of the class with the most (estimated) work is used
+    Returns:
+        tuning_class, best_result_dict (both None if no class in the batch has been tuned)
+    '''
+
+    # Total up the work of every tuned class in the batch
+    class_work_dict = {}
+    for each_task in task_list:
+        each_class = get_tuning_class(each_task)
+        if each_class in tuning_dict:
+            class_work_dict[each_class] = class_work_dict.get(each_class, 0.0) + estimate_task_work(each_task)
+
+    if len(class_work_dict) == 0:
+        return None, None
+    tuning_class = max(class_work_dict, key = class_work_dict.get)
+
+    return tuning_class, tuning_dict[tuning_class]
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:21:44 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import argparse
+import os
+import json
+
+from time import perf_counter
+
+from local.eolib.video.read_write import DEFAULT_CODEC_CANDIDATES, load_codec_capabilities
+from local.eolib.video.read_write import check_codec_capability, find_fastest_valid_codec
+from local.eolib.video.frame_cache import Frame_Cache
+from local.eolib.video.throttling import Resource_Governor, set_low_impact_priority, format_usage_report
+from local.eolib.video.catalog import Video_Catalog, probe_videos
+from local.eolib.video.processing import parse_output_spec, find_video_files, get_input_root
+from local.eolib.utils.cli_tools import cli_prompt_with_defaults
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def parse_args(settings_folder):
+    
+    # Get existing/default recording settings so we can use them as defaults for the script arguments
+    recording_settings = load_recording_settings(settings_folder)
+    default_recording_ext = recording_settings.get("recording_ext")
+    default_codec = recording_settings.get("codec")
+    default_fps = 30.0
+    
+    # Set up argument parsing
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-d", "--display", default = False, action = "store_true",
+                    help = "Enable the output display. Useful to check progress, but slows down processing.")
+    ap.add_argument("-f", "--fps", default = default_fps, type = float,
+                    help = "Target framerate of the output video. \
+                            (Default: {})".format(default_fps))
+    ap.add_argument("-x", "--extension", default = default_recording_ext, type = str,
+                    help = "File extension of recorded videos (.avi, .mp4, .mkv, etc.). \
+                            (Default: {})".format(default_recording_ext))
+    ap.add_argument("-c", "--codec", default = default_codec, type = str,
+                    help = "FourCC code used for recording (avc1, X264, XVID, MJPG, mp4v, etc.). \
+                            (Default: {})".format(default_codec))
+    ap.add_argument("-a", "--auto_codec", default = False, action = "store_true",
+                    help = "Use the fastest working extension/codec pair found by probing the OpenCV build. \
+                            Probe results are cached, so this only costs time on the first run.")
+    ap.add_argument("-i", "--intermediate", default = False, action = "store_true",
+                    help = "Record to a fast (MJPG) intermediate file first and compress to the final codec \
+                            using low-priority background workers. Speeds up processing, but uses more disk space.")
+    ap.add_argument("-w", "--compress_workers", default = 2, type = int,
+                    help = "Number of background workers used to compress intermediate files. \
+                            Only used when recording intermediates (Default: 2)")
+    ap.add_argument("--output_root", default = None, type = str,
+                    help = "Folder in which the (automatically named) output folders are created. \
+                            (Default: beside the original videos)")
+    ap.add_argument("--staging_dir", default = None, type = str,
+                    help = "Fast, local folder (e.g. tmpfs or NVMe) used while recording. Finished outputs are \
+                            then moved to their destination all at once, so partial files never show up in the \
+                            output folders & recording isn't slowed down by network storage. (Default: disabled)")
+    ap.add_argument("--prefetch_mb", default = None, type = float,
+                    help = "Read upcoming videos into memory (OS cache) in the background, up to this many MB ahead, \
+                            while the current video is processed. Avoids stalls on cold reads when each video \
+                            starts, e.g. with videos on network storage. (Default: disabled)")
+    ap.add_argument("-k", "--cache_dir", default = None, type = str,
+                    help = "Folder used to cache decoded (rotated) frames. Re-running the same video with \
+                            different scaling settings, or timelapse factors that are whole multiples of a \
+                            cached factor (e.g. 8 or 12 after 4), can then skip decoding. (Default: disabled)")
+    ap.add_argument("--cache_gb", default = 50.0, type = float,
+                    help = "Maximum size of the frame cache, in GB. Least recently used entries are removed \
+                            once the cache is full (Default: 50)")
+    ap.add_argument("--no_derive", default = False, action = "store_true",
+                    help = "Always decode the original video(s), instead of deriving new outputs from \
+                            existing (compatible) outputs saved in neighbouring folders. Derived outputs are \
+                            re-encoded from an already compressed output, so they lose some quality.")
+    ap.add_argument("--catalog", default = None, type = str,
+                    help = "Path to the video catalog (sqlite) used to store probe results, so unchanged videos \
+                            aren't re-probed on later runs. (Default: video_catalog.sqlite beside this script)")
+    ap.add_argument("--no_catalog", default = False, action = "store_true",
+                    help = "Probe every selected video, without using (or updating) the video catalog")
+    ap.add_argument("--index_frames", default = False, action = "store_true",
+                    help = "Scan each video once (without decoding) to build an index of exact frame counts & \
+                            keyframes, stored beside the video. Fixes progress/timing for videos that report \
+                            the wrong number of frames and makes resuming from checkpoints exact.")
+    ap.add_argument("--no_reuse", default = False, action = "store_true",
+                    help = "Re-process videos even if their outputs already exist with a manifest matching \
+                            the video contents & settings (e.g. from a previous run).")
+    ap.add_argument("--cpu_pct", default = None, type = float,
+                    help = "Run in low-impact mode, using at most this percentage of the machine's CPU. \
+                            Processing runs at low priority & backs off further while other processes are busy.")
+    ap.add_argument("--io_mbps", default = None, type = float,
+                    help = "Run in low-impact mode, limiting disk reads + writes to this many MB/s.")
+    ap.add_argument("-o", "--output", default = None, action = "append", type = str,
+                    help = "Output spec, given as timelapse:scale[:codec[:ext]] (e.g. 60:0.25 or 12:1:XVID:.avi). \
+                            May be given multiple times to record several outputs from a single decode of \
+                            each video. Replaces the timelapse/scaling prompts.")
+    ap.add_argument("--checkpoint_sec", default = 300.0, type = float,
+                    help = "Time (in seconds) between checkpoints while processing. Interrupted videos are resumed \
+                            from the last checkpoint when re-run with the same settings. Use 0 to disable. \
+                            (Default: 300)")
+    ap.add_argument("-r", "--rotation", default = None, type = int,
+                    help = "Number of counter-clockwise 90 degree rotations. Replaces the rotation prompt.")
+    ap.add_argument("-t", "--timelapse", default = None, type = float,
+                    help = "Timelapse factor. Replaces the timelapse prompt.")
+    ap.add_argument("-s", "--scale", default = None, type = float,
+                    help = "Dimension scaling factor. Replaces the scaling prompt.")
+    ap.add_argument("-y", "--yes", default = False, action = "store_true",
+                    help = "Never prompt for anything. Settings that aren't given as script arguments \
+                            use the previous selections. Requires input paths.")
+    ap.add_argument("inputs", nargs = "*", default = [],
+                    help = "Video files, folders or glob patterns (quoted, e.g. '~/videos/**/*.mp4') to process. \
+                            Folders are searched recursively. Replaces the file selection.")
+    
+    # Get arg inputs into a dictionary
+    args = vars(ap.parse_args())
+    
+    # Separate arg inputs for convenience
+    arg_display = args.get("display")
+    arg_fps = args.get("fps")
+    arg_codec = args.get("codec")
+    arg_ext = args.get("extension")
+    arg_auto_codec = args.get("auto_codec")
+    arg_intermediate = args.get("intermediate")
+    arg_compress_workers = args.get("compress_workers")
+    arg_output_root = args.get("output_root")
+    arg_staging_dir = args.get("staging_dir")
+    arg_prefetch_mb = args.get("prefetch_mb")
+    arg_cache_dir = args.get("cache_dir")
+    arg_cache_gb = args.get("cache_gb")
+    arg_derive = not args.get("no_derive")
+    arg_reuse = not args.get("no_reuse")
+    arg_index_frames = args.get("index_frames")
+    arg_cpu_pct = args.get("cpu_pct")
+    arg_io_mbps = args.get("io_mbps")
+    arg_catalog = args.get("catalog")
+    arg_no_catalog = args.get("no_catalog")
+    arg_output_specs = args.get("output")
+    arg_checkpoint_sec = args.get("checkpoint_sec")
+    arg_rotation = args.get("rotation")
+    arg_timelapse = args.get("timelapse")
+    arg_scale = args.get("scale")
+    arg_yes = args.get("yes")
+    arg_inputs = args.get("inputs")
+    
+    # Catch conflicting/incomplete arguments before doing any work
+    if arg_output_specs is not None and (arg_timelapse is not None or arg_scale is not None):
+        ap.error("Can't use timelapse/scale arguments along with output specs (-o)")
+    if arg_yes and len(arg_inputs) == 0:
+        ap.error("Input paths are required when not prompting (--yes)")
+    if arg_cpu_pct is not None and not (0 < arg_cpu_pct <= 100):
+        ap.error("CPU budget must be greater than 0 and at most 100 (%)")
+    if arg_io_mbps is not None and arg_io_mbps <= 0:
+        ap.error("I/O budget must be positive")
+    if arg_prefetch_mb is not None and arg_prefetch_mb <= 0:
+        ap.error("Prefetch budget must be positive")
+    for each_folder in [arg_output_root, arg_staging_dir]:
+        if each_folder is not None and os.path.isfile(os.path.expanduser(each_folder)):
+            ap.error("Output root & staging folders can't be files ({})".format(each_folder))
+    
+    # Find all of the input videos, if provided
+    input_path_list, input_root = None, None
+    if len(arg_inputs) > 0:
+        try:
+            input_path_list = find_video_files(arg_inputs, recursive = True)
+        except FileNotFoundError as err:
+            ap.error(str(err))
+        if len(input_path_list) == 0:
+            ap.error("No videos found in inputs: {}".format(" ".join(arg_inputs)))
+        input_root = get_input_root(arg_inputs)
+    
+    # Make sure the recording arguments are 'safe' (i.e. extension starts with a . and the codec has 4 characters)
+    safe_ext = arg_ext if arg_ext[0] == "." else "." + arg_ext
+    safe_codec = arg_codec if len(arg_codec) == 4 else arg_codec[0:4].zfill(4)
+    
+    # Check if recording arguments are different from defaults
+    ext_changed = (safe_ext != default_recording_ext)
+    codec_changed = (safe_codec != default_codec)
+    update_recording_settings = (ext_changed or codec_changed)
+    
+    # Save recording settings (but only if the arguments were different from defaults!)
+    save_recording_settings(settings_folder, safe_ext, safe_codec, overwrite_existing = update_recording_settings)
+    
+    # Check that the recording settings actually work (or find the fastest settings, if needed)
+    safe_ext, safe_codec = select_working_codec(settings_folder, safe_ext, safe_codec, arg_auto_codec)
+    
+    # Set up frame caching, if enabled
+    frame_cache = Frame_Cache(arg_cache_dir, arg_cache_gb) if arg_cache_dir is not None else None
+    
+    # Set up low-impact mode, if given a budget (priority is lowered right away, so it applies to all processing)
+    governor = None
+    if arg_cpu_pct is not None or arg_io_mbps is not None:
+        set_low_impact_priority(cpu_budget_pct = arg_cpu_pct)
+        governor = Resource_Governor(arg_cpu_pct, arg_io_mbps)
+    
+    # Set up the catalog of probed videos, unless disabled
+    catalog_path = os.path.join(settings_folder, "video_catalog.sqlite") if arg_catalog is None else arg_catalog
+    catalog = None if arg_no_catalog else Video_Catalog(catalog_path)
+    
+    # Interpret output specs, if provided (making sure each one uses working recording settings)
+    output_spec_list = None
+    if arg_output_specs is not None:
+        output_spec_list = [parse_output_spec(each_spec, safe_codec, safe_ext) for each_spec in arg_output_specs]
+        for each_spec in output_spec_list:
+            spec_ext, spec_codec = select_working_codec(settings_folder, each_spec["recording_ext"], each_spec["codec"])
+            each_spec.update({"recording_ext": spec_ext, "codec": spec_codec})
+    
+    # Bundle settings for convenience
+    script_args_dict = {"display_enabled": arg_display,
+                        "target_fps": arg_fps,
+                        "recording_ext": safe_ext,
+                        "codec": safe_codec,
+                        "use_intermediate": arg_intermediate,
+                        "num_compress_workers": arg_compress_workers,
+                        "output_root": arg_output_root,
+                        "input_root": input_root,
+                        "staging_dir": arg_staging_dir,
+                        "prefetch_mb": arg_prefetch_mb,
+                        "frame_cache": frame_cache,
+                        "catalog": catalog,
+                        "enable_derive": arg_derive,
+                        "checkpoint_sec": arg_checkpoint_sec if arg_checkpoint_sec > 0 else None,
+                        "reuse_outputs": arg_reuse,
+                        "use_frame_index": arg_index_frames,
+                        "governor": governor,
+                        "output_spec_list": output_spec_list,
+                        "rotation_n90": arg_rotation,
+                        "timelapse_factor": arg_timelapse,
+                        "scale_factor": arg_scale,
+                        "skip_prompts": arg_yes,
+                        "input_path_list": input_path_list}
+    
+    return script_args_dict
+
+# .....................................................................................................................
+
+def prompt_unless_given(arg_value, prompt_message, default_value, return_type, skip_prompt = False):
+    
+    '''
+    Function which only prompts the user for a setting if it wasn't already given as a script argument
+    Returns:
+        setting_value, prompted (True if the user was prompted)
+    '''
+    
+    if arg_value is not None:
+        return return_type(arg_value), False
+    
+    if skip_prompt:
+        return return_type(default_value), False
+    
+    return cli_prompt_with_defaults(prompt_message, default_value, return_type = return_type), True
+
+# .....................................................................................................................
+
+def select_working_codec(settings_folder, recording_ext, codec, use_fastest = False,
+                         file_name = "codec_capabilities.json"):
+    
+    # Load cached codec probe results (only probes on the first run for a given OpenCV build)
+    cache_path = os.path.join(settings_folder, file_name)
+    candidate_list = [(recording_ext, codec)] + DEFAULT_CODEC_CANDIDATES
+    capability_dict = load_codec_capabilities(cache_path, candidate_list)
+    
+    # Use the given settings as long as they work, unless we're asked to use the fastest option
+    settings_work = check_codec_capability(capability_dict, recording_ext, codec)
+    if settings_work and not use_fastest:
+        return recording_ext, codec
+    
+    # Fall back to the fastest working codec
+    fastest_ext, fastest_codec = find_fastest_valid_codec(capability_dict)
+    if fastest_ext is None:
+        print("",
+              "WARNING:",
+              "  Couldn't find any working extension/codec pairs!",
+              "  Recordings may be missing or corrupt",
+              "", sep="\n")
+        return recording_ext, codec
+    
+    # Let the user know when we aren't using the requested settings
+    if not settings_work:
+        print("",
+              "WARNING:",
+              "  Recording with {} / {} doesn't work on this system!".format(recording_ext, codec),
+              "  Using {} / {} instead".format(fastest_ext, fastest_codec),
+              "", sep="\n")
+    
+    return fastest_ext, fastest_codec
+
+# .....................................................................................................................
+
+def load_json_data(load_folder, load_file_name, default_dict):
+    
+    # Set up load pathing
+    load_path = os.path.join(load_folder, load_file_name)
+    
+    # Initialize storage for default/loaded data
+    output_dict = default_dict.copy()
+    load_data = {}
+    
+    if os.path.exists(load_path):
+        with open(load_path, "r") as in_file:
+            load_data = json.load(in_file)
+            
+    # Add loaded data into output dictionary (which overwrites default values, if needed)
+    output_dict.update(load_data)
+    
+    return output_dict
+
+# .....................................................................................................................
+
+def save_json_data(save_folder, save_file_name, new_data_dict, overwrite_existing = True):
+    
+    # Set up save pathing
+    save_path = os.path.join(save_folder, save_file_name)
+    
+    # Only save if the folder is valid (don't want to create any new folders...)
+    if os.path.exists(save_folder):
+        file_already_exists = os.path.exists(save_path)
+        if not file_already_exists or (file_already_exists and overwrite_existing):
+            with open(save_path, "w") as out_file:
+                json.dump(new_data_dict, out_file, indent = 2)
+
+# .....................................................................................................................
+
+def load_recording_settings(settings_folder, file_name = "recording_settings.json"):
+    
+    default_settings = {"recording_ext": ".mp4",
+                        "codec": "avc1"}
+    
+    return load_json_data(settings_folder, file_name, default_settings)
+
+# .....................................................................................................................
+
+def load_selection_history(settings_folder, file_name = "selection_history.json"):
+    
+    default_history = {"search_path": "~/Desktop",
+                       "ccw_rotations": 1,
+                       "timelapse_factor": 12,
+                       "scaling_factor": 1.0}
+    
+    return load_json_data(settings_folder, file_name, default_history)
+
+# .....................................................................................................................
+    
+def save_recording_settings(settings_folder, recording_ext, codec, overwrite_existing = False,
+                            file_name = "recording_settings.json"):
+    
+    new_recording_settings_data = {"recording_ext": recording_ext,
+                                   "codec": codec}
+    
+    return save_json_data(settings_folder, file_name, new_recording_settings_data, overwrite_existing)
+
+# .....................................................................................................................
+    
+def save_selection_history(settings_folder, new_search_path, new_ccw_rotations, new_timelapse_factor,
+                           new_scaling_factor, file_name = "selection_history.json"):
+    
+    # Replace home pathing with '~' shortcut before saving
+    home_path = os.path.expanduser("~")
+    save_search_path = new_search_path.replace(home_path, "~")
+    
+    new_selection_history_data = {"search_path": save_search_path,
+                                  "ccw_rotations": new_ccw_rotations,
+                                  "timelapse_factor": new_timelapse_factor,
+                                  "scaling_factor": new_scaling_factor}
+    
+    return save_json_data(settings_folder, file_name, new_selection_history_data)
+
+# .....................................................................................................................
+
+def probe_selected_videos(processing_job, video_path_list, catalog = None, num_workers = None, max_listed = 25):
+    
+    '''
+    Function which probes all of the selected videos (in parallel) before any processing starts, and prints
+    a summary of the job (total duration & expected output frames), along with any unreadable videos
+    Returns:
+        readable_path_list
+    '''
+    
+    # Probe everything at once, re-using catalog results for videos that haven't changed (if possible)
+    t_start = perf_counter()
+    num_videos = len(video_path_list)
+    if catalog is None:
+        probe_results_list, num_probed = probe_videos(video_path_list, num_workers), num_videos
+    else:
+        probe_results_list, num_probed = catalog.refresh(video_path_list, num_workers)
+    t_end = perf_counter()
+    
+    # Split out videos that can't be processed
+    readable_path_list, unreadable_list = [], []
+    for each_path, each_probe in zip(video_path_list, probe_results_list):
+        if each_probe["ok"]:
+            readable_path_list.append(each_path)
+        else:
+            unreadable_list.append("{} ({})".format(each_path, each_probe["error"]))
+    
+    # Add up the source & (expected) output sizes over all readable videos
+    total_duration_sec, total_source_frames = 0.0, 0
+    output_totals_list = [{"frames": 0, "duration_sec": 0.0} for _ in processing_job.output_spec_list]
+    for each_probe in probe_results_list:
+        if not each_probe["ok"]:
+            continue
+        total_duration_sec += each_probe["duration_sec"]
+        total_source_frames += each_probe["total_frames"]
+        output_estimate_list = processing_job.estimate_outputs(each_probe["total_frames"], each_probe["fps"])
+        for each_total, each_estimate in zip(output_totals_list, output_estimate_list):
+            each_total["frames"] += each_estimate["frames"]
+            each_total["duration_sec"] += each_estimate["duration_sec"]
+    
+    output_feedback_list = ["    {}: {:,} frames ({})".format(each_folder_name, each_total["frames"],
+                                                              format_duration(each_total["duration_sec"]))
+                            for (each_folder_name, _), each_total
+                            in zip(processing_job.output_naming_list, output_totals_list)]
+    
+    print("",
+          "Probed {} video(s) in {:.1f} sec ({} from catalog)".format(num_videos, t_end - t_start,
+                                                                      num_videos - num_probed),
+          "         Total duration: {}".format(format_duration(total_duration_sec)),
+          "    Total source frames: {:,}".format(total_source_frames),
+          " Expected output frames:",
+          *output_feedback_list,
+          sep="\n")
+    
+    # Warn about unreadable videos (large lists are cut short, to avoid flooding the terminal)
+    num_unreadable = len(unreadable_list)
+    if num_unreadable > 0:
+        num_unlisted = num_unreadable - max_listed
+        print("",
+              "Unreadable videos ({}), these will be skipped:".format(num_unreadable),
+              *["  {}".format(each_entry) for each_entry in unreadable_list[:max_listed]],
+              *(["  ... and {} more".format(num_unlisted)] if num_unlisted > 0 else []),
+              sep="\n")
+    
+    return readable_path_list
+
+# .....................................................................................................................
+
+def format_duration(duration_sec):
+    mins, secs = divmod(int(round(duration_sec)), 60)
+    hours, mins = divmod(mins, 60)
+    return "{:.0f}:{:02.0f}:{:02.0f}".format(hours, mins, secs)
+
+# .....................................................................................................................
+
+def print_final_feedback(processing_job, run_stats_dict):
+    
+    '''
+    Function which prints out a summary of a processing run
+    Returns:
+        exit_code (0 if all outputs were verified, otherwise 1)
+    '''
+    
+    # Build timelapse/scaling feedback for each of the outputs
+    output_feedback_list = []
+    for each_spec in processing_job.output_spec_list:
+        output_feedback_list += ["           Timelapse factor: {:.0f}".format(each_spec["timelapse_factor"]),
+                                 "             Scaling factor: {:.3f}".format(each_spec["scale_factor"])]
+    
+    # Only report ingest timing separately if we were compressing in the background
+    ingest_feedback_list = []
+    if processing_job.use_intermediate:
+        ingest_feedback_list = ["          Ingest time (sec): {:.3f}".format(run_stats_dict["ingest_time_sec"])]
+    
+    # Report videos that were skipped because their outputs already existed
+    num_reused = len(run_stats_dict["reused"])
+    reused_feedback_list = []
+    if num_reused > 0:
+        reused_feedback_list = ["  Skipped (outputs existed): {}".format(num_reused)]
+    
+    # Compare actual resource usage to the budget, when running in low-impact mode
+    usage_feedback_list = []
+    if run_stats_dict["resource_usage"] is not None:
+        usage_report_list = format_usage_report(run_stats_dict["resource_usage"])
+        usage_feedback_list = ["", "Low-impact mode:", *["  {}".format(each_line) for each_line in usage_report_list]]
+    
+    print("",
+          "All done!",
+          "",
+          "Results saved to:",
+          *run_stats_dict["save_folders"],
+          "",
+          "Total processing time (sec): {:.3f}".format(run_stats_dict["total_time_sec"]),
+          *ingest_feedback_list,
+          *reused_feedback_list,
+          "             Rotation (deg): {:.0f}".format(processing_job.rotation_angle_deg),
+          *output_feedback_list,
+          *usage_feedback_list,
+          "", sep="\n")
+    
+    # Flag any bad outputs and make sure the exit code reflects the failure (for the sake of any calling scripts)
+    failed_verification_dict = run_stats_dict["failed_verification"]
+    if len(failed_verification_dict) > 0:
+        print("!" * 48,
+              "Output verification failed for {} file(s):".format(len(failed_verification_dict)),
+              *["  {}\n    {}".format(each_path, "\n    ".join(each_issues))
+                for each_path, each_issues in failed_verification_dict.items()],
+              "!" * 48,
+              "", sep="\n")
+        return 1
+    
+    return 0
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
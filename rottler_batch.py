@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:30:12 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import sys
+import json
+import argparse
+
+# Warning if numpy isn't installed
+try:
+    import numpy as np
+except ImportError:
+    print("",
+          "Couldn't import numpy!",
+          "",
+          "Need to install numpy to continue. Use:",
+          "  pip3 install numpy",
+          "", sep="\n")
+    quit()
+
+# Warning if OpenCV isn't installed
+try:
+    import cv2
+except ImportError:
+    print("",
+          "Couldn't import OpenCV!",
+          "",
+          "Need to install OpenCV to continue.",
+          "Ideally, OpenCV should be compiled on the system.",
+          "However, a simpler method is to use a pip install:",
+          "  pip3 install opencv-python",
+          "",
+          "Warning:",
+          "A pip install of OpenCV may not have full recording",
+          "capabilities!",
+          "", sep="\n")
+    quit()
+
+# Warning if tqdm (cli progress bar) isn't installed
+try:
+    from tqdm import tqdm
+
+except ImportError:
+    print("",
+          "Couldn't import cli progress bar module!",
+          "",
+          "Need to install tqdm. Use:",
+          "  pip3 install tqdm",
+          "", sep="\n")
+    quit()
+
+from local.eolib.video.read_write import DEFAULT_CODEC_CANDIDATES, load_codec_capabilities
+from local.eolib.video.catalog import Video_Catalog
+from local.eolib.video.tuning import DEFAULT_TRIAL_SEC, select_samples, tune_class
+from local.eolib.video.tuning import load_machine_results, save_machine_result
+from local.eolib.video.estimation import calibrate_class, estimate_batch, estimate_wall_time, check_free_space
+from local.eolib.video.throttling import format_usage_report
+from local.eolib.video.sharding import DEFAULT_LEASE_SEC, Lease_Queue, parse_shard
+from local.script_setup import format_duration
+from local.eolib.video.batch import Batch_Job, load_job_spec, validate_job_spec, get_job_codec_list
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def parse_batch_args():
+
+    ap = argparse.ArgumentParser(description = "Process a batch of videos described by a job spec (.json/.yaml) file")
+    ap.add_argument("job_file", type = str,
+                    help = "Path to the job spec file")
+    ap.add_argument("--check", default = False, action = "store_true",
+                    help = "Only validate the job file & probe the inputs, without processing anything")
+    ap.add_argument("--fresh", default = False, action = "store_true",
+                    help = "Ignore progress from previous runs of the job (all videos are processed again)")
+    ap.add_argument("-w", "--workers", default = None, type = int,
+                    help = "Number of videos to process in parallel. Overrides the job file concurrency setting")
+    ap.add_argument("--catalog", default = None, type = str,
+                    help = "Path to the video catalog (sqlite) used to store probe results, so unchanged videos \
+                            aren't re-probed on later runs. (Default: video_catalog.sqlite beside this script)")
+    ap.add_argument("--no_catalog", default = False, action = "store_true",
+                    help = "Probe every input video, without using (or updating) the video catalog")
+    ap.add_argument("--cpu_pct", default = None, type = float,
+                    help = "Run in low-impact mode, using at most this percentage of the machine's CPU (the job \
+                            runs at low priority & backs off further while other processes are busy). \
+                            Overrides the job file low_impact setting")
+    ap.add_argument("--io_mbps", default = None, type = float,
+                    help = "Run in low-impact mode, limiting disk reads + writes to this many MB/s. \
+                            Overrides the job file low_impact setting")
+    ap.add_argument("--shard", default = None, type = str,
+                    help = "Only process one part of the batch, given as i/N (e.g. 2/4 for the 2nd of 4 parts). \
+                            Videos are split by a stable hash of their path, so running every part (e.g. on \
+                            different machines sharing the same storage) processes each video exactly once")
+    ap.add_argument("--queue", default = None, type = str,
+                    help = "Shared folder used to hand out videos between several machines/processes running \
+                            the same job. Each video is claimed (with a lease file) before processing & marked \
+                            when finished, so videos are only processed once. Progress is kept in the queue folder")
+    ap.add_argument("--lease_sec", default = DEFAULT_LEASE_SEC, type = float,
+                    help = "Seconds after which a claimed video whose lease isn't being renewed (e.g. the machine \
+                            crashed) is taken over by another machine. Only used with --queue \
+                            (Default: {:.0f})".format(DEFAULT_LEASE_SEC))
+    ap.add_argument("--deadline", default = None, type = str,
+                    help = "Finish the batch by this time ('HH:MM' or 'YYYY-MM-DD HH:MM'). When behind schedule, \
+                            cheaper settings are used (faster resizing & codec, keyframe-only decoding) and the \
+                            affected videos are listed. Overrides the job file deadline setting")
+    ap.add_argument("--dry_run", default = False, action = "store_true",
+                    help = "Predict the processing time & output sizes (per video and in total) without processing \
+                            anything, and check that the destination has enough free space. Uses a short benchmark \
+                            of each resolution/codec class, which is saved and re-used by later dry runs")
+    ap.add_argument("--calibrate", default = False, action = "store_true",
+                    help = "Re-run the dry run benchmarks, instead of using saved results")
+    ap.add_argument("--tune", default = False, action = "store_true",
+                    help = "Run short calibration trials on a sample of the batch to find the fastest number of \
+                            workers & OpenCV threads for each resolution/codec class, without processing anything. \
+                            Results are saved and used by later runs (unless the job file sets the workers)")
+    ap.add_argument("--tune_sec", default = DEFAULT_TRIAL_SEC, type = float,
+                    help = "Seconds of video processed by each worker in every tuning/calibration trial \
+                            (Default: {:.0f})".format(DEFAULT_TRIAL_SEC))
+    ap.add_argument("--no_tuning", default = False, action = "store_true",
+                    help = "Ignore saved tuning results (workers default to the job file setting, or 1)")
+
+    return vars(ap.parse_args())
+
+# .....................................................................................................................
+
+def print_list_feedback(title, entry_list, max_listed = 25):
+
+    num_unlisted = len(entry_list) - max_listed
+    print("",
+          title,
+          *["  {}".format(each_entry) for each_entry in entry_list[:max_listed]],
+          *(["  ... and {} more".format(num_unlisted)] if num_unlisted > 0 else []),
+          sep="\n")
+
+# .....................................................................................................................
+
+def format_size(num_bytes):
+    if num_bytes is None:
+        return "?"
+    if num_bytes < (1024 ** 3):
+        return "{:.1f} MB".format(num_bytes / (1024 ** 2))
+    return "{:.2f} GB".format(num_bytes / (1024 ** 3))
+
+# .....................................................................................................................
+
+def print_trial_result(trial_result_dict):
+    print("  {} worker(s) x {} thread(s): {:.1f} fps".format(trial_result_dict["workers"],
+                                                             trial_result_dict["opencv_threads"],
+                                                             trial_result_dict["frames_per_sec"]))
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Load job
+
+# Get script arguments (codec probe results are stored beside this script)
+script_folder = os.path.dirname(os.path.realpath(__file__))
+script_args = parse_batch_args()
+job_file_path = script_args["job_file"]
+
+# Load the job file
+try:
+    job_spec = load_job_spec(job_file_path)
+except (OSError, ValueError, ImportError) as err:
+    print("", "Couldn't load job file: {}".format(job_file_path), "  {}".format(err), "", sep="\n")
+    sys.exit(2)
+
+# Apply overrides from script arguments
+if script_args["workers"] is not None:
+    job_spec.setdefault("concurrency", {})["workers"] = script_args["workers"]
+for each_key in ["cpu_pct", "io_mbps"]:
+    if script_args[each_key] is not None:
+        job_spec.setdefault("low_impact", {})[each_key] = script_args[each_key]
+if script_args["deadline"] is not None:
+    job_spec.setdefault("deadline", {})["finish_by"] = script_args["deadline"]
+
+# Check how the batch is being split up, if at all (a job can be sharded or share a queue, but not both)
+shard = None
+try:
+    shard = None if script_args["shard"] is None else parse_shard(script_args["shard"])
+except ValueError as err:
+    print("", str(err), "", sep="\n")
+    sys.exit(2)
+if shard is not None and script_args["queue"] is not None:
+    print("", "Can't use a shard along with a queue, use one or the other", "", sep="\n")
+    sys.exit(2)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Validate
+
+# Check the spec itself first, then check that all of the recording settings actually work on this system
+error_list = validate_job_spec(job_spec)
+if len(error_list) == 0:
+    codec_cache_path = os.path.join(script_folder, "codec_capabilities.json")
+    capability_dict = load_codec_capabilities(codec_cache_path, get_job_codec_list(job_spec) + DEFAULT_CODEC_CANDIDATES)
+    error_list = validate_job_spec(job_spec, capability_dict)
+
+if len(error_list) > 0:
+    print_list_feedback("Job file has {} problem(s):".format(len(error_list)), error_list)
+    print("")
+    sys.exit(2)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Plan
+
+# Progress is tracked beside the job file by default, so re-running the same job picks up where it left off
+# -> Each shard gets it's own progress file, while queued jobs keep track of progress in the (shared) queue
+job_path_only, _ = os.path.splitext(os.path.realpath(job_file_path))
+default_state_path = "{}.state.json".format(job_path_only)
+if shard is not None:
+    default_state_path = "{}.shard{}of{}.state.json".format(job_path_only, *shard)
+if script_args["queue"] is not None:
+    default_state_path = None
+state_path = job_spec.get("state_file", default_state_path)
+work_queue = None
+if script_args["queue"] is not None and not (script_args["check"] or script_args["dry_run"] or script_args["tune"]):
+    work_queue = Lease_Queue(script_args["queue"], script_args["lease_sec"])
+
+# Probe results are re-used across runs (& scripts) through the catalog, unless disabled
+catalog_path = script_args["catalog"]
+catalog_path = os.path.join(script_folder, "video_catalog.sqlite") if catalog_path is None else catalog_path
+catalog = None if script_args["no_catalog"] else Video_Catalog(catalog_path)
+
+# Worker/thread counts found by previous tuning runs are used, unless we're re-tuning
+tuning_path = os.path.join(script_folder, "tuning_results.json")
+skip_tuning = (script_args["tune"] or script_args["no_tuning"])
+tuning_dict = None if skip_tuning else load_machine_results(tuning_path)
+
+batch_job = Batch_Job(job_spec, state_path, capability_dict, catalog, tuning_dict, shard, work_queue,
+                      progress_bar_func = lambda total: tqdm(total = total, mininterval = 1),
+                      verbose = True)
+task_list = batch_job.plan()
+
+# Report on any inputs that can't be processed, before spending any time processing
+plan_failures_dict = batch_job.plan_failures_dict
+if len(plan_failures_dict) > 0:
+    print_list_feedback("Videos that can't be processed ({}), these will be skipped:".format(len(plan_failures_dict)),
+                        ["{} ({})".format(each_path, each_error)
+                         for each_path, each_error in plan_failures_dict.items()])
+
+# Count the different combinations of settings used in the batch (e.g. from rules or sidecar files)
+settings_str_set = {json.dumps(each_task["settings"], sort_keys = True) for each_task in task_list}
+num_threads = batch_job.num_opencv_threads
+workers_str = "{}{}{}".format(batch_job.num_workers,
+                              "" if num_threads is None else " ({} OpenCV thread(s) each)".format(num_threads),
+                              "" if batch_job.tuned_class is None else ", tuned for {}".format(batch_job.tuned_class))
+
+print("",
+      "*" * 48, "",
+      "Job: {}".format(job_file_path),
+      "  Videos to process: {}".format(len(task_list)),
+      "  Distinct settings: {}".format(len(settings_str_set)),
+      "  Workers: {}".format(workers_str),
+      *(["  Shard: {} of {}".format(*shard)] if shard is not None else []),
+      *(["  Queue: {}".format(work_queue.queue_dir)] if work_queue is not None else []),
+      *(["  Deadline: {}".format(job_spec["deadline"]["finish_by"])] if "deadline" in job_spec else []),
+      *(["  Progress file: {}".format(state_path)] if state_path is not None else []),
+      "", "*" * 48,
+      sep="\n")
+
+if script_args["check"]:
+    sys.exit(0)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Dry run
+
+if script_args["dry_run"]:
+
+    # Benchmark any class of video that hasn't been calibrated with the same number of workers/threads
+    pending_task_list = batch_job.get_pending_tasks(script_args["fresh"])
+    calibration_path = os.path.join(script_folder, "calibration_results.json")
+    calibration_results_dict = {} if script_args["calibrate"] else load_machine_results(calibration_path)
+    run_config = (batch_job.num_workers, batch_job.num_opencv_threads)
+    for each_class, each_sample_list in select_samples(pending_task_list).items():
+        saved_calibration = calibration_results_dict.get(each_class, {})
+        if (saved_calibration.get("workers"), saved_calibration.get("opencv_threads")) == run_config:
+            continue
+        print("", "Calibrating for {} ({} sample video(s))...".format(each_class, len(each_sample_list)), sep="\n")
+        new_calibration = calibrate_class(each_sample_list, *run_config, script_args["tune_sec"])
+        save_machine_result(calibration_path, each_class, new_calibration)
+        calibration_results_dict[each_class] = new_calibration
+
+    # Predict time & outputs for every video, then the whole batch
+    task_estimate_list = estimate_batch(pending_task_list, calibration_results_dict,
+                                        batch_job.output_root, batch_job.input_root)
+    time_sec_list = [each_estimate["time_sec"] for each_estimate in task_estimate_list]
+    wall_time_sec = estimate_wall_time(time_sec_list, batch_job.num_workers)
+    total_bytes_list = [each_estimate["total_bytes"] for each_estimate in task_estimate_list]
+    total_frames = sum(each_output["frames"] for each_estimate in task_estimate_list
+                       for each_output in each_estimate["outputs"])
+    print_list_feedback("Estimates per video (processing time, output frames, output size):",
+                        ["{}  ({}, {} frames, {})".format(each_estimate["source_path"],
+                                                          format_duration(each_estimate["time_sec"]),
+                                                          sum(each_output["frames"]
+                                                              for each_output in each_estimate["outputs"]),
+                                                          format_size(each_estimate["total_bytes"]))
+                         for each_estimate in sorted(task_estimate_list, key = lambda est: -est["time_sec"])])
+    print("",
+          "Estimated totals ({} video(s), {} already finished):".format(len(pending_task_list),
+                                                                        len(task_list) - len(pending_task_list)),
+          "  Processing time: {} (with {} worker(s))".format(format_duration(wall_time_sec), batch_job.num_workers),
+          "    Output frames: {}".format(total_frames),
+          "      Output size: {}".format(format_size(None if None in total_bytes_list else sum(total_bytes_list))),
+          sep="\n")
+
+    # Warn about destinations that don't have room for the outputs
+    free_space_list = check_free_space(task_estimate_list)
+    for each_entry in free_space_list:
+        print("  {} {} needed, {} free @ {}".format("OK:" if each_entry["ok"] else "WARNING! Not enough space:",
+                                                    format_size(each_entry["needed_bytes"]),
+                                                    format_size(each_entry["free_bytes"]),
+                                                    each_entry["path"]))
+
+    print("")
+    sys.exit(0 if all(each_entry["ok"] for each_entry in free_space_list) else 1)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Tune
+
+if script_args["tune"]:
+
+    # Tune each class of video separately, since the best configuration changes with resolution & codec
+    samples_dict = select_samples(task_list)
+    for each_class, each_sample_list in samples_dict.items():
+        print("", "Tuning for {} ({} sample video(s))...".format(each_class, len(each_sample_list)), sep="\n")
+        try:
+            best_result, _ = tune_class(each_sample_list, script_args["tune_sec"],
+                                        trial_callback = print_trial_result)
+        except KeyboardInterrupt:
+            print("", "Tuning interrupted! Classes that finished tuning have been saved", "", sep="\n")
+            sys.exit(1)
+        if best_result is not None:
+            save_machine_result(tuning_path, each_class, best_result)
+            print("  -> Best: {} worker(s) x {} thread(s)".format(best_result["workers"],
+                                                                   best_result["opencv_threads"]))
+
+    print("", "Tuning results saved: {}".format(tuning_path), "", sep="\n")
+    sys.exit(0)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run processing
+
+run_stats = batch_job.run(fresh_start = script_args["fresh"])
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Final feedback
+
+print("",
+      "Interrupted! Re-run the same job to continue" if run_stats["interrupted"] else "All done!",
+      "",
+      "            Finished videos: {}".format(len(run_stats["finished"])),
+      " Skipped (already finished): {}".format(run_stats["skipped"]),
+      *(["   Processed by other nodes: {}".format(run_stats["other_nodes"])] if work_queue is not None else []),
+      "              Failed videos: {}".format(len(run_stats["failed"])),
+      "Total processing time (sec): {:.3f}".format(run_stats["total_time_sec"]),
+      sep="\n")
+
+# Compare actual resource usage to the budget, when running in low-impact mode
+if run_stats["resource_usage"] is not None:
+    usage_report_list = format_usage_report(run_stats["resource_usage"])
+    print("", "Low-impact mode:", *["  {}".format(each_line) for each_line in usage_report_list], sep="\n")
+
+# List videos that were processed with cheaper settings to meet the deadline (re-running without one redoes these)
+degraded_dict = run_stats["degraded"]
+if len(degraded_dict) > 0:
+    print_list_feedback("Videos processed with cheaper settings to meet the deadline ({}):".format(len(degraded_dict)),
+                        ["{} ({})".format(each_path, ", ".join(each_steps))
+                         for each_path, each_steps in degraded_dict.items()])
+
+# Flag any failures and make sure the exit code reflects them (for the sake of any calling scripts)
+failed_dict = run_stats["failed"]
+if len(failed_dict) > 0:
+    print_list_feedback("!" * 48,
+                        ["{}\n    {}".format(each_path, "\n    ".join(each_issues))
+                         for each_path, each_issues in failed_dict.items()])
+    print("!" * 48)
+
+print("")
+exit_code = 1 if (len(failed_dict) > 0 or run_stats["interrupted"] or len(plan_failures_dict) > 0) else 0
+sys.exit(exit_code)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 17:12:09 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import sys
+import argparse
+
+# Warning if numpy isn't installed
+try:
+    import numpy as np
+except ImportError:
+    print("",
+          "Couldn't import numpy!",
+          "",
+          "Need to install numpy to continue. Use:",
+          "  pip3 install numpy",
+          "", sep="\n")
+    quit()
+
+# Warning if OpenCV isn't installed
+try:
+    import cv2
+except ImportError:
+    print("",
+          "Couldn't import OpenCV!",
+          "",
+          "Need to install OpenCV to continue.",
+          "Ideally, OpenCV should be compiled on the system.",
+          "However, a simpler method is to use a pip install:",
+          "  pip3 install opencv-python",
+          "",
+          "Warning:",
+          "A pip install of OpenCV may not have full recording",
+          "capabilities!",
+          "", sep="\n")
+    quit()
+
+from local.eolib.video.catalog import Video_Catalog, CATALOG_SORT_COLUMNS_LIST
+from local.eolib.video.processing import find_video_files
+from local.script_setup import format_duration
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def parse_probe_args():
+
+    ap = argparse.ArgumentParser(description = "Probe videos into the (sqlite) video catalog and list/filter \
+                                                the catalog contents. Only new or changed videos are probed, \
+                                                so listing a large archive is (nearly) instant")
+    ap.add_argument("inputs", nargs = "*", default = [],
+                    help = "Video files, folders or glob patterns to probe & list. If not given, \
+                            everything already in the catalog is listed")
+    ap.add_argument("--catalog", default = None, type = str,
+                    help = "Path to the video catalog. (Default: video_catalog.sqlite beside this script)")
+    ap.add_argument("--refresh", default = False, action = "store_true",
+                    help = "Re-probe the input videos, even if they haven't changed")
+    ap.add_argument("--prune", default = False, action = "store_true",
+                    help = "Remove catalog entries for videos that no longer exist")
+    ap.add_argument("-w", "--workers", default = None, type = int,
+                    help = "Number of videos to probe in parallel (Default: number of cpus)")
+    ap.add_argument("--name", default = None, type = str,
+                    help = "Only list videos whose file name matches this (quoted) glob pattern, e.g. 'Front*'")
+    ap.add_argument("--codec", default = None, type = str,
+                    help = "Only list videos using this codec (FourCC code, e.g. avc1)")
+    ap.add_argument("--min_sec", default = None, type = float,
+                    help = "Only list videos at least this long (in seconds)")
+    ap.add_argument("--max_sec", default = None, type = float,
+                    help = "Only list videos at most this long (in seconds)")
+    ap.add_argument("--min_height", default = None, type = int,
+                    help = "Only list videos with at least this frame height (e.g. 1080)")
+    ap.add_argument("--max_height", default = None, type = int,
+                    help = "Only list videos with at most this frame height")
+    ap.add_argument("--unreadable", default = False, action = "store_true",
+                    help = "Only list videos that couldn't be read")
+    ap.add_argument("--sort", default = "path", choices = CATALOG_SORT_COLUMNS_LIST,
+                    help = "Sort listed videos by this value (Default: path)")
+    ap.add_argument("--desc", default = False, action = "store_true",
+                    help = "Sort from largest to smallest")
+    ap.add_argument("--limit", default = None, type = int,
+                    help = "Maximum number of videos to list")
+
+    return vars(ap.parse_args())
+
+# .....................................................................................................................
+
+def format_entry(entry_dict):
+
+    if not entry_dict["ok"]:
+        return "  {:<40} {}".format("UNREADABLE ({})".format(entry_dict["error"]), entry_dict["path"])
+
+    return "  {:>9}  {:>11}  {:>7.2f} fps  {:<7} {}".format(format_duration(entry_dict["duration_sec"]),
+                                                           "{} x {}".format(*entry_dict["WH"]),
+                                                           entry_dict["fps"], entry_dict["codec"],
+                                                           entry_dict["path"])
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Update catalog
+
+# Get script arguments (the catalog is stored beside this script by default)
+script_folder = os.path.dirname(os.path.realpath(__file__))
+script_args = parse_probe_args()
+catalog_path = script_args["catalog"]
+catalog_path = os.path.join(script_folder, "video_catalog.sqlite") if catalog_path is None else catalog_path
+catalog = Video_Catalog(catalog_path)
+
+# Clean out entries for videos that have been deleted, if needed
+if script_args["prune"]:
+    num_removed = catalog.prune()
+    print("", "Removed {} catalog entries for missing videos".format(num_removed), sep="\n")
+
+# Probe any new/changed input videos
+input_path_set = None
+if len(script_args["inputs"]) > 0:
+    try:
+        input_path_list = find_video_files(script_args["inputs"], recursive = True)
+    except FileNotFoundError as err:
+        print("", str(err), "", sep="\n")
+        sys.exit(2)
+
+    _, num_probed = catalog.refresh(input_path_list, script_args["workers"], script_args["refresh"])
+    input_path_set = {os.path.realpath(each_path) for each_path in input_path_list}
+    print("", "Probed {} new/changed video(s), {} from catalog".format(num_probed, len(input_path_set) - num_probed),
+          sep="\n")
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% List catalog entries
+
+entry_list = catalog.query(name_pattern = script_args["name"],
+                           codec = script_args["codec"],
+                           min_duration_sec = script_args["min_sec"],
+                           max_duration_sec = script_args["max_sec"],
+                           min_height = script_args["min_height"],
+                           max_height = script_args["max_height"],
+                           readable = False if script_args["unreadable"] else None,
+                           sort_by = script_args["sort"],
+                           descending = script_args["desc"],
+                           limit = None if input_path_set is not None else script_args["limit"])
+
+# Only list the given inputs, if any (limit is applied afterwards so it counts listed videos only)
+if input_path_set is not None:
+    entry_list = [each_entry for each_entry in entry_list if each_entry["path"] in input_path_set]
+    entry_list = entry_list[:script_args["limit"]]
+
+print("",
+      *[format_entry(each_entry) for each_entry in entry_list],
+      "",
+      "Listed {} video(s) ({} in catalog)".format(len(entry_list), len(catalog)),
+      "", sep="\n")
+catalog.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 15:02:44 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import sys
+import argparse
+
+# Warning if numpy isn't installed
+try:
+    import numpy as np
+except ImportError:
+    print("",
+          "Couldn't import numpy!",
+          "",
+          "Need to install numpy to continue. Use:",
+          "  pip3 install numpy",
+          "", sep="\n")
+    quit()
+
+# Warning if OpenCV isn't installed
+try:
+    import cv2
+except ImportError:
+    print("",
+          "Couldn't import OpenCV!",
+          "",
+          "Need to install OpenCV to continue.",
+          "Ideally, OpenCV should be compiled on the system.",
+          "However, a simpler method is to use a pip install:",
+          "  pip3 install opencv-python",
+          "",
+          "Warning:",
+          "A pip install of OpenCV may not have full recording",
+          "capabilities!",
+          "", sep="\n")
+    quit()
+
+from local.eolib.video.job_client import DEFAULT_SERVER_PORT
+from local.eolib.video.job_server import Job_Server, make_http_server
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def parse_server_args():
+
+    ap = argparse.ArgumentParser(description = "Run a job server, which keeps a pool of workers running so that \
+                                                batch jobs (submitted using rottler_submit.py) can start right away. \
+                                                Only accepts connections from this machine")
+    ap.add_argument("-p", "--port", default = DEFAULT_SERVER_PORT, type = int,
+                    help = "Port to listen on (localhost only). (Default: {})".format(DEFAULT_SERVER_PORT))
+    ap.add_argument("-w", "--workers", default = 1, type = int,
+                    help = "Number of videos to process in parallel, shared by every job. \
+                            Job file concurrency settings are ignored, as are the worker priority & core \
+                            limits from low_impact settings (budgets are still used for throttling) (Default: 1)")
+    ap.add_argument("--opencv_threads", default = None, type = int,
+                    help = "Number of threads OpenCV may use in each worker (Default: OpenCV decides)")
+
+    return vars(ap.parse_args())
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Start server
+
+# Get script arguments (codec probe results are stored beside this script)
+script_folder = os.path.dirname(os.path.realpath(__file__))
+script_args = parse_server_args()
+codec_cache_path = os.path.join(script_folder, "codec_capabilities.json")
+
+# Start up the workers first, so they're ready by the time the first job comes in
+job_server = Job_Server(script_args["workers"], script_args["opencv_threads"], codec_cache_path, verbose = True)
+try:
+    http_server = make_http_server(job_server, script_args["port"])
+except OSError as err:
+    job_server.close()
+    print("", "Couldn't start server on port {}".format(script_args["port"]), "  {}".format(err), "", sep="\n")
+    sys.exit(2)
+
+print("",
+      "*" * 48, "",
+      "Job server running on port {}".format(script_args["port"]),
+      "  Workers: {}".format(job_server.num_workers),
+      "",
+      "Submit jobs using:",
+      "  python3 rottler_submit.py path/to/job.json",
+      "",
+      "Press Ctrl+C to stop",
+      "", "*" * 48,
+      sep="\n")
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Serve jobs
+
+try:
+    http_server.serve_forever()
+except KeyboardInterrupt:
+    print("", "Stopping server (waiting for the current job to finish, Ctrl+C again to force quit)...", sep="\n")
+finally:
+    http_server.server_close()
+    job_server.close()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 15:40:18 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import sys
+import argparse
+
+# Note: Doesn't import OpenCV/numpy (directly or otherwise), so submitting jobs is quick
+from local.eolib.video.job_client import DEFAULT_SERVER_PORT
+from local.eolib.video.job_client import submit_job_file, submit_job_spec, get_job_status, wait_for_jobs
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def parse_submit_args():
+
+    ap = argparse.ArgumentParser(description = "Submit batch jobs to a running job server (see rottler_server.py) \
+                                                and check on their progress")
+    ap.add_argument("job_files", nargs = "*", default = [],
+                    help = "Paths to job spec files (.json/.yaml) to submit")
+    ap.add_argument("-i", "--inputs", nargs = "+", default = None,
+                    help = "Submit a job for these video files, folders or glob patterns (instead of a job file), \
+                            using the default settings (other than outputs)")
+    ap.add_argument("-o", "--outputs", nargs = "+", default = None,
+                    help = "Output specs for a job given with --inputs, each as timelapse:scale[:codec[:ext]] \
+                            (e.g. 60:0.25 12:1:XVID:.avi)")
+    ap.add_argument("-r", "--output_root", default = None, type = str,
+                    help = "Folder for outputs of a job given with --inputs (mirroring the input folder layout). \
+                            Outputs go beside the inputs if not given")
+    ap.add_argument("--wait", default = False, action = "store_true",
+                    help = "Wait for the submitted jobs to finish, printing progress along the way")
+    ap.add_argument("--status", nargs = "?", default = None, const = "all",
+                    help = "Print the status of a job (given by id) or every job, if no id is given")
+    ap.add_argument("-p", "--port", default = DEFAULT_SERVER_PORT, type = int,
+                    help = "Port the job server is listening on. (Default: {})".format(DEFAULT_SERVER_PORT))
+
+    return vars(ap.parse_args())
+
+# .....................................................................................................................
+
+def format_job_status(job_status_dict):
+
+    num_videos = job_status_dict["videos"]
+    status_str = "  Job {}: {}".format(job_status_dict["job_id"], job_status_dict["status"])
+    if num_videos is not None:
+        status_str += " ({} of {} video(s) processed".format(job_status_dict["processed"], num_videos)
+        if job_status_dict["status"] == "done":
+            status_str += ", {} skipped, {} failed".format(job_status_dict["skipped"], len(job_status_dict["failed"]))
+        status_str += ")"
+    if job_status_dict["total_time_sec"] is not None:
+        status_str += " in {:.1f} sec".format(job_status_dict["total_time_sec"])
+    if job_status_dict["error"] is not None:
+        status_str += " - {}".format(job_status_dict["error"])
+
+    return status_str
+
+# .....................................................................................................................
+
+def print_failures(job_status_dict):
+
+    failure_lut = {**job_status_dict["plan_failures"], **job_status_dict["failed"]}
+    for each_path, each_error in failure_lut.items():
+        print("    {} ({})".format(each_path, each_error))
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Submit jobs
+
+script_args = parse_submit_args()
+port = script_args["port"]
+job_id_list = []
+try:
+
+    # Print job status, if that's all we were asked to do
+    if script_args["status"] is not None:
+        job_id = None if script_args["status"] == "all" else script_args["status"]
+        try:
+            job_status = get_job_status(job_id, port)
+        except ValueError as err:
+            print("", str(err), "", sep="\n")
+            sys.exit(2)
+        job_status_list = job_status if job_id is None else [job_status]
+        print("", *[format_job_status(each_status) for each_status in job_status_list], "", sep="\n")
+        sys.exit(0)
+
+    # Submit each job file, then the inline job (if any). Relative paths are relative to the job file/current folder
+    for each_path in script_args["job_files"]:
+        job_id_list.append(submit_job_file(each_path, port))
+        print("Submitted job {}: {}".format(job_id_list[-1], each_path))
+    if script_args["inputs"] is not None:
+        job_spec = {"inputs": script_args["inputs"]}
+        if script_args["outputs"] is not None:
+            job_spec["outputs"] = script_args["outputs"]
+        if script_args["output_root"] is not None:
+            job_spec["output_root"] = script_args["output_root"]
+        job_id_list.append(submit_job_spec(job_spec, port = port))
+        print("Submitted job {}: {} input(s)".format(job_id_list[-1], len(script_args["inputs"])))
+
+except ConnectionError as err:
+    print("", str(err), "Is the server running? (see rottler_server.py)", "", sep="\n")
+    sys.exit(2)
+except ValueError as err:
+    print("", "Job rejected by the server:", *["  {}".format(each_line) for each_line in str(err).splitlines()], "",
+          sep="\n")
+    sys.exit(2)
+
+if len(job_id_list) == 0:
+    print("", "Nothing to submit! Give job files or --inputs (or use --status)", "", sep="\n")
+    sys.exit(2)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Wait for results
+
+if not script_args["wait"]:
+    sys.exit(0)
+
+try:
+    print_status = lambda job_status_dict: print(format_job_status(job_status_dict))
+    job_status_list = wait_for_jobs(job_id_list, port, status_callback = print_status)
+except ConnectionError as err:
+    print("", str(err), "", sep="\n")
+    sys.exit(2)
+except KeyboardInterrupt:
+    print("", "Stopped waiting (jobs keep running on the server)", "", sep="\n")
+    sys.exit(1)
+
+# Report any videos that couldn't be processed
+all_ok = True
+for each_status in job_status_list:
+    if each_status["status"] == "error":
+        all_ok = False
+    elif len(each_status["failed"]) + len(each_status["plan_failures"]) > 0:
+        all_ok = False
+        print("", "Job {} failures:".format(each_status["job_id"]), sep="\n")
+        print_failures(each_status)
+
+print("")
+sys.exit(0 if all_ok else 1)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
+
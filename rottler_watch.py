@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 11:26:40 2026
+
+@author: eo
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import sys
+import signal
+import argparse
+
+# Warning if numpy isn't installed
+try:
+    import numpy as np
+except ImportError:
+    print("",
+          "Couldn't import numpy!",
+          "",
+          "Need to install numpy to continue. Use:",
+          "  pip3 install numpy",
+          "", sep="\n")
+    quit()
+
+# Warning if OpenCV isn't installed
+try:
+    import cv2
+except ImportError:
+    print("",
+          "Couldn't import OpenCV!",
+          "",
+          "Need to install OpenCV to continue.",
+          "Ideally, OpenCV should be compiled on the system.",
+          "However, a simpler method is to use a pip install:",
+          "  pip3 install opencv-python",
+          "",
+          "Warning:",
+          "A pip install of OpenCV may not have full recording",
+          "capabilities!",
+          "", sep="\n")
+    quit()
+
+from local.eolib.video.read_write import DEFAULT_CODEC_CANDIDATES, load_codec_capabilities
+from local.eolib.video.batch import load_job_spec, validate_job_spec, get_job_codec_list
+from local.eolib.video.ingest import Watch_Folder_Ingest
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def parse_watch_args():
+
+    ap = argparse.ArgumentParser(description = "Watch folders for new videos and process them as they arrive. \
+                                                Settings come from a job spec file, where the inputs are the \
+                                                folders to watch")
+    ap.add_argument("job_file", type = str,
+                    help = "Path to the job spec file")
+    ap.add_argument("-w", "--workers", default = None, type = int,
+                    help = "Number of videos to process in parallel. Overrides the job file concurrency setting")
+    ap.add_argument("--stable_sec", default = 10.0, type = float,
+                    help = "Time (in seconds) a new file must go without changing before it's processed. \
+                            (Default: 10)")
+    ap.add_argument("--poll", default = False, action = "store_true",
+                    help = "Poll folders for changes instead of using inotify. Needed for network shares \
+                            written to by other machines. Polling is also used if inotify isn't available")
+    ap.add_argument("--poll_sec", default = 5.0, type = float,
+                    help = "Time (in seconds) between polls, when polling (Default: 5)")
+
+    return vars(ap.parse_args())
+
+# .....................................................................................................................
+
+def stop_on_sigterm(signal_number, stack_frame):
+    # Treat termination (e.g. from a service manager) the same as Ctrl+C, so we shut down cleanly
+    raise KeyboardInterrupt
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Load job
+
+# Get script arguments (codec probe results are stored beside this script)
+script_folder = os.path.dirname(os.path.realpath(__file__))
+script_args = parse_watch_args()
+job_file_path = script_args["job_file"]
+
+# Load the job file
+try:
+    job_spec = load_job_spec(job_file_path)
+except (OSError, ValueError, ImportError) as err:
+    print("", "Couldn't load job file: {}".format(job_file_path), "  {}".format(err), "", sep="\n")
+    sys.exit(2)
+
+# Apply overrides from script arguments
+if script_args["workers"] is not None:
+    job_spec.setdefault("concurrency", {})["workers"] = script_args["workers"]
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Validate
+
+# Check the spec itself first, then check that all of the recording settings actually work on this system
+error_list = validate_job_spec(job_spec, watch_folders = True)
+if len(error_list) == 0:
+    codec_cache_path = os.path.join(script_folder, "codec_capabilities.json")
+    capability_dict = load_codec_capabilities(codec_cache_path, get_job_codec_list(job_spec) + DEFAULT_CODEC_CANDIDATES)
+    error_list = validate_job_spec(job_spec, capability_dict, watch_folders = True)
+
+if len(error_list) > 0:
+    print("", "Job file has {} problem(s):".format(len(error_list)),
+          *["  {}".format(each_error) for each_error in error_list], "", sep="\n")
+    sys.exit(2)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run watch loop
+
+signal.signal(signal.SIGTERM, stop_on_sigterm)
+
+watch_ingest = Watch_Folder_Ingest(job_spec, capability_dict,
+                                   stable_sec = script_args["stable_sec"],
+                                   use_polling = script_args["poll"],
+                                   poll_interval_sec = script_args["poll_sec"],
+                                   verbose = True)
+num_done, num_failed = watch_ingest.run_forever()
+
+print("",
+      "Stopped watching",
+      "  Finished videos: {}".format(num_done),
+      "    Failed videos: {}".format(num_failed),
+      "", sep="\n")